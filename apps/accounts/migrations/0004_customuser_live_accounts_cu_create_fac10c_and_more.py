@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_master_avatar_master_nickname_player_avatar_and_more'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['-created_at'], name='live_accounts_cu_create_fac10c'),
+        ),
+        migrations.AddIndex(
+            model_name='master',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['-created_at'], name='live_accounts_ma_create_c7459e'),
+        ),
+        migrations.AddIndex(
+            model_name='player',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['-created_at'], name='live_accounts_pl_create_bfaf7e'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:11
+
+import apps.common.utils
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_customuser_live_accounts_cu_create_fac10c_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='customuser',
+            name='id',
+            field=models.UUIDField(default=apps.common.utils.new_uuid, editable=False, primary_key=True, serialize=False, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='master',
+            name='id',
+            field=models.UUIDField(default=apps.common.utils.new_uuid, editable=False, primary_key=True, serialize=False, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='player',
+            name='id',
+            field=models.UUIDField(default=apps.common.utils.new_uuid, editable=False, primary_key=True, serialize=False, unique=True),
+        ),
+    ]
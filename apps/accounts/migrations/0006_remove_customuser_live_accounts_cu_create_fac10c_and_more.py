@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_alter_customuser_id_alter_master_id_alter_player_id'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='customuser',
+            name='live_accounts_cu_create_fac10c',
+        ),
+        migrations.RemoveIndex(
+            model_name='master',
+            name='live_accounts_ma_create_c7459e',
+        ),
+        migrations.RemoveIndex(
+            model_name='player',
+            name='live_accounts_pl_create_bfaf7e',
+        ),
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['-created_at', 'id'], name='live_accounts_cu_create_c13572'),
+        ),
+        migrations.AddIndex(
+            model_name='master',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['-created_at', 'id'], name='live_accounts_ma_create_3d9e4d'),
+        ),
+        migrations.AddIndex(
+            model_name='player',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['-created_at', 'id'], name='live_accounts_pl_create_3b5c53'),
+        ),
+    ]
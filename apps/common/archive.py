@@ -0,0 +1,225 @@
+"""
+Архивация «надгробий» — мягко удалённых записей — в сжатые JSONL-файлы и восстановление из них.
+
+Формат: по файлу на модель и месяц удаления (<каталог>/<app_label>.<model>/<YYYY-MM>.jsonl.gz).
+Каждая строка — запись модели в формате python-сериализатора Django ({model, pk, fields})
+плюс ключ children со всеми дочерними строками, которые удаляются каскадом (атаки, эффекты, изображения...).
+"""
+import datetime
+import gzip
+import json
+import os
+from collections import defaultdict
+from pathlib import Path
+
+from django.apps import apps
+from django.core import serializers
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
+
+from apps.common.managers import DEFAULT_CHUNK_SIZE, IsDeletedQuerySet
+from apps.common.utils import bulk_unique_slugify, keep_media_files
+
+# порядок важен для восстановления: сначала родители, на которые ссылаются другие архивы
+ARCHIVED_MODELS = (
+    'wiki.Post',
+    'wiki.News',
+    'wiki.Creature',
+    'wiki.Spell',
+    'shop.Product',
+    'shop.ProductReview',
+)
+
+
+class ArchiveJSONEncoder(DjangoJSONEncoder):
+    # DjangoJSONEncoder обрезает время до миллисекунд — в архиве храним как есть
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def archived_relations(model):
+    """Обратные связи, строки которых удаляются вместе с объектом (on_delete=CASCADE)."""
+    return [
+        relation for relation in model._meta.related_objects
+        if not relation.many_to_many and relation.on_delete is models.CASCADE
+    ]
+
+
+def archive_path(directory, model, deleted_at):
+    month = deleted_at.strftime('%Y-%m') if deleted_at else 'unknown'
+    return Path(directory) / model._meta.label_lower / f'{month}.jsonl.gz'
+
+
+def _children_by_parent(model, pks):
+    # одна выборка на каждую дочернюю модель для всей пачки родителей
+    children = defaultdict(list)
+    for relation in archived_relations(model):
+        rows = list(relation.related_model._base_manager.filter(**{f'{relation.field.name}__in': pks}))
+        for row, data in zip(rows, serializers.serialize('python', rows)):
+            children[getattr(row, relation.field.attname)].append(data)
+    return children
+
+
+def _append_member(path, lines):
+    """
+    Дописывает строки в файл отдельным законченным gzip-member и сбрасывает его на диск (fsync).
+    Член с трейлером и CRC пишется целиком до удаления пачки из БД: если процесс упадёт посреди записи,
+    недописанным останется только этот член — строки пачки ещё в БД, а прежние члены файла читаются.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'ab') as archive:
+        archive.write(gzip.compress(''.join(lines).encode('utf-8')))
+        archive.flush()
+        os.fsync(archive.fileno())
+
+
+def archive_deleted(model, cutoff, directory, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Переносит мягко удалённые до cutoff записи модели в архив и окончательно удаляет их пачками.
+    Пачка удаляется только после того, как записана в файл и сброшена на диск. Возвращает число
+    заархивированных записей. Файлы в media не удаляются, чтобы восстановленные записи остались с изображениями.
+    Записи с действующими зависимыми строками не трогаются (IsDeletedQuerySet.without_live_dependants).
+    """
+    queryset = IsDeletedQuerySet(model).filter(is_deleted=True, deleted_at__lt=cutoff).without_live_dependants()
+    archived = 0
+    for pks in queryset.pk_chunks(chunk_size):
+        rows = list(model._base_manager.filter(pk__in=pks).order_by('pk'))
+        children = _children_by_parent(model, pks)
+
+        lines = defaultdict(list)
+        for row, data in zip(rows, serializers.serialize('python', rows)):
+            data['children'] = children.get(row.pk, [])
+            lines[archive_path(directory, model, row.deleted_at)].append(
+                json.dumps(data, cls=ArchiveJSONEncoder, ensure_ascii=False) + '\n'
+            )
+        # каждая пачка — свой gzip-member в файле месяца; gzip.open читает такие файлы целиком
+        for path, chunk in lines.items():
+            _append_member(path, chunk)
+
+        with transaction.atomic(), keep_media_files():
+            IsDeletedQuerySet(model).filter(pk__in=pks).delete(hard_delete=True)
+        archived += len(rows)
+    return archived
+
+
+def archive_files(directory, model=None, month=None):
+    """Файлы архива в порядке восстановления (по ARCHIVED_MODELS, затем по месяцам)."""
+    directory = Path(directory)
+    labels = [model._meta.label_lower] if model else [label.lower() for label in ARCHIVED_MODELS]
+    files = []
+    for label in labels:
+        pattern = f'{month}.jsonl.gz' if month else '*.jsonl.gz'
+        files.extend(sorted((directory / label).glob(pattern)))
+    return files
+
+
+def read_archive(path):
+    with gzip.open(path, 'rt', encoding='utf-8') as archive:
+        for line in archive:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _insert_missing(model, objects):
+    """bulk_create только тех объектов, которых ещё нет в БД (повторное восстановление безопасно)."""
+    if not objects:
+        return []
+    if isinstance(model._meta.pk, models.AutoField):
+        # целочисленные ключи могли быть заняты новыми строками — пусть БД выдаст новые
+        for obj in objects:
+            obj.pk = None
+    else:
+        existing = set(model._base_manager.filter(pk__in=[obj.pk for obj in objects]).values_list('pk', flat=True))
+        objects = [obj for obj in objects if obj.pk not in existing]
+
+    if objects and hasattr(model, 'slug_source'):
+        # слаг архивной записи мог занять новый объект — выдаём ей свободный
+        slugs = [obj.slug for obj in objects if obj.slug]
+        taken = set(model._base_manager.filter(slug__in=slugs).values_list('slug', flat=True))
+        conflicting = [obj for obj in objects if obj.slug in taken]
+        for obj in conflicting:
+            obj.slug = None
+        bulk_unique_slugify(conflicting)
+
+    # bulk_create проставляет auto_now/auto_now_add текущим временем — возвращаем архивные значения
+    timestamps = [
+        field for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    archived_values = [[getattr(obj, field.attname) for field in timestamps] for obj in objects]
+    created = model._base_manager.bulk_create(objects)
+    if timestamps and created:
+        for obj, values in zip(created, archived_values):
+            for field, value in zip(timestamps, values):
+                setattr(obj, field.attname, value)
+        model._base_manager.bulk_update(created, [field.name for field in timestamps])
+    return created
+
+
+def _set_m2m(parents):
+    # связи m2m без собственной модели (например, Product.tags): одна вставка на поле для всей пачки
+    pairs_by_field = defaultdict(list)
+    for obj, m2m_data in parents:
+        for name, target_pks in m2m_data.items():
+            pairs_by_field[obj._meta.get_field(name)].extend((obj.pk, pk) for pk in target_pks)
+
+    for field, pairs in pairs_by_field.items():
+        through = field.remote_field.through
+        targets = {target for _, target in pairs}
+        existing = set(field.related_model._base_manager.filter(pk__in=targets).values_list('pk', flat=True))
+        through._base_manager.bulk_create([
+            through(**{f'{field.m2m_field_name()}_id': source, f'{field.m2m_reverse_field_name()}_id': target})
+            for source, target in pairs if target in existing
+        ], ignore_conflicts=True)
+
+
+def _restore_batch(batch, undelete):
+    parents = []
+    children = defaultdict(list)
+    for record in batch:
+        for child in record.pop('children', []):
+            children[apps.get_model(child['model'])].append(child)
+        deserialized = next(serializers.deserialize('python', [record], ignorenonexistent=True))
+        if undelete:
+            deserialized.object.is_deleted = False
+            deserialized.object.deleted_at = None
+        parents.append((deserialized.object, deserialized.m2m_data))
+
+    with transaction.atomic():
+        model = type(parents[0][0])
+        created = _insert_missing(model, [obj for obj, _ in parents])
+        created_pks = {obj.pk for obj in created}
+        # дочерние строки и m2m — только для реально восстановленных родителей
+        _set_m2m([(obj, m2m) for obj, m2m in parents if obj.pk in created_pks])
+        for child_model, rows in children.items():
+            objects = [
+                item.object for item in serializers.deserialize('python', rows, ignorenonexistent=True)
+            ]
+            relations = [r.field for r in archived_relations(model) if r.related_model is child_model]
+            objects = [
+                obj for obj in objects
+                if any(getattr(obj, field.attname) in created_pks for field in relations)
+            ]
+            _insert_missing(child_model, objects)
+    return len(created)
+
+
+def unarchive(paths, batch_size=DEFAULT_CHUNK_SIZE, undelete=False):
+    """
+    Восстанавливает записи из файлов архива через bulk_create пачками по batch_size.
+    Уже существующие записи пропускаются. С undelete=True записи восстанавливаются «живыми».
+    Возвращает {label модели: число восстановленных записей}.
+    """
+    restored = defaultdict(int)
+    for path in paths:
+        batch = []
+        for record in read_archive(path):
+            batch.append(record)
+            if len(batch) >= batch_size:
+                restored[batch[0]['model']] += _restore_batch(batch, undelete)
+                batch = []
+        if batch:
+            restored[batch[0]['model']] += _restore_batch(batch, undelete)
+    return dict(restored)
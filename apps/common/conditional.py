@@ -0,0 +1,96 @@
+"""
+Условный GET для страниц деталей и списков: ETag / Last-Modified и ответ 304.
+
+Валидаторы страницы — одна строка значений из одного агрегатного запроса (updated_at объекта,
+последний updated_at и число дочерних строк, поля связанных строк, которые выводит страница).
+При совпадении ответ 304 отдаётся до get_object()/get_queryset(): шаблон не рендерится,
+дочерние строки не загружаются.
+"""
+import hashlib
+from calendar import timegm
+from datetime import datetime
+
+from django.contrib.messages import get_messages
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.utils.cache import get_conditional_response, patch_cache_control, quote_etag
+from django.utils.http import http_date
+
+
+def children_updated_at(model, parent_field):
+    """Подзапрос: последний updated_at дочерних строк объекта."""
+    return Subquery(
+        model.objects.filter(**{parent_field: OuterRef('pk')}).order_by()
+        .values(parent_field).annotate(latest=Max('updated_at')).values('latest')
+    )
+
+
+def children_count(model, parent_field):
+    """
+    Подзапрос: число дочерних строк объекта. Удаление строки, которая не была последней изменённой,
+    не меняет максимум updated_at — его замечает только счётчик.
+    """
+    return Subquery(
+        model.objects.filter(**{parent_field: OuterRef('pk')}).order_by()
+        .values(parent_field).annotate(rows=Count('pk')).values('rows')
+    )
+
+
+class ConditionalGetMixin:
+    """
+    Отвечает 304 Not Modified, если браузер прислал ETag или дату из предыдущего ответа, а валидаторы
+    (get_validators()) не изменились.
+
+    Last-Modified — самая поздняя дата среди валидаторов. ETag — хэш всех значений, полного пути запроса
+    (фильтры, курсор) и пользователя: шапка страницы зависит от входа. Ответ помечается private, no-cache —
+    браузер перепроверяет страницу при каждом показе, а не считает её свежей по возрасту Last-Modified.
+    """
+
+    def get_validators(self):
+        """Словарь значений, от которых зависит страница, или None (тогда запрос обрабатывается как обычно)."""
+        raise NotImplementedError
+
+    def _conditional_headers(self, request, validators):
+        dates = [value for value in validators.values() if isinstance(value, datetime)]
+        last_modified = timegm(max(dates).utctimetuple()) if dates else None
+        state = repr((request.get_full_path(), request.user.pk, sorted(validators.items())))
+        return quote_etag(hashlib.sha1(state.encode()).hexdigest()), last_modified
+
+    def get(self, request, *args, **kwargs):
+        # непоказанные сообщения есть только в полном ответе
+        if len(get_messages(request)):
+            return super().get(request, *args, **kwargs)
+
+        validators = self.get_validators()
+        if not validators:
+            return super().get(request, *args, **kwargs)
+
+        etag, last_modified = self._conditional_headers(request, validators)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+
+        if response.status_code in (200, 304):
+            response.headers.setdefault('ETag', etag)
+            if last_modified:
+                response.headers.setdefault('Last-Modified', http_date(last_modified))
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+
+class ConditionalListMixin(ConditionalGetMixin):
+    """
+    Условный GET для ListView. Валидаторы — последний updated_at и число «живых» строк модели одним
+    агрегатом: правка и создание меняют максимум, мягкое удаление (не трогает updated_at) — число строк.
+    Страница и фильтры входят в ETag через путь запроса.
+
+    related_models — модели, строки которых страница тоже выводит (названия категорий, тегов, эффектов
+    в фильтрах): их последний updated_at и число строк добавляются к валидаторам, по запросу на модель.
+    """
+    related_models = ()
+
+    def get_validators(self):
+        validators = self.model.objects.order_by().aggregate(latest=Max('updated_at'), rows=Count('pk'))
+        for model in self.related_models:
+            related = model._default_manager.order_by().aggregate(latest=Max('updated_at'), rows=Count('pk'))
+            validators.update({f'{model._meta.label}.{name}': value for name, value in related.items()})
+        return validators
@@ -0,0 +1,92 @@
+"""
+Кэш отрендеренных фрагментов страниц деталей.
+
+Фрагмент хранится под ключом модели и pk объекта вместе с «отметкой» — updated_at объекта и
+переданными шаблоном значениями (обычно updated_at дочерних строк). Несовпадение отметки — промах,
+так что изменение через save() видно сразу, даже если сигнал инвалидации не дошёл.
+Обработчики post_save/post_delete вызывают invalidate() — фрагмент удаляется из кэша.
+
+Счётчики попаданий и промахов по моделям лежат в том же кэше (общие для процессов при общем бэкенде),
+см. stats() и команду fragment_cache_stats.
+"""
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
+
+KEY_PREFIX = 'fragment'
+STATS_PREFIX = 'fragment-stats'
+
+
+def _cache():
+    return caches[getattr(settings, 'FRAGMENT_CACHE_ALIAS', 'default')]
+
+
+def fragment_key(model, pk):
+    return f'{KEY_PREFIX}:{model._meta.label_lower}:{pk}'
+
+
+def _stamp(obj, vary):
+    return (getattr(obj, 'updated_at', None), *vary)
+
+
+def _count(label, outcome):
+    cache = _cache()
+    key = f'{STATS_PREFIX}:{label}:{outcome}'
+    # add() не перезапишет счётчик, если он уже есть; incr() атомарен в memcached/redis
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # ключ вытеснили между add() и incr()
+        cache.set(key, 1, timeout=None)
+
+
+def get_or_render(obj, render, vary=()):
+    """HTML фрагмента объекта из кэша или render() с сохранением в кэш."""
+    cache = _cache()
+    key = fragment_key(type(obj), obj.pk)
+    stamp = _stamp(obj, vary)
+    label = obj._meta.label_lower
+
+    cached = cache.get(key)
+    if cached is not None and cached[0] == stamp:
+        _count(label, 'hits')
+        return cached[1]
+
+    _count(label, 'misses')
+    html = render()
+    cache.set(key, (stamp, html), timeout=getattr(settings, 'FRAGMENT_CACHE_TIMEOUT', 24 * 60 * 60))
+    return html
+
+
+def invalidate(model, *pks):
+    if pks:
+        _cache().delete_many([fragment_key(model, pk) for pk in pks])
+
+
+def _labels(labels):
+    return labels or [model._meta.label_lower for model in apps.get_models()]
+
+
+def stats(labels=None):
+    """
+    {label модели: {'hits': n, 'misses': n, 'hit_rate': доля}} для перечисленных моделей
+    (по умолчанию — для всех моделей, у которых фрагменты уже запрашивались).
+    """
+    cache = _cache()
+    labels = _labels(labels)
+    keys = [f'{STATS_PREFIX}:{label}:{outcome}' for label in labels for outcome in ('hits', 'misses')]
+    values = cache.get_many(keys)
+    result = {}
+    for label in labels:
+        hits = values.get(f'{STATS_PREFIX}:{label}:hits', 0)
+        misses = values.get(f'{STATS_PREFIX}:{label}:misses', 0)
+        if hits or misses:
+            result[label] = {'hits': hits, 'misses': misses, 'hit_rate': hits / (hits + misses)}
+    return result
+
+
+def reset_stats(labels=None):
+    _cache().delete_many([
+        f'{STATS_PREFIX}:{label}:{outcome}' for label in _labels(labels) for outcome in ('hits', 'misses')
+    ])
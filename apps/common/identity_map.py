@@ -0,0 +1,122 @@
+"""
+Карта идентичности (identity map) на время запроса.
+
+Внутри блока identity_map() GetOrNoneQuerySet.get() по первичному ключу или уникальному полю (slug)
+ходит в БД один раз: повторные обращения к тому же объекту возвращают уже загруженный экземпляр без запросов.
+Вне блока поведение менеджеров не меняется. Карта включается явно — блоком или IdentityMapMixin
+у представления, которое несколько раз получает один и тот же объект.
+
+Все получатели делят один экземпляр: правки, не дошедшие до save() (например, форма, не прошедшая
+проверку), видны следующим get() в блоке. Поэтому карту стоит включать только там, где объект читают.
+
+Записи карты сбрасываются при save()/delete() экземпляра (сигналы post_save/post_delete)
+и при массовых update()/delete() через GetOrNoneQuerySet.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.core.exceptions import EmptyResultSet, FieldDoesNotExist, ValidationError
+from django.db.models.query import ModelIterable
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+_identity_map = ContextVar('identity_map', default=None)
+
+
+@contextmanager
+def identity_map():
+    """Включает карту идентичности до конца блока. Вложенный блок использует внешнюю карту."""
+    if _identity_map.get() is not None:
+        yield
+        return
+    token = _identity_map.set({})
+    try:
+        yield
+    finally:
+        _identity_map.reset(token)
+
+
+def _lookup_field(model, name):
+    opts = model._meta
+    if name in ('pk', opts.pk.name, opts.pk.attname):
+        return opts.pk
+    try:
+        field = opts.get_field(name)
+    except FieldDoesNotExist:
+        return None
+    if field.is_relation or not getattr(field, 'unique', False):
+        return None
+    return field
+
+
+def _queryset_fingerprint(queryset):
+    # один и тот же объект, загруженный разными выборками (select_related, only, фильтры менеджера), — разные записи
+    sql, params = queryset.query.sql_with_params()
+    prefetch = tuple(getattr(lookup, 'prefetch_to', lookup) for lookup in queryset._prefetch_related_lookups)
+    return queryset.db, sql, repr(params), prefetch
+
+
+def identity_key(queryset, field, value):
+    """Ключ карты для выборки queryset.get(<field>=value) или None, если карта выключена или запрос не подходит."""
+    query = queryset.query
+    if (
+        _identity_map.get() is None
+        or queryset._iterable_class is not ModelIterable
+        or query.select_for_update
+        or query.is_sliced
+    ):
+        return None
+    try:
+        value = field.to_python(value)
+        fingerprint = _queryset_fingerprint(queryset)
+    except (EmptyResultSet, ValidationError, TypeError, ValueError):
+        return None
+    if value is None:
+        return None
+    return queryset.model._meta.label, fingerprint, field.attname, value
+
+
+def cached_get(queryset, kwargs, fetch):
+    """
+    queryset.get(**kwargs) через карту идентичности: fetch() вызывается только при промахе.
+    Найденный объект запоминается и под своим pk, и под полем поиска.
+    """
+    field = _lookup_field(queryset.model, next(iter(kwargs))) if len(kwargs) == 1 else None
+    key = identity_key(queryset, field, next(iter(kwargs.values()))) if field else None
+    if key is None:
+        return fetch()
+
+    objects = _identity_map.get()
+    obj = objects.get(key)
+    if obj is None:
+        obj = fetch()
+        objects[key] = obj
+        # тот же ключ, что построит последующий get(pk=...) той же выборки
+        pk_key = identity_key(queryset, queryset.model._meta.pk, obj.pk)
+        if pk_key is not None:
+            objects[pk_key] = obj
+    return obj
+
+
+class IdentityMapMixin:
+    """Карта идентичности на время обработки запроса представлением."""
+
+    def dispatch(self, request, *args, **kwargs):
+        with identity_map():
+            return super().dispatch(request, *args, **kwargs)
+
+
+def forget(model, pk=None):
+    """Сбрасывает записи карты для модели целиком или для одного объекта."""
+    objects = _identity_map.get()
+    if not objects:
+        return
+    label = model._meta.label
+    for key in [key for key, obj in objects.items() if key[0] == label and (pk is None or obj.pk == pk)]:
+        del objects[key]
+
+
+@receiver(post_save, dispatch_uid='common.identity_map.forget_saved')
+@receiver(post_delete, dispatch_uid='common.identity_map.forget_deleted')
+def forget_instance(sender, instance, **kwargs):
+    forget(sender, instance.pk)
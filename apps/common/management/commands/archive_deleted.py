@@ -0,0 +1,39 @@
+from datetime import timedelta
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.common.archive import ARCHIVED_MODELS, archive_deleted
+from apps.common.managers import DEFAULT_CHUNK_SIZE
+
+
+class Command(BaseCommand):
+    help = ('Переносит мягко удалённые записи старше --days в сжатые JSONL-файлы '
+            '(по файлу на модель и месяц, вместе с дочерними строками) и удаляет их из таблиц.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=90,
+                            help='Архивировать записи с deleted_at старше стольких дней (по умолчанию 90).')
+        parser.add_argument('--output', default=str(Path(settings.BASE_DIR) / 'archive'),
+                            help='Каталог архива.')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                            help='Сколько записей архивировать и удалять за одну транзакцию.')
+        parser.add_argument('--model', action='append', dest='models', metavar='APP_LABEL.MODEL',
+                            help=f'Ограничить архивацию моделью (по умолчанию: {", ".join(ARCHIVED_MODELS)}).')
+
+    def handle(self, *args, **options):
+        if options['days'] < 0 or options['chunk_size'] <= 0:
+            raise CommandError('--days должен быть >= 0, а --chunk-size > 0.')
+
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        for label in options['models'] or ARCHIVED_MODELS:
+            try:
+                model = apps.get_model(label)
+            except (LookupError, ValueError):
+                raise CommandError(f'Модель {label} не найдена.')
+
+            count = archive_deleted(model, cutoff, options['output'], options['chunk_size'])
+            self.stdout.write(self.style.SUCCESS(f'{model._meta.label}: заархивировано {count}'))
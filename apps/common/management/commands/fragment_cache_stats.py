@@ -0,0 +1,26 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from apps.common.fragment_cache import reset_stats, stats
+
+
+class Command(BaseCommand):
+    help = 'Попадания и промахи кэша фрагментов страниц деталей по моделям (apps.common.fragment_cache).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--json', action='store_true', help='Вывести JSON (для систем мониторинга).')
+        parser.add_argument('--reset', action='store_true', help='Обнулить счётчики после вывода.')
+
+    def handle(self, *args, **options):
+        result = stats()
+        if options['json']:
+            self.stdout.write(json.dumps(result))
+        elif not result:
+            self.stdout.write('Фрагменты ещё не запрашивались.')
+        else:
+            for label, row in result.items():
+                self.stdout.write(f'{label}: попаданий {row["hits"]}, промахов {row["misses"]}, '
+                                  f'доля попаданий {row["hit_rate"]:.1%}')
+        if options['reset']:
+            reset_stats()
@@ -0,0 +1,48 @@
+from datetime import timedelta
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.common.managers import DEFAULT_CHUNK_SIZE, IsDeletedQuerySet
+from apps.common.models import IsDeletedModel
+
+
+class Command(BaseCommand):
+    help = 'Окончательно удаляет мягко удалённые записи (is_deleted = true), удалённые раньше окна хранения.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30,
+                            help='Окно хранения в днях: удаляются записи с deleted_at старше (по умолчанию 30).')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                            help='Сколько строк удалять в одной транзакции.')
+        parser.add_argument('--model', action='append', dest='models', metavar='APP_LABEL.MODEL',
+                            help='Ограничить очистку моделью (можно указать несколько раз).')
+        parser.add_argument('--dry-run', action='store_true', help='Только посчитать, ничего не удаляя.')
+
+    def handle(self, *args, **options):
+        if options['days'] < 0 or options['chunk_size'] <= 0:
+            raise CommandError('--days должен быть >= 0, а --chunk-size > 0.')
+
+        older_than = timedelta(days=options['days'])
+        for model in self.get_models(options['models']):
+            # не у всех моделей менеджер IsDeletedManager (например, CustomUser), поэтому queryset собираем сами
+            queryset = IsDeletedQuerySet(model)
+            if options['dry_run']:
+                count = (queryset.filter(is_deleted=True, deleted_at__lt=timezone.now() - older_than)
+                         .without_live_dependants().count())
+                self.stdout.write(f'{model._meta.label}: будет удалено {count}')
+            else:
+                count = queryset.purge(older_than, options['chunk_size'])
+                self.stdout.write(self.style.SUCCESS(f'{model._meta.label}: удалено {count}'))
+
+    def get_models(self, labels):
+        models = [model for model in apps.get_models() if issubclass(model, IsDeletedModel)]
+        if not labels:
+            return models
+
+        by_label = {model._meta.label_lower: model for model in models}
+        try:
+            return [by_label[label.lower()] for label in labels]
+        except KeyError as error:
+            raise CommandError(f'Модель {error.args[0]} не найдена среди моделей с мягким удалением.')
@@ -0,0 +1,103 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Case, UUIDField, Value, When
+
+from apps.common.managers import DEFAULT_CHUNK_SIZE
+from apps.common.models import BaseModel
+from apps.common.utils import uuid7
+
+
+def referencing_fields(model):
+    """
+    Все колонки проекта, которые хранят первичный ключ model:
+    ForeignKey/OneToOneField любых моделей, включая автоматические таблицы ManyToManyField.
+    """
+    fields = []
+    for other in apps.get_models(include_auto_created=True):
+        for field in other._meta.concrete_fields:
+            if (
+                field.is_relation
+                and field.remote_field.model is model
+                and field.target_field == model._meta.pk
+            ):
+                fields.append(field)
+    return fields
+
+
+def rekey_chunk(model, mapping, relations):
+    """Меняет ключи пачки {старый pk: новый pk} в самой таблице и во всех ссылающихся колонках."""
+    def new_value(lookup):
+        return Case(
+            *(When(**{lookup: old}, then=Value(new)) for old, new in mapping.items()),
+            output_field=UUIDField(),
+        )
+
+    # внешние ключи Django создаёт DEFERRABLE INITIALLY DEFERRED — проверка пройдёт при коммите
+    with transaction.atomic():
+        for field in relations:
+            field.model._base_manager.filter(**{f'{field.attname}__in': mapping}).update(
+                **{field.attname: new_value(field.attname)}
+            )
+        pk = model._meta.pk.attname
+        model._base_manager.filter(pk__in=mapping).update(**{pk: new_value(pk)})
+
+
+def rekey(model, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Переписывает первичные ключи модели, которые ещё не UUIDv7, на uuid7(created_at).
+    Новые ключи повторяют порядок создания записей. Возвращает число изменённых строк.
+    """
+    relations = referencing_fields(model)
+    queryset = model._base_manager.order_by('pk').values_list('pk', 'created_at')
+    rekeyed = 0
+    last_pk = None
+    while True:
+        chunk = queryset.filter(pk__gt=last_pk) if last_pk is not None else queryset
+        rows = list(chunk[:chunk_size])
+        if not rows:
+            return rekeyed
+        last_pk = rows[-1][0]
+        # уже переписанные ключи могут снова попасть в выборку — их пропускаем по версии
+        mapping = {pk: uuid7(created_at.timestamp()) for pk, created_at in rows if pk.version != 7}
+        if mapping:
+            rekey_chunk(model, mapping, relations)
+            rekeyed += len(mapping)
+
+
+class Command(BaseCommand):
+    help = (
+        'Переписывает существующие первичные ключи BaseModel на упорядоченные по времени UUIDv7 '
+        '(по created_at) вместе со всеми внешними ключами. Запускайте после включения TIME_ORDERED_UUIDS. '
+        'Ключи вне внешних ключей не обновляются: сессии пользователей и object_id в журнале админки устареют.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                            help='Сколько строк переписывать в одной транзакции.')
+        parser.add_argument('--model', action='append', dest='models', metavar='APP_LABEL.MODEL',
+                            help='Ограничить моделью (можно указать несколько раз).')
+        parser.add_argument('--dry-run', action='store_true', help='Только посчитать, ничего не меняя.')
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] <= 0:
+            raise CommandError('--chunk-size должен быть > 0.')
+
+        for model in self.get_models(options['models']):
+            if options['dry_run']:
+                count = sum(1 for pk in model._base_manager.values_list('pk', flat=True).iterator() if pk.version != 7)
+                self.stdout.write(f'{model._meta.label}: будет переписано {count}')
+            else:
+                count = rekey(model, options['chunk_size'])
+                self.stdout.write(self.style.SUCCESS(f'{model._meta.label}: переписано {count}'))
+
+    def get_models(self, labels):
+        models = [model for model in apps.get_models() if issubclass(model, BaseModel)]
+        if not labels:
+            return models
+
+        by_label = {model._meta.label_lower: model for model in models}
+        try:
+            return [by_label[label.lower()] for label in labels]
+        except KeyError as error:
+            raise CommandError(f'Модель {error.args[0]} не найдена среди моделей с UUID-ключами.')
@@ -0,0 +1,42 @@
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.common.archive import archive_files, unarchive
+from apps.common.managers import DEFAULT_CHUNK_SIZE
+
+
+class Command(BaseCommand):
+    help = 'Восстанавливает записи из архива archive_deleted через bulk_create. Уже существующие записи пропускаются.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('files', nargs='*', help='Файлы архива. По умолчанию — все файлы каталога --input.')
+        parser.add_argument('--input', default=str(Path(settings.BASE_DIR) / 'archive'), help='Каталог архива.')
+        parser.add_argument('--model', metavar='APP_LABEL.MODEL', help='Только архивы этой модели.')
+        parser.add_argument('--month', metavar='YYYY-MM', help='Только архивы за этот месяц.')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                            help='Сколько записей восстанавливать за одну транзакцию.')
+        parser.add_argument('--undelete', action='store_true',
+                            help='Восстановить записи «живыми» (is_deleted = false), а не надгробиями.')
+
+    def handle(self, *args, **options):
+        if options['files']:
+            paths = [Path(path) for path in options['files']]
+        else:
+            try:
+                model = apps.get_model(options['model']) if options['model'] else None
+            except (LookupError, ValueError):
+                raise CommandError(f'Модель {options["model"]} не найдена.')
+            paths = archive_files(options['input'], model, options['month'])
+
+        missing = [str(path) for path in paths if not path.exists()]
+        if missing:
+            raise CommandError(f'Файлы не найдены: {", ".join(missing)}')
+
+        restored = unarchive(paths, options['batch_size'], options['undelete'])
+        for label, count in restored.items():
+            self.stdout.write(self.style.SUCCESS(f'{label}: восстановлено {count}'))
+        if not restored:
+            self.stdout.write('Нечего восстанавливать.')
@@ -1,8 +1,35 @@
-from django.db import models
+from datetime import timedelta
+
+from django.db import models, transaction
 from django.utils import timezone
 
+from apps.common.identity_map import cached_get, forget
+from apps.common.signals import is_deleted_changed
+
+# сколько первичных ключей обрабатываем в одной транзакции при массовых операциях
+DEFAULT_CHUNK_SIZE = 500
+
 
 class GetOrNoneQuerySet(models.QuerySet):
+    def get(self, *args, **kwargs):
+        # внутри identity_map() повторный get по pk/уникальному полю обслуживается без запроса
+        if args or not kwargs:
+            return super().get(*args, **kwargs)
+        return cached_get(self, kwargs, lambda: super(GetOrNoneQuerySet, self).get(**kwargs))
+
+    def update(self, **kwargs):
+        forget(self.model)
+        return super().update(**kwargs)
+
+    update.alters_data = True
+
+    def delete(self):
+        forget(self.model)
+        return super().delete()
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
     def get_or_none(self, **kwargs):
         try:
             return self.get(**kwargs)
@@ -23,8 +50,87 @@ class IsDeletedQuerySet(GetOrNoneQuerySet):
         if hard_delete:
             super().delete()
         else:
-            self.update(is_deleted=True, deleted_at=timezone.now())
+            # пачками, как soft_delete(): обработчики is_deleted_changed получают ключи строк
+            self._chunked_update(DEFAULT_CHUNK_SIZE, is_deleted=True, deleted_at=timezone.now())
+
+    def pk_chunks(self, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Отдаёт первичные ключи выборки пачками по chunk_size.
+        Пачки выбираются по ключу (pk > последний), поэтому выборка может меняться между пачками.
+        """
+        last_pk = None
+        while True:
+            queryset = self.order_by('pk')
+            if last_pk is not None:
+                queryset = queryset.filter(pk__gt=last_pk)
+            pks = list(queryset.values_list('pk', flat=True)[:chunk_size])
+            if not pks:
+                return
+            yield pks
+            last_pk = pks[-1]
 
+    def _chunked_update(self, chunk_size, **values):
+        forget(self.model)
+        updated = 0
+        base = self.model._base_manager.using(self.db)
+        for pks in self.pk_chunks(chunk_size):
+            # короткая транзакция на каждую пачку, чтобы не держать блокировки на всю выборку
+            with transaction.atomic(using=self.db):
+                updated += base.filter(pk__in=pks).update(**values)
+                if 'is_deleted' in values:
+                    is_deleted_changed.send(sender=self.model, pks=pks, is_deleted=values['is_deleted'],
+                                            using=self.db)
+        return updated
+
+    def soft_delete(self, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Мягко удаляет строки выборки пачками. Возвращает число удалённых строк."""
+        return self.filter(is_deleted=False)._chunked_update(
+            chunk_size, is_deleted=True, deleted_at=timezone.now()
+        )
+
+    def restore(self, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Восстанавливает мягко удалённые строки выборки пачками. Возвращает число восстановленных строк."""
+        return self.filter(is_deleted=True)._chunked_update(chunk_size, is_deleted=False, deleted_at=None)
+
+    def without_live_dependants(self):
+        """
+        Исключает строки, у которых есть действующие (is_deleted = false) зависимые строки моделей с мягким
+        удалением, связанные через on_delete=CASCADE: окончательное удаление унесло бы их каскадом
+        (например, статьи мягко удалённого пользователя). Дочерние строки без мягкого удаления (атаки
+        существа) — часть самой записи и удаление не блокируют.
+        """
+        queryset = self
+        for relation in self.model._meta.related_objects:
+            related = relation.related_model
+            if relation.many_to_many or relation.on_delete is not models.CASCADE:
+                continue
+            if not any(field.name == 'is_deleted' for field in related._meta.concrete_fields):
+                continue
+            live = related._base_manager.using(self.db).filter(is_deleted=False).values(relation.field.attname)
+            queryset = queryset.exclude(**{f'{relation.field.target_field.attname}__in': live})
+        return queryset
+
+    def purge(self, older_than=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Окончательно удаляет мягко удалённые строки (older_than — timedelta или datetime границы deleted_at).
+        Строки с действующими зависимыми остаются (см. without_live_dependants).
+        Каждая пачка удаляется в своей транзакции; файлы удаляются обработчиками post_delete
+        после коммита пачки (см. apps.common.utils.delete_file_on_commit).
+        Возвращает число удалённых строк самой модели (без каскада).
+        """
+        queryset = self.filter(is_deleted=True).without_live_dependants()
+        if older_than is not None:
+            cutoff = timezone.now() - older_than if isinstance(older_than, timedelta) else older_than
+            queryset = queryset.filter(deleted_at__lt=cutoff)
+
+        forget(self.model)
+        purged = 0
+        base = self.model._base_manager.using(self.db)
+        for pks in queryset.pk_chunks(chunk_size):
+            with transaction.atomic(using=self.db):
+                _, per_model = base.filter(pk__in=pks).delete()
+            purged += per_model.get(self.model._meta.label, 0)
+        return purged
 
 
 class IsDeletedManager(models.Manager):
@@ -36,4 +142,13 @@ class IsDeletedManager(models.Manager):
         return IsDeletedQuerySet(self.model, using=self._db)
 
     def hard_delete(self):
-        return self.unfiltered().delete(hard_delete=True)
\ No newline at end of file
+        return self.unfiltered().delete(hard_delete=True)
+
+    def soft_delete(self, chunk_size=DEFAULT_CHUNK_SIZE):
+        return self.get_queryset().soft_delete(chunk_size)
+
+    def restore(self, chunk_size=DEFAULT_CHUNK_SIZE):
+        return self.unfiltered().restore(chunk_size)
+
+    def purge(self, older_than=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        return self.unfiltered().purge(older_than, chunk_size)
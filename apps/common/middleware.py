@@ -0,0 +1,64 @@
+import logging
+
+from django.conf import settings
+
+from apps.common.n_plus_one import detect_n_plus_one
+from apps.common.query_budget import (
+    QueryBudgetExceeded, budget_report, capture_queries, view_label, view_query_budget,
+)
+
+logger = logging.getLogger('apps.common.query_budget')
+
+
+class QueryBudgetMiddleware:
+    """
+    Считает SQL-запросы, их время и повторы для каждого запроса и сверяет с бюджетом представления
+    (см. apps.common.query_budget). Ставьте раньше остальных middleware, чтобы учесть и их запросы.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with capture_queries() as stats:
+            response = self.get_response(request)
+
+        view = getattr(request, '_query_budget_view', None)
+        if view is None:
+            # до представления дело не дошло (404 резолвера, редирект middleware)
+            return response
+
+        budget = view_query_budget(view)
+        label = view_label(view)
+        response.query_stats, response.query_budget, response.query_view = stats, budget, label
+
+        if settings.DEBUG:
+            response['X-Query-Count'] = str(stats.count)
+            response['X-Query-Time-Ms'] = f'{stats.time * 1000:.1f}'
+            response['X-Query-Duplicates'] = str(stats.duplicate_count)
+            response['X-Query-Budget'] = str(budget)
+
+        if stats.count > budget:
+            report = budget_report(label, stats, budget)
+            if getattr(settings, 'QUERY_BUDGET_RAISE', False):
+                raise QueryBudgetExceeded(report)
+            logger.warning(report)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._query_budget_view = view_func
+
+
+class NPlusOneMiddleware:
+    """Ищет N+1 в каждом запросе (см. apps.common.n_plus_one); режим задаёт NPLUSONE_MODE."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if getattr(settings, 'NPLUSONE_MODE', 'warn') == 'off':
+            return self.get_response(request)
+        with detect_n_plus_one(label=request.path) as detector:
+            response = self.get_response(request)
+        response.n_plus_one = detector.reports
+        return response
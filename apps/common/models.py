@@ -1,21 +1,45 @@
-import uuid
 from django.utils import timezone
 
-from django.db import models
+from django.db import models, transaction, IntegrityError
+from django.db.backends.utils import names_digest
+from django.db.models.signals import class_prepared
+from django.dispatch import receiver
 
 from apps.common.managers import GetOrNoneManager, IsDeletedManager
+from apps.common.utils import unique_slugify, new_uuid
+
+# сколько раз пытаемся сохранить объект с новым слагом, если его заняли параллельно
+SLUG_SAVE_ATTEMPTS = 3
 
 
 class BaseModel(models.Model):
-    id = models.UUIDField(primary_key=True, unique=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, unique=True, default=new_uuid, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     objects = GetOrNoneManager()
 
+    # колонки, которые обычный save() существующей строки не перезаписывает (см. save())
+    derived_fields = ()
+
     class Meta:
         abstract = True
 
+    def save(self, *args, **kwargs):
+        """
+        Сохранение загруженного ранее объекта не пишет derived_fields: эти колонки обновляют set-based UPDATE
+        (урон за раунд существа, набор эффектов заклинания), и значения в экземпляре могут быть устаревшими.
+        Новый объект, в том числе копия с pk = None, записывается целиком.
+        """
+        if (self.derived_fields and not args and kwargs.get('update_fields') is None
+                and not kwargs.get('force_insert') and not self._state.adding and self.pk is not None):
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.derived_fields and field.attname not in deferred
+            ]
+        super().save(*args, **kwargs)
+
 
 class IsDeletedModel(BaseModel):
     is_deleted = models.BooleanField(default=False)
@@ -37,3 +61,81 @@ class IsDeletedModel(BaseModel):
 
     def hard_delete(self, *args, **kwargs):
         super().delete(*args, **kwargs)
+
+
+# Частичные индексы для «живых» строк: IsDeletedManager добавляет is_deleted=False к каждому запросу
+
+LIVE_ROWS = models.Q(is_deleted=False)
+
+
+def live_index_fields(model):
+    '''
+    Наборы колонок, для которых модели нужен частичный индекс WHERE is_deleted = false:
+    slug (поиск объекта по URL) и колонки Meta.ordering с pk в конце — тот же порядок, что у keyset-пагинации
+    (apps.common.pagination): ORDER BY …, pk и условие «после курсора» идут по индексу целиком.
+    '''
+    field_names = {field.name for field in model._meta.concrete_fields}
+    field_sets = []
+    if 'slug' in field_names:
+        field_sets.append(['slug'])
+
+    ordering = [
+        name for name in (model._meta.ordering or IsDeletedModel._meta.ordering)
+        if isinstance(name, str) and name.lstrip('-') in field_names and name.lstrip('-') != model._meta.pk.name
+    ]
+    if ordering:
+        field_sets.append([*ordering, model._meta.pk.name])
+    return field_sets
+
+
+def live_index_name(model, fields):
+    # имя индекса ограничено 30 символами (Oracle), поэтому таблицу и колонки усекаем и добавляем хэш
+    columns = '_'.join(name.lstrip('-') for name in fields)
+    digest = names_digest(model._meta.db_table, *fields, length=6)
+    return f'live_{model._meta.db_table[:11]}_{columns[:6]}_{digest}'
+
+
+# Обработчик подключается здесь, а не в signals.py: к ready() модели уже созданы
+@receiver(class_prepared, dispatch_uid='common.isdeletedmodel.add_live_indexes')
+def add_live_indexes(sender, **kwargs):
+    if not issubclass(sender, IsDeletedModel) or sender._meta.proxy:
+        return
+
+    existing = {index.name for index in sender._meta.indexes}
+    live_indexes = []
+    for fields in live_index_fields(sender):
+        name = live_index_name(sender, fields)
+        if name not in existing:
+            live_indexes.append(models.Index(fields=fields, condition=LIVE_ROWS, name=name))
+
+    if live_indexes:
+        sender._meta.indexes = [*sender._meta.indexes, *live_indexes]
+        # original_attrs читает автодетектор миграций
+        sender._meta.original_attrs['indexes'] = sender._meta.indexes
+
+
+class UniqueSlugMixin:
+    '''
+    Заполняет пустой slug из поля slug_source при сохранении.
+    Гонку на уникальном индексе slug обрабатывает ограниченным числом повторов, а не предварительной проверкой.
+    '''
+    slug_source = 'name'
+
+    def save(self, *args, **kwargs):
+        if self.slug:
+            return super().save(*args, **kwargs)
+
+        initial_slug = self.slug
+        for attempt in range(1, SLUG_SAVE_ATTEMPTS + 1):
+            self.slug = unique_slugify(self, getattr(self, self.slug_source))
+            try:
+                with transaction.atomic():
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                # повторяем, только если конфликт действительно по слагу
+                if attempt == SLUG_SAVE_ATTEMPTS or not self._slug_is_taken():
+                    self.slug = initial_slug
+                    raise
+
+    def _slug_is_taken(self):
+        return type(self)._base_manager.filter(slug=self.slug).exclude(pk=self.pk).exists()
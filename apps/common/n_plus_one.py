@@ -0,0 +1,151 @@
+"""
+Обнаружение N+1: ленивая загрузка одной и той же связи у многих объектов в пределах одного запроса.
+
+Django подгружает связь отдельным запросом при первом обращении (creature.category, product.tags.all),
+и в цикле шаблона это превращается в N одинаковых запросов с разными параметрами.
+Детектор перехватывает такие загрузки и, когда связь одной модели лениво загружена у NPLUSONE_THRESHOLD
+разных объектов, сообщает модель, связь и что добавить в выборку: select_related или prefetch_related.
+
+Режим NPLUSONE_MODE: 'warn' — пишет в лог apps.common.n_plus_one, 'raise' — бросает NPlusOneDetected
+(так тесты падают на новых N+1), 'off' — выключено. Включается NPlusOneMiddleware или блоком detect_n_plus_one().
+"""
+import functools
+import logging
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db.models import query
+from django.db.models.fields import related_descriptors
+
+logger = logging.getLogger('apps.common.n_plus_one')
+
+DEFAULT_THRESHOLD = 3
+
+_detector = ContextVar('n_plus_one_detector', default=None)
+# prefetch_related сам вызывает менеджеры связей для каждого объекта — это не ленивая загрузка
+_prefetching = ContextVar('n_plus_one_prefetching', default=False)
+
+
+class NPlusOneDetected(AssertionError):
+    pass
+
+
+class NPlusOneDetector:
+    def __init__(self, mode='warn', threshold=DEFAULT_THRESHOLD, label=''):
+        self.mode = mode
+        self.threshold = threshold
+        self.label = label
+        self.loaded = defaultdict(set)
+        self.reports = []
+
+    def record(self, instance, relation, method):
+        model = type(instance)
+        key = (model, relation)
+        self.loaded[key].add(instance.pk if instance.pk is not None else id(instance))
+        if len(self.loaded[key]) != self.threshold:
+            return
+
+        report = (
+            f'N+1{f" ({self.label})" if self.label else ""}: {model._meta.label}.{relation} '
+            f'загружается отдельным запросом для каждого объекта. '
+            f'Добавьте {method}(\'{relation}\') в выборку {model.__name__}.'
+        )
+        self.reports.append(report)
+        if self.mode == 'raise':
+            raise NPlusOneDetected(report)
+        logger.warning(report)
+
+
+@contextmanager
+def detect_n_plus_one(mode=None, threshold=None, label=''):
+    """Следит за ленивыми загрузками связей до конца блока. Отдаёт детектор со списком reports."""
+    detector = NPlusOneDetector(
+        mode or getattr(settings, 'NPLUSONE_MODE', 'warn'),
+        threshold or getattr(settings, 'NPLUSONE_THRESHOLD', DEFAULT_THRESHOLD),
+        label,
+    )
+    token = _detector.set(detector)
+    try:
+        yield detector
+    finally:
+        _detector.reset(token)
+
+
+def _record(instance, relation, method):
+    detector = _detector.get()
+    if detector is not None and not _prefetching.get():
+        detector.record(instance, relation, method)
+
+
+# Перехват ленивых загрузок в дескрипторах связей Django
+
+def _forward_get_object(get_object):
+    # creature.category — ForeignKey/OneToOneField без select_related
+    @functools.wraps(get_object)
+    def wrapper(self, instance):
+        _record(instance, self.field.name, 'select_related')
+        return get_object(self, instance)
+    return wrapper
+
+
+def _reverse_one_to_one_get_queryset(get_queryset):
+    # product.rating — обратная сторона OneToOneField; при prefetch instance в hints не передаётся
+    @functools.wraps(get_queryset)
+    def wrapper(self, **hints):
+        if 'instance' in hints:
+            _record(hints['instance'], self.related.get_accessor_name(), 'select_related')
+        return get_queryset(self, **hints)
+    return wrapper
+
+
+def _related_manager_factory(create_manager, relation_name):
+    # creature.attacks.all(), product.tags.all() — менеджеры обратных ForeignKey и ManyToManyField
+    @functools.wraps(create_manager)
+    def wrapper(superclass, rel, *args, **kwargs):
+        manager_class = create_manager(superclass, rel, *args, **kwargs)
+        name = relation_name(rel, *args, **kwargs)
+
+        class DetectingRelatedManager(manager_class):
+            def _apply_rel_filters(self, queryset):
+                _record(self.instance, name, 'prefetch_related')
+                return super()._apply_rel_filters(queryset)
+
+        DetectingRelatedManager.__name__ = manager_class.__name__
+        DetectingRelatedManager.__qualname__ = manager_class.__qualname__
+        return DetectingRelatedManager
+    return wrapper
+
+
+def _many_to_many_name(rel, reverse):
+    return rel.get_accessor_name() if reverse else rel.field.name
+
+
+def _prefetch_one_level(prefetch_one_level):
+    @functools.wraps(prefetch_one_level)
+    def wrapper(*args, **kwargs):
+        token = _prefetching.set(True)
+        try:
+            return prefetch_one_level(*args, **kwargs)
+        finally:
+            _prefetching.reset(token)
+    return wrapper
+
+
+def install():
+    """Подключает перехват к дескрипторам связей Django (вызывается один раз из CommonConfig.ready)."""
+    if getattr(related_descriptors, '_n_plus_one_installed', False):
+        return
+    descriptor = related_descriptors.ForwardManyToOneDescriptor
+    descriptor.get_object = _forward_get_object(descriptor.get_object)
+    descriptor = related_descriptors.ReverseOneToOneDescriptor
+    descriptor.get_queryset = _reverse_one_to_one_get_queryset(descriptor.get_queryset)
+    related_descriptors.create_reverse_many_to_one_manager = _related_manager_factory(
+        related_descriptors.create_reverse_many_to_one_manager, lambda rel: rel.get_accessor_name(),
+    )
+    related_descriptors.create_forward_many_to_many_manager = _related_manager_factory(
+        related_descriptors.create_forward_many_to_many_manager, _many_to_many_name,
+    )
+    query.prefetch_one_level = _prefetch_one_level(query.prefetch_one_level)
+    related_descriptors._n_plus_one_installed = True
@@ -0,0 +1,204 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ImproperlyConfigured, FieldDoesNotExist
+from django.db.models import Q
+from django.http import Http404
+from django.utils.functional import cached_property
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def _resolve_field(model, path):
+    if path == 'pk':
+        return model._meta.pk
+    field = None
+    for part in path.split('__'):
+        if part == 'pk':
+            return model._meta.pk
+        try:
+            field = model._meta.get_field(part)
+        except FieldDoesNotExist:
+            raise ImproperlyConfigured(f'Keyset-пагинация: неизвестное поле сортировки "{path}"')
+        if field.is_relation:
+            model = field.related_model
+    if field.is_relation:
+        raise ImproperlyConfigured(f'Keyset-пагинация: сортировка по связи "{path}" не поддерживается, укажите поле')
+    return field
+
+
+def _value_from(obj, path):
+    value = obj
+    for part in path.split('__'):
+        if value is None:
+            return None
+        value = getattr(value, part)
+    return value
+
+
+def _dump(value):
+    # datetime сохраняем целиком, с микросекундами — иначе граница страницы «поплывёт»
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return str(value)
+
+
+class KeysetPage:
+    """
+    Страница keyset-пагинации. Повторяет интерфейс django.core.paginator.Page там, где это возможно,
+    но вместо номеров страниц отдаёт непрозрачные курсоры next_cursor / previous_cursor.
+    """
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return f'<KeysetPage of {len(self.object_list)} items>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if not (self._has_next and self.object_list):
+            return None
+        return self.paginator.encode_cursor(self.object_list[-1], 'next')
+
+    @property
+    def previous_cursor(self):
+        if not (self._has_previous and self.object_list):
+            return None
+        return self.paginator.encode_cursor(self.object_list[0], 'prev')
+
+
+class KeysetPaginator:
+    """
+    Пагинация по ключу (seek method) вместо OFFSET: страница выбирается условием
+    «строго после/до последней показанной строки» по колонкам сортировки модели (Meta.ordering)
+    с pk в качестве последнего разделителя. Стоимость любой страницы одинакова; COUNT(*) выполняется,
+    только если шаблон спросит count.
+
+    Сортировка берётся из order_by() переданного queryset, иначе из Meta.ordering модели.
+    """
+
+    def __init__(self, queryset, per_page, ordering=None):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.model = queryset.model
+        self.ordering = self._build_ordering(ordering)
+        self.fields = [_resolve_field(self.model, name) for name, _ in self.ordering]
+
+    @cached_property
+    def count(self):
+        """Всего строк в выборке — отдельный COUNT(*), для страниц не нужен."""
+        return self.queryset.count()
+
+    def _build_ordering(self, ordering):
+        if ordering is None:
+            ordering = self.queryset.query.order_by or self.model._meta.ordering or ()
+        result = []
+        for item in ordering:
+            if not isinstance(item, str):
+                raise ImproperlyConfigured('Keyset-пагинация поддерживает только сортировку по именам полей')
+            descending = item.startswith('-')
+            name = item.lstrip('-')
+            if name in (self.model._meta.pk.name, 'pk'):
+                name = 'pk'
+            result.append((name, descending))
+
+        # pk гарантирует однозначный порядок при совпадающих значениях
+        if not any(name == 'pk' for name, _ in result):
+            result.append(('pk', False))
+        return result
+
+    def _order_by(self, reverse=False):
+        return [f'{"-" if descending != reverse else ""}{name}' for name, descending in self.ordering]
+
+    def _seek_condition(self, values, reverse=False):
+        condition = Q()
+        for index, (name, descending) in enumerate(self.ordering):
+            lookup = 'lt' if descending != reverse else 'gt'
+            equal = {self.ordering[i][0]: values[i] for i in range(index)}
+            condition |= Q(**equal, **{f'{name}__{lookup}': values[index]})
+        return condition
+
+    def seek(self, values, reverse=False):
+        """Выборка строк после (reverse — до) строки со значениями колонок сортировки values, в порядке страницы."""
+        return self.queryset.filter(self._seek_condition(values, reverse)).order_by(*self._order_by(reverse))
+
+    def encode_cursor(self, obj, direction):
+        payload = {'d': direction, 'v': [_dump(_value_from(obj, name)) for name, _ in self.ordering]}
+        raw = json.dumps(payload, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(raw).rstrip(b'=').decode()
+
+    def decode_cursor(self, cursor):
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            payload = json.loads(raw)
+            direction, raw_values = payload['d'], payload['v']
+        except (binascii.Error, ValueError, TypeError, KeyError):
+            raise InvalidCursor(cursor)
+
+        if direction not in ('next', 'prev') or len(raw_values) != len(self.fields):
+            raise InvalidCursor(cursor)
+        try:
+            values = [field.to_python(value) for field, value in zip(self.fields, raw_values)]
+        except Exception:
+            raise InvalidCursor(cursor)
+        return direction, values
+
+    def page(self, cursor=None):
+        if not cursor:
+            rows = list(self.queryset.order_by(*self._order_by())[:self.per_page + 1])
+            return KeysetPage(rows[:self.per_page], self, len(rows) > self.per_page, False)
+
+        direction, values = self.decode_cursor(cursor)
+        reverse = direction == 'prev'
+        rows = list(self.seek(values, reverse)[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+
+        if reverse:
+            rows.reverse()
+            return KeysetPage(rows, self, bool(rows), has_more)
+        return KeysetPage(rows, self, has_more, bool(rows))
+
+
+class KeysetPaginationMixin:
+    """
+    Подключает KeysetPaginator к ListView вместо OFFSET-пагинации Django.
+    Номер страницы заменяется курсором в GET-параметре cursor_kwarg.
+    """
+    cursor_kwarg = 'cursor'
+    keyset_ordering = None
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = KeysetPaginator(queryset, page_size, ordering=self.keyset_ordering)
+        try:
+            page = paginator.page(self.request.GET.get(self.cursor_kwarg))
+        except InvalidCursor:
+            raise Http404('Некорректный курсор страницы')
+        return paginator, page, page.object_list, page.has_other_pages()
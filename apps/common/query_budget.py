@@ -0,0 +1,103 @@
+"""
+Бюджет SQL-запросов на представление.
+
+QueryBudgetMiddleware считает запросы каждого запроса к сайту: их число, суммарное время
+и повторяющиеся запросы (одинаковый SQL с разными параметрами — типичный признак N+1).
+Бюджет объявляется атрибутом query_budget у класса представления, иначе берётся QUERY_BUDGET_DEFAULT.
+
+- в DEBUG статистика уходит в заголовки ответа X-Query-*;
+- превышение бюджета пишется в лог apps.common.query_budget;
+- с QUERY_BUDGET_RAISE = True (в тестах — декоратор enforce_query_budget) превышение роняет запрос
+  исключением QueryBudgetExceeded.
+"""
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.test import override_settings
+
+DEFAULT_QUERY_BUDGET = 30
+
+# IN (%s, %s, %s) -> IN (...), чтобы выборки по спискам разной длины давали один отпечаток
+_IN_LIST_RE = re.compile(r'IN \((?:%s, )*%s\)')
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def fingerprint(sql):
+    return _IN_LIST_RE.sub('IN (...)', sql)
+
+
+class QueryStats:
+    """Обёртка для connection.execute_wrapper(), собирающая статистику выполненных запросов."""
+
+    def __init__(self):
+        self.count = 0
+        self.time = 0.0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.time += time.perf_counter() - started
+            self.count += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    @property
+    def duplicates(self):
+        """{отпечаток SQL: сколько раз выполнен} для запросов, выполненных больше одного раза."""
+        return {sql: count for sql, count in self.fingerprints.most_common() if count > 1}
+
+    @property
+    def duplicate_count(self):
+        return sum(count - 1 for count in self.duplicates.values())
+
+
+@contextmanager
+def capture_queries():
+    """Собирает QueryStats по всем подключениям к БД до конца блока."""
+    stats = QueryStats()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(stats))
+        yield stats
+
+
+def view_query_budget(view_func):
+    """Бюджет представления: query_budget у класса (CBV) или у функции, иначе QUERY_BUDGET_DEFAULT."""
+    view = getattr(view_func, 'view_class', view_func)
+    budget = getattr(view, 'query_budget', None)
+    if budget is None:
+        budget = getattr(settings, 'QUERY_BUDGET_DEFAULT', DEFAULT_QUERY_BUDGET)
+    return budget
+
+
+def view_label(view_func):
+    view = getattr(view_func, 'view_class', view_func)
+    return f'{view.__module__}.{view.__qualname__}'
+
+
+def budget_report(label, stats, budget):
+    lines = [f'{label}: {stats.count} SQL-запросов при бюджете {budget} ({stats.time * 1000:.1f} мс)']
+    for sql, count in list(stats.duplicates.items())[:5]:
+        lines.append(f'  {count}x {sql[:300]}')
+    return '\n'.join(lines)
+
+
+def assert_query_budget(response):
+    """Проверка в тестах: ответ, прошедший через QueryBudgetMiddleware, уложился в бюджет своего представления."""
+    stats = getattr(response, 'query_stats', None)
+    assert stats is not None, 'Ответ не прошёл через QueryBudgetMiddleware'
+    if stats.count > response.query_budget:
+        raise QueryBudgetExceeded(budget_report(response.query_view, stats, response.query_budget))
+
+
+# декоратор для тестов: любой запрос тестового клиента сверх бюджета представления роняет тест
+enforce_query_budget = override_settings(QUERY_BUDGET_RAISE=True)
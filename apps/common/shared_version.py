@@ -0,0 +1,32 @@
+"""
+Номер версии данных в кэше, общий для всех процессов сайта.
+
+Процесс держит в памяти структуру, построенную из БД (автомат названий apps.wiki.autolink, индекс
+существ apps.wiki.encounters), вместе с версией, по которой она построена. Изменивший данные процесс
+увеличивает версию; остальные при следующем обращении видят новую версию и перестраивают структуру.
+
+Начало счёта случайное: после очистки кэша версия не совпадёт с той, что помнят процессы.
+"""
+import secrets
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+class SharedVersion:
+    def __init__(self, key):
+        self.key = key
+
+    @property
+    def cache(self):
+        return caches[getattr(settings, 'FRAGMENT_CACHE_ALIAS', 'default')]
+
+    def get(self):
+        return self.cache.get_or_set(self.key, secrets.randbits(48), timeout=None)
+
+    def bump(self):
+        """Новая версия. Если ключа не было (кэш очищен или вытеснен) — случайная, а не следующая."""
+        try:
+            return self.cache.incr(self.key)
+        except ValueError:
+            return self.get()
@@ -0,0 +1,6 @@
+from django.dispatch import Signal
+
+# Массовое мягкое удаление или восстановление (IsDeletedQuerySet.delete(), soft_delete(), restore()) меняет строки
+# одним UPDATE на пачку, без post_save. Сигнал отправляется внутри транзакции каждой пачки:
+# sender — модель, pks — ключи пачки, is_deleted — новое значение, using — база.
+is_deleted_changed = Signal()
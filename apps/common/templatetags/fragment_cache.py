@@ -0,0 +1,34 @@
+from django import template
+
+from apps.common.fragment_cache import get_or_render
+
+register = template.Library()
+
+
+class CachedFragmentNode(template.Node):
+    def __init__(self, nodelist, obj, vary):
+        self.nodelist = nodelist
+        self.obj = obj
+        self.vary = vary
+
+    def render(self, context):
+        obj = self.obj.resolve(context)
+        vary = [value.resolve(context) for value in self.vary]
+        return get_or_render(obj, lambda: self.nodelist.render(context), vary)
+
+
+@register.tag
+def cachedfragment(parser, token):
+    """
+    {% cachedfragment object [значение ...] %} ... {% endcachedfragment %}
+
+    Кэширует содержимое блока для объекта (см. apps.common.fragment_cache). Фрагмент считается
+    актуальным, пока совпадают object.updated_at и перечисленные значения. Внутрь блока не кладут ничего,
+    что зависит от пользователя или запроса. Ленивые выборки внутри блока при попадании не выполняются.
+    """
+    bits = token.split_contents()
+    if len(bits) < 2:
+        raise template.TemplateSyntaxError(f'{bits[0]}: нужен объект, для которого кэшируется фрагмент')
+    nodelist = parser.parse(('endcachedfragment',))
+    parser.delete_first_token()
+    return CachedFragmentNode(nodelist, parser.compile_filter(bits[1]), [parser.compile_filter(bit) for bit in bits[2:]])
@@ -0,0 +1,61 @@
+import pytest
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.views import View
+
+from apps.common.identity_map import IdentityMapMixin, identity_map
+from apps.wiki.models import Creature
+
+pytestmark = pytest.mark.django_db
+
+
+def test_repeated_lookups_hit_the_database_once(creature_factory, django_assert_num_queries):
+    creature = creature_factory(name="Wolf")
+
+    with identity_map():
+        with django_assert_num_queries(1):
+            by_slug = Creature.objects.get(slug=creature.slug)
+            again = Creature.objects.get(slug=creature.slug)
+            by_pk = Creature.objects.get(pk=str(creature.pk))
+
+    assert by_slug is again is by_pk
+
+def test_lookups_outside_identity_map_are_not_cached(creature_factory, django_assert_num_queries):
+    creature = creature_factory(name="Wolf")
+    with django_assert_num_queries(2):
+        Creature.objects.get(slug=creature.slug)
+        Creature.objects.get(slug=creature.slug)
+
+def test_map_is_opt_in_per_view(creature_factory, django_assert_num_queries):
+    creature = creature_factory(name="Wolf")
+
+    class LookupView(View):
+        def get(self, request):
+            Creature.objects.get(slug=creature.slug)
+            Creature.objects.get(pk=creature.pk)
+            return HttpResponse()
+
+    class MappedLookupView(IdentityMapMixin, LookupView):
+        pass
+
+    request = RequestFactory().get("/")
+    with django_assert_num_queries(2):
+        LookupView.as_view()(request)
+    with django_assert_num_queries(1):
+        MappedLookupView.as_view()(request)
+
+def test_save_and_bulk_update_invalidate(creature_factory, django_assert_num_queries):
+    creature = creature_factory(name="Wolf")
+
+    with identity_map():
+        cached = Creature.objects.get(pk=creature.pk)
+        creature.health = 99
+        creature.save()
+        assert Creature.objects.get(pk=creature.pk) is not cached
+
+        Creature.objects.filter(pk=creature.pk).update(health=1)
+        assert Creature.objects.get(pk=creature.pk).health == 1
+
+        Creature.objects.get(pk=creature.pk).delete()
+        with pytest.raises(Creature.DoesNotExist):
+            Creature.objects.get(pk=creature.pk)
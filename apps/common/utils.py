@@ -1,19 +1,202 @@
-from uuid import uuid4
+import os
+import shutil
+import time
+import uuid
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial, reduce
+from operator import or_
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
 from pytils.translit import slugify
 
-def unique_slugify(instance, slug, slug_field):
+# маски полей версии и варианта UUID (RFC 9562)
+_UUID_VERSION_MASK = 0xF << 76
+_UUID_VARIANT_MASK = 0x3 << 62
+
+
+def uuid7(timestamp=None):
+    """
+    UUID версии 7 (RFC 9562): старшие 48 бит — миллисекунды Unix-времени, остальное — случайные биты.
+    Ключи, выданные позже, больше по значению, поэтому вставки идут в «правый край» индекса.
+    timestamp (секунды, как time.time()) позволяет построить ключ для уже существующей строки по created_at.
+    """
+    milliseconds = int((time.time() if timestamp is None else timestamp) * 1000) & ((1 << 48) - 1)
+    value = milliseconds << 80 | int.from_bytes(os.urandom(10), 'big')
+    value = value & ~_UUID_VERSION_MASK | 0x7 << 76
+    value = value & ~_UUID_VARIANT_MASK | 0x2 << 62
+    return uuid.UUID(int=value)
+
+
+def new_uuid():
+    """
+    Значение по умолчанию для первичных ключей BaseModel.
+    UUIDv7 включается настройкой TIME_ORDERED_UUIDS = True, иначе — случайный uuid4, как раньше.
+    """
+    if getattr(settings, 'TIME_ORDERED_UUIDS', False):
+        return uuid7()
+    return uuid.uuid4()
+
+
+# сколько символов оставляем под числовой суффикс (-2, -3, ... -9999999) при усечении слага
+SLUG_SUFFIX_RESERVE = 8
+
+# сколько префиксов объединяем в один запрос при массовой генерации слагов
+BULK_SLUG_PREFIXES_PER_QUERY = 200
+
+
+def slug_max_length(model):
+    return model._meta.get_field('slug').max_length or 50
+
+
+def taken_slugs(model, prefix, exclude_pk=None):
+    """
+    Возвращает множество занятых слагов с общим префиксом — один запрос по индексу slug.
+    _base_manager учитывает и мягко удалённые записи: уникальный индекс в БД распространяется и на них.
+    """
+    queryset = model._base_manager.filter(slug__startswith=prefix)
+    if exclude_pk is not None:
+        queryset = queryset.exclude(pk=exclude_pk)
+    return set(queryset.values_list('slug', flat=True))
+
+
+def taken_slugs_for_prefixes(model, prefixes, batch_size=BULK_SLUG_PREFIXES_PER_QUERY, exact=()):
+    """
+    То же, что taken_slugs, но для множества префиксов: один запрос на каждые batch_size префиксов.
+    exact — слаги, которые проверяются точным совпадением (IN по уникальному индексу) в тех же запросах.
+    """
+    prefixes = sorted(set(prefixes))
+    exact = sorted(set(exact))
+    taken = set()
+    for start in range(0, max(len(prefixes), len(exact)), batch_size):
+        conditions = [Q(slug__startswith=prefix) for prefix in prefixes[start:start + batch_size]]
+        if exact[start:start + batch_size]:
+            conditions.append(Q(slug__in=exact[start:start + batch_size]))
+        taken.update(model._base_manager.filter(reduce(or_, conditions)).values_list('slug', flat=True))
+    return taken
+
+
+def _free_slug(base_slug, taken, max_length, number=1):
+    candidate = base_slug[:max_length]
+    if number > 1:
+        suffix = f'-{number}'
+        candidate = f'{base_slug[:max_length - len(suffix)]}{suffix}'
+    while candidate in taken:
+        number += 1
+        suffix = f'-{number}'
+        candidate = f'{base_slug[:max_length - len(suffix)]}{suffix}'
+    return candidate, number
+
+
+def pick_free_slug(base_slug, taken, max_length):
+    """
+    Подбирает свободный слаг в памяти: base, base-2, base-3, ...
+    При необходимости усекает base так, чтобы слаг с суффиксом уместился в max_length.
     """
-    Создает слаг объекта, гарантируя уникальность и читаемость
+    return _free_slug(base_slug, taken, max_length)[0]
+
+
+def unique_slugify(instance, slug, slug_field=None):
+    """
+    Создает слаг объекта, гарантируя уникальность и читаемость.
+    Все занятые слаги с тем же префиксом выбираются одним запросом, суффикс подбирается в памяти.
 
     """
     model = instance.__class__
-    base_slug = slugify(slug_field if slug_field else slug)
-    unique_slug = base_slug
+    max_length = slug_max_length(model)
+    base_slug = slugify(slug_field if slug_field else slug) or model._meta.model_name
+    prefix = base_slug[:max_length - SLUG_SUFFIX_RESERVE]
+
+    taken = taken_slugs(model, prefix, exclude_pk=instance.pk)
+    return pick_free_slug(base_slug, taken, max_length)
+
+
+def bulk_unique_slugify(instances, batch_size=BULK_SLUG_PREFIXES_PER_QUERY):
+    """
+    Заполняет пустые слаги у списка несохранённых объектов на месте — например, перед bulk_create.
+    Коллизии разрешаются и с БД, и внутри самой пачки; уже заданные слаги пачки считаются занятыми.
+    Источник слага берётся из slug_source модели (см. UniqueSlugMixin).
+
+    bulk_create не повторяет вставку при гонке за слаг: IntegrityError обрабатывает вызывающий код.
+    """
+    by_model = defaultdict(list)
+    for instance in instances:
+        by_model[type(instance)].append(instance)
+
+    for model, group in by_model.items():
+        max_length = slug_max_length(model)
+        taken = set()
+        pending = []
+        for instance in group:
+            if instance.slug:
+                taken.add(instance.slug)
+            else:
+                source = getattr(instance, getattr(instance, 'slug_source', 'name'))
+                pending.append((instance, slugify(source) or model._meta.model_name))
+
+        # Поиск по префиксу (LIKE, в SQLite — полный просмотр таблицы) нужен только тем base, которым придётся
+        # подбирать суффикс: повторяющимся в пачке или уже занятым. Остальные проверяются точным совпадением
+        # по уникальному индексу в тех же запросах; base, занятые только в БД, дочитываются вторым запросом.
+        candidates = Counter(base_slug[:max_length] for _, base_slug in pending)
+        crowded = {
+            base_slug[:max_length - SLUG_SUFFIX_RESERVE] for _, base_slug in pending
+            if base_slug[:max_length] in taken or candidates[base_slug[:max_length]] > 1
+        }
+        taken |= taken_slugs_for_prefixes(model, crowded, batch_size, exact=candidates)
+        taken |= taken_slugs_for_prefixes(model, {
+            base_slug[:max_length - SLUG_SUFFIX_RESERVE] for _, base_slug in pending
+            if base_slug[:max_length] in taken
+        } - crowded, batch_size)
 
-    while model.objects.filter(slug=unique_slug).exists():
-        unique_slug = f'{base_slug}-{uuid4().hex[:4]}'
-    return unique_slug
+        # последний занятый номер для каждого base, чтобы одинаковые имена не перебирать с начала
+        last_number = {}
+        for instance, base_slug in pending:
+            instance.slug, last_number[base_slug] = _free_slug(
+                base_slug, taken, max_length, last_number.get(base_slug, 1)
+            )
+            taken.add(instance.slug)
 
+    return instances
 
 
+# Файлы в media: удаляем только после коммита, чтобы откат транзакции не оставил записи без файлов
+
+_keep_media_files = ContextVar('keep_media_files', default=False)
+
+
+@contextmanager
+def keep_media_files():
+    """
+    Внутри блока обработчики удаления не трогают файлы в media —
+    например, при архивации записей, которые потом можно восстановить.
+    """
+    token = _keep_media_files.set(True)
+    try:
+        yield
+    finally:
+        _keep_media_files.reset(token)
+
+
+def delete_file(path):
+    try:
+        if path and os.path.exists(path):
+            os.remove(path)
+    except OSError:
+        pass
+
+
+def delete_file_on_commit(path, using=None):
+    """
+    Откладывает удаление файла до коммита текущей транзакции (вне транзакции удаляет сразу).
+    При массовом удалении (IsDeletedQuerySet.purge) файлы всей пачки удаляются разом после её коммита.
+    """
+    if path and not _keep_media_files.get():
+        transaction.on_commit(partial(delete_file, path), using=using)
+
 
+def delete_dir_on_commit(path, using=None):
+    if not _keep_media_files.get():
+        transaction.on_commit(partial(shutil.rmtree, str(path), ignore_errors=True), using=using)
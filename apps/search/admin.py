@@ -0,0 +1,27 @@
+from apps.search.index import search_pks
+
+# больше совпадений индекс в админке не отдаёт — тогда поиск идёт прежним icontains
+ADMIN_SEARCH_LIMIT = 1000
+
+
+class SearchIndexAdminMixin:
+    """
+    Поиск в списке объектов админки через поисковый индекс вместо icontains по search_fields.
+    search_fields у ModelAdmin всё равно нужен — без него Django не показывает строку поиска.
+    Мягко удалённых записей в индексе нет: при фильтре по удалённым, как и когда совпадений больше
+    ADMIN_SEARCH_LIMIT, поиск идёт обычным icontains по search_fields.
+    """
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip() or self._lists_deleted(request):
+            return super().get_search_results(request, queryset, search_term)
+        pks = search_pks(self.model, search_term, limit=ADMIN_SEARCH_LIMIT + 1)
+        if len(pks) > ADMIN_SEARCH_LIMIT:
+            return super().get_search_results(request, queryset, search_term)
+        return queryset.filter(pk__in=pks), False
+
+    @staticmethod
+    def _lists_deleted(request):
+        # фильтр is_deleted списка: is_deleted__exact=1 (только удалённые) или любой, кроме «только живые»
+        values = [value for key, value in request.GET.items() if key.startswith('is_deleted')]
+        return any(value not in ('0', 'False', 'false') for value in values)
@@ -0,0 +1,190 @@
+"""
+Хранилища терминов поискового индекса.
+
+Fts5Backend — виртуальная таблица SQLite FTS5 (search_fts) с колонками title/body и встроенным bm25().
+PythonBackend — таблица SearchPosting и BM25, посчитанный в Python; работает на любой БД.
+Выбор — настройка SEARCH_BACKEND: 'auto' (FTS5, если доступен), 'fts5' или 'python'.
+"""
+import math
+from collections import Counter, defaultdict
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Avg, Count, Q
+
+from apps.search.models import SearchDocument, SearchPosting
+
+FTS_TABLE = 'search_fts'
+FTS_VOCAB_TABLE = 'search_fts_vocab'
+
+# во сколько раз совпадение в заголовке весомее совпадения в тексте
+TITLE_WEIGHT = 3
+
+# параметры BM25 — те же, что у bm25() в FTS5
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# сколько вариантов термина берём для префиксного поиска в PythonBackend
+PREFIX_EXPANSIONS = 50
+
+
+
+@lru_cache(maxsize=None)
+def fts5_available():
+    # таблицу создаёт миграция search.0002, если SQLite собран с FTS5
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+        return cursor.fetchone() is not None
+
+
+class Fts5Backend:
+    name = 'fts5'
+
+    def index(self, entries):
+        """entries — [(id документа, термины заголовка, термины текста)]."""
+        with connection.cursor() as cursor:
+            self._delete(cursor, [document_id for document_id, _, _ in entries])
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, title, body) VALUES (%s, %s, %s)',
+                [(document_id, ' '.join(title), ' '.join(body)) for document_id, title, body in entries],
+            )
+
+    def remove(self, document_ids):
+        with connection.cursor() as cursor:
+            self._delete(cursor, document_ids)
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+
+    @staticmethod
+    def _delete(cursor, document_ids):
+        if document_ids:
+            placeholders = ', '.join(['%s'] * len(document_ids))
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})', list(document_ids))
+
+    @staticmethod
+    def _document_counts(cursor, phrases):
+        """
+        Сколько документов содержит каждую фразу запроса (для префикса — оценка сверху).
+        Один запрос к fts5vocab; поиск по term в нём идёт по b-дереву словаря.
+        """
+        parts, params = [], []
+        for phrase in phrases:
+            term = phrase.strip('"*')
+            if phrase.endswith('*'):
+                parts.append(f'SELECT COALESCE(SUM(doc), 0) FROM {FTS_VOCAB_TABLE} WHERE term >= %s AND term < %s')
+                params.extend([term, term[:-1] + chr(ord(term[-1]) + 1)])
+            else:
+                parts.append(f'SELECT COALESCE(SUM(doc), 0) FROM {FTS_VOCAB_TABLE} WHERE term = %s')
+                params.append(term)
+        cursor.execute(' UNION ALL '.join(parts), params)
+        return [count for count, in cursor.fetchall()]
+
+    def search(self, terms, prefix=False, kinds=None, limit=20):
+        """
+        [(id документа, очки)] по убыванию релевантности; все термины обязательны.
+        Если задана настройка SEARCH_RANK_LIMIT и даже самый редкий термин запроса встречается в большем
+        числе документов, bm25() считается только для первых SEARCH_RANK_LIMIT совпадений.
+        """
+        if not terms:
+            return []
+        phrases = [f'"{term}"' for term in terms]
+        if prefix:
+            phrases[-1] += '*'
+        rank_limit = getattr(settings, 'SEARCH_RANK_LIMIT', None)
+
+        with connection.cursor() as cursor:
+            capped = rank_limit is not None and min(self._document_counts(cursor, phrases)) > rank_limit
+            params = [' '.join(phrases)]
+
+            where = [f'{FTS_TABLE} MATCH %s']
+            join = ''
+            if kinds:
+                join = f' JOIN {SearchDocument._meta.db_table} d ON d.id = f.rowid'
+                where.append(f'd.kind IN ({", ".join(["%s"] * len(kinds))})')
+                params.extend(kinds)
+            sql = (
+                f'SELECT f.rowid, -bm25({FTS_TABLE}, {TITLE_WEIGHT}.0, 1.0) AS score FROM {FTS_TABLE} f{join}'
+                f' WHERE {" AND ".join(where)}'
+            )
+            if capped:
+                # без ORDER BY FTS5 отдаёт совпадения потоком и останавливается на LIMIT
+                sql = f'SELECT rowid, score FROM ({sql} LIMIT {int(rank_limit)})'
+            sql += ' ORDER BY score DESC LIMIT %s'
+            params.append(limit)
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+
+class PythonBackend:
+    name = 'python'
+
+    def index(self, entries):
+        SearchPosting.objects.filter(document_id__in=[document_id for document_id, _, _ in entries]).delete()
+        postings = []
+        for document_id, title, body in entries:
+            frequencies = Counter(body)
+            for term in title:
+                frequencies[term] += TITLE_WEIGHT
+            postings.extend(
+                SearchPosting(term=term, document_id=document_id, frequency=frequency)
+                for term, frequency in frequencies.items()
+            )
+        SearchPosting.objects.bulk_create(postings, batch_size=1000)
+
+    def remove(self, document_ids):
+        SearchPosting.objects.filter(document_id__in=document_ids).delete()
+
+    def clear(self):
+        SearchPosting.objects.all().delete()
+
+    def search(self, terms, prefix=False, kinds=None, limit=20):
+        if not terms:
+            return []
+        exact = terms[:-1] if prefix else terms
+        condition = Q(term__in=exact)
+        expansions = {term: term for term in exact}
+        if prefix:
+            # последний термин — все известные термины с этим префиксом (самые частые)
+            expanded = list(
+                SearchPosting.objects.filter(term__startswith=terms[-1])
+                .values('term').annotate(n=Count('id')).order_by('-n').values_list('term', flat=True)
+                [:PREFIX_EXPANSIONS]
+            )
+            condition |= Q(term__in=expanded)
+            expansions.update({term: terms[-1] for term in expanded})
+
+        postings = SearchPosting.objects.filter(condition)
+        if kinds:
+            postings = postings.filter(document__kind__in=kinds)
+        stats = SearchDocument.objects.aggregate(total=Count('id'), average=Avg('length'))
+        total, average = stats['total'] or 0, stats['average'] or 1
+
+        rows = list(postings.values_list('term', 'document_id', 'frequency', 'document__length'))
+        document_frequency = Counter(term for term, _, _, _ in rows)
+
+        scores = defaultdict(float)
+        matched = defaultdict(set)
+        for term, document_id, frequency, length in rows:
+            idf = math.log(1 + (total - document_frequency[term] + 0.5) / (document_frequency[term] + 0.5))
+            norm = frequency + BM25_K1 * (1 - BM25_B + BM25_B * length / average)
+            scores[document_id] += idf * frequency * (BM25_K1 + 1) / norm
+            matched[document_id].add(expansions[term])
+
+        required = len(terms)
+        ranked = [
+            (document_id, score) for document_id, score in scores.items() if len(matched[document_id]) == required
+        ]
+        ranked.sort(key=lambda item: (-item[1], item[0]))
+        return ranked[:limit]
+
+
+def get_backend():
+    name = getattr(settings, 'SEARCH_BACKEND', 'auto')
+    if name == 'auto':
+        name = 'fts5' if fts5_available() else 'python'
+    return Fts5Backend() if name == 'fts5' else PythonBackend()
@@ -0,0 +1,203 @@
+"""
+Что и как попадает в поисковый индекс.
+
+SOURCES описывает индексируемые модели: тип документа, заголовок, тексты и ссылку.
+Существа индексируются вместе с атаками и пассивками, заклинания — с категорией и эффектами.
+Изменения дочерних моделей переиндексируют родителя (см. apps.search.signals).
+"""
+from collections import defaultdict
+from contextvars import ContextVar
+from functools import partial
+
+from django.apps import apps
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.urls import reverse
+
+from apps.common.managers import DEFAULT_CHUNK_SIZE
+from apps.search.backends import TITLE_WEIGHT, get_backend
+from apps.search.models import SearchDocument
+from apps.search.text import query_terms, terms
+
+SUMMARY_LENGTH = 200
+
+
+class Source:
+    """Описание индексируемой модели."""
+
+    def __init__(self, kind, title, texts, url=None, prefetch=()):
+        self.kind = kind
+        self.title = title
+        self.texts = texts
+        self.url = url
+        self.prefetch = prefetch
+
+
+def _detail_url(name):
+    return lambda obj: reverse(name, kwargs={'slug': obj.slug}) if obj.slug else ''
+
+
+def _creature_texts(creature):
+    texts = [creature.description, creature.category.name, creature.skills]
+    for item in [*creature.attacks.all(), *creature.passives.all()]:
+        texts.extend((item.name, item.text))
+    return texts
+
+
+def _spell_texts(spell):
+    texts = [spell.description, spell.category.name]
+    for link in spell.spelleffectlink_set.all():
+        texts.extend((link.effect.name, link.note))
+    return texts
+
+
+SOURCES = {
+    'wiki.Post': Source(
+        'post', lambda post: post.title, lambda post: [post.text], _detail_url('wiki:post_detail'),
+    ),
+    'wiki.News': Source(
+        'news', lambda news: news.title, lambda news: [news.text], lambda news: reverse('wiki:home_page'),
+    ),
+    'wiki.Creature': Source(
+        'creature', lambda creature: creature.name, _creature_texts, _detail_url('wiki:creature_detail'),
+        prefetch=('category', 'attacks', 'passives'),
+    ),
+    'wiki.Spell': Source(
+        'spell', lambda spell: spell.name, _spell_texts, _detail_url('wiki:spell_detail'),
+        prefetch=('category', 'spelleffectlink_set__effect'),
+    ),
+    'wiki.SpellEffect': Source(
+        'effect', lambda effect: effect.name, lambda effect: [effect.text],
+    ),
+}
+
+KINDS = {
+    'post': 'Статьи',
+    'news': 'Новости',
+    'creature': 'Существа',
+    'spell': 'Заклинания',
+    'effect': 'Эффекты заклинаний',
+}
+
+
+def source_for(model):
+    return SOURCES.get(model._meta.label)
+
+
+def _live(model):
+    # мягко удалённые записи в поиск не попадают
+    queryset = model._base_manager.all()
+    if any(field.name == 'is_deleted' for field in model._meta.concrete_fields):
+        queryset = queryset.filter(is_deleted=False)
+    return queryset
+
+
+def _document(source, content_type, obj):
+    title = source.title(obj)
+    texts = [text for text in source.texts(obj) if text]
+    title_terms = terms(title)
+    body_terms = terms(' '.join(texts))
+    document = SearchDocument(
+        content_type=content_type,
+        object_id=str(obj.pk),
+        kind=source.kind,
+        title=title[:200],
+        url=source.url(obj) if source.url else '',
+        summary=(texts[0] if texts else '')[:SUMMARY_LENGTH],
+        length=len(body_terms) + TITLE_WEIGHT * len(title_terms),
+    )
+    return document, title_terms, body_terms
+
+
+def index_objects(model, pks):
+    """Переиндексирует объекты модели по первичным ключам; удалённые и мягко удалённые убирает из индекса."""
+    source = source_for(model)
+    if source is None or not pks:
+        return
+    content_type = ContentType.objects.get_for_model(model)
+    objects = list(_live(model).filter(pk__in=pks).prefetch_related(*source.prefetch))
+    built = [_document(source, content_type, obj) for obj in objects]
+    backend = get_backend()
+
+    with transaction.atomic():
+        stale = SearchDocument.objects.filter(content_type=content_type, object_id__in=[str(pk) for pk in pks])
+        backend.remove(list(stale.values_list('id', flat=True)))
+        stale.delete()
+        documents = SearchDocument.objects.bulk_create([document for document, _, _ in built])
+        backend.index([
+            (document.id, title_terms, body_terms)
+            for document, (_, title_terms, body_terms) in zip(documents, built)
+        ])
+
+
+def rebuild(models=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Полная переиндексация. Возвращает {label модели: число документов}."""
+    labels = [model._meta.label for model in models] if models else list(SOURCES)
+    counts = {}
+    for label in labels:
+        model = apps.get_model(label)
+        content_type = ContentType.objects.get_for_model(model)
+        backend = get_backend()
+        with transaction.atomic():
+            stale = SearchDocument.objects.filter(content_type=content_type)
+            backend.remove(list(stale.values_list('id', flat=True)))
+            stale.delete()
+        pks = list(_live(model).order_by('pk').values_list('pk', flat=True))
+        for start in range(0, len(pks), chunk_size):
+            index_objects(model, pks[start:start + chunk_size])
+        counts[label] = len(pks)
+    return counts
+
+
+# Отложенная индексация: одна переиндексация объекта на транзакцию, после коммита
+
+_pending = ContextVar('search_pending', default=None)
+
+
+def _flush(using):
+    pending = _pending.get()
+    if not pending:
+        return
+    batch = dict(pending)
+    pending.clear()
+    for model, pks in batch.items():
+        index_objects(model, list(pks))
+
+
+def schedule(model, pk, using=None):
+    """Ставит объект в очередь на переиндексацию после коммита текущей транзакции."""
+    pending = _pending.get()
+    if pending is None:
+        pending = defaultdict(set)
+        _pending.set(pending)
+    pending[model].add(pk)
+    # первый сработавший после коммита обработчик индексирует всю очередь, остальные ничего не делают
+    transaction.on_commit(partial(_flush, using), using=using)
+
+
+class SearchResult:
+    def __init__(self, document, score):
+        self.document = document
+        self.score = score
+        self.kind_label = KINDS.get(document.kind, document.kind)
+
+    def __getattr__(self, name):
+        return getattr(self.document, name)
+
+
+def search(query, kinds=None, limit=20):
+    """Документы по запросу в порядке BM25. Все слова запроса обязательны, последнее — по префиксу."""
+    words, prefix = query_terms(query)
+    ranked = get_backend().search(words, prefix=prefix, kinds=kinds, limit=limit)
+    documents = SearchDocument.objects.in_bulk([document_id for document_id, _ in ranked])
+    return [
+        SearchResult(documents[document_id], score) for document_id, score in ranked if document_id in documents
+    ]
+
+
+def search_pks(model, query, limit=1000):
+    """Первичные ключи объектов модели, найденных по запросу (для поиска в админке)."""
+    source = source_for(model)
+    if source is None:
+        return []
+    return [result.object_id for result in search(query, kinds=[source.kind], limit=limit)]
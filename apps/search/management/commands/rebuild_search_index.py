@@ -0,0 +1,35 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.common.managers import DEFAULT_CHUNK_SIZE
+from apps.search.backends import get_backend
+from apps.search.index import SOURCES, rebuild
+
+
+class Command(BaseCommand):
+    help = (
+        'Перестраивает поисковый индекс вики. Нужен после первого развёртывания, загрузки фикстур '
+        'и массовых update() в обход сигналов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', action='append', dest='models', metavar='APP_LABEL.MODEL',
+                            help='Перестроить только документы модели (можно указать несколько раз).')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                            help='Сколько объектов индексировать за один проход.')
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] <= 0:
+            raise CommandError('--chunk-size должен быть > 0.')
+
+        models = None
+        if options['models']:
+            by_label = {label.lower(): label for label in SOURCES}
+            try:
+                models = [apps.get_model(by_label[label.lower()]) for label in options['models']]
+            except KeyError as error:
+                raise CommandError(f'Модель {error.args[0]} не индексируется. Доступны: {", ".join(SOURCES)}.')
+
+        self.stdout.write(f'Бэкенд поиска: {get_backend().name}')
+        for label, count in rebuild(models, options['chunk_size']).items():
+            self.stdout.write(self.style.SUCCESS(f'{label}: проиндексировано {count}'))
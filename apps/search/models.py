@@ -0,0 +1,48 @@
+from django.contrib.contenttypes.models import ContentType
+from django.db import models
+
+
+class SearchDocument(models.Model):
+    """
+    Запись поискового индекса: один проиндексированный объект вики (статья, существо, заклинание...).
+    Термины документа хранит бэкенд: таблица FTS5 (rowid = id документа) или SearchPosting.
+    """
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.CharField(max_length=36)
+    kind = models.CharField('Тип', max_length=20)
+    title = models.CharField('Заголовок', max_length=200)
+    url = models.CharField('Ссылка', max_length=300, blank=True)
+    summary = models.TextField('Фрагмент текста', blank=True)
+    # длина документа в терминах с учётом веса заголовка (для BM25)
+    length = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Документ поиска'
+        verbose_name_plural = 'Документы поиска'
+        constraints = [
+            models.UniqueConstraint(fields=['content_type', 'object_id'], name='search_document_object'),
+        ]
+        indexes = [
+            models.Index(fields=['kind'], name='search_document_kind'),
+        ]
+
+    def __str__(self):
+        return self.title
+
+
+class SearchPosting(models.Model):
+    """Инвертированный индекс для бэкенда без FTS5: термин -> документ с частотой термина в нём."""
+    term = models.CharField(max_length=40)
+    document = models.ForeignKey(SearchDocument, on_delete=models.CASCADE, related_name='postings')
+    frequency = models.PositiveIntegerField()
+
+    class Meta:
+        verbose_name = 'Вхождение термина'
+        verbose_name_plural = 'Вхождения терминов'
+        constraints = [
+            models.UniqueConstraint(fields=['term', 'document'], name='search_posting_term_document'),
+        ]
+
+    def __str__(self):
+        return f'{self.term} -> {self.document_id}'
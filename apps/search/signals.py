@@ -0,0 +1,48 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.common.signals import is_deleted_changed
+from apps.search.index import SOURCES, schedule
+
+# дочерние модели, чей текст входит в документ родителя: модель -> поле со ссылкой на родителя
+PARENT_FIELDS = {
+    'wiki.CreatureAttack': 'creature',
+    'wiki.CreaturePassive': 'creature',
+    'wiki.SpellEffectLink': 'spell',
+}
+
+
+def _reindex(sender, instance, using):
+    label = sender._meta.label
+    if label in SOURCES:
+        schedule(sender, instance.pk, using)
+        if label == 'wiki.SpellEffect' and instance.pk is not None:
+            # название эффекта входит в документы заклинаний с этим эффектом
+            for spell in instance.spells.all():
+                schedule(type(spell), spell.pk, using)
+    elif label in PARENT_FIELDS:
+        field = sender._meta.get_field(PARENT_FIELDS[label])
+        parent_pk = getattr(instance, field.attname)
+        if parent_pk is not None:
+            schedule(field.related_model, parent_pk, using)
+
+
+@receiver(post_save, dispatch_uid='search.reindex_on_save')
+def reindex_on_save(sender, instance, using, raw=False, **kwargs):
+    # raw — загрузка фикстур: индекс строится потом командой rebuild_search_index
+    if not raw:
+        _reindex(sender, instance, using)
+
+
+@receiver(post_delete, dispatch_uid='search.reindex_on_delete')
+def reindex_on_delete(sender, instance, using, **kwargs):
+    _reindex(sender, instance, using)
+
+
+@receiver(is_deleted_changed, dispatch_uid='search.reindex_on_bulk_delete')
+def reindex_on_bulk_delete(sender, pks, using, **kwargs):
+    # массовое мягкое удаление и восстановление идут без post_save: мягко удалённые уходят из индекса
+    # при переиндексации, восстановленные возвращаются
+    if sender._meta.label in SOURCES:
+        for pk in pks:
+            schedule(sender, pk, using)
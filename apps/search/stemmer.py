@@ -0,0 +1,120 @@
+"""
+Стеммер русского языка — алгоритм Snowball (Russian stemming algorithm, snowballstem.org).
+Отрезает окончания и суффиксы, чтобы разные формы слова («гоблины», «гоблинов», «гоблину») давали одну основу.
+"""
+import re
+
+VOWELS = 'аеиоуыэюя'
+
+PERFECTIVE_GERUND_1 = ('вшись', 'вши', 'в')  # после а/я
+PERFECTIVE_GERUND_2 = ('ывшись', 'ившись', 'ывши', 'ивши', 'ыв', 'ив')
+
+REFLEXIVE = ('ся', 'сь')
+
+ADJECTIVE = (
+    'ими', 'ыми', 'его', 'ого', 'ему', 'ому',
+    'ее', 'ие', 'ые', 'ое', 'ей', 'ий', 'ый', 'ой', 'ем', 'им', 'ым', 'ом',
+    'их', 'ых', 'ую', 'юю', 'ая', 'яя', 'ою', 'ею',
+)
+PARTICIPLE_1 = ('ем', 'нн', 'вш', 'ющ', 'щ')  # после а/я
+PARTICIPLE_2 = ('ивш', 'ывш', 'ующ')
+
+VERB_1 = ('ете', 'йте', 'ешь', 'нно', 'ла', 'на', 'ли', 'ем', 'ло', 'но', 'ет', 'ют', 'ны', 'ть', 'й', 'л', 'н')  # после а/я
+VERB_2 = (
+    'ейте', 'уйте', 'ила', 'ыла', 'ена', 'ите', 'или', 'ыли', 'ило', 'ыло', 'ено', 'ует', 'уют', 'ены', 'ить',
+    'ыть', 'ишь', 'ей', 'уй', 'ил', 'ыл', 'им', 'ым', 'ен', 'ят', 'ит', 'ыт', 'ую', 'ю',
+)
+
+NOUN = (
+    'иями', 'ями', 'ами', 'ией', 'иям', 'ием', 'иях', 'ев', 'ов', 'ие', 'ье', 'еи', 'ии', 'ей', 'ой', 'ий',
+    'ям', 'ем', 'ам', 'ом', 'ах', 'ях', 'ию', 'ью', 'ия', 'ья', 'а', 'е', 'и', 'й', 'о', 'у', 'ы', 'ь', 'ю', 'я',
+)
+
+SUPERLATIVE = ('ейше', 'ейш')
+DERIVATIONAL = ('ость', 'ост')
+
+_CYRILLIC_WORD = re.compile('^[а-я]+$')
+
+
+def _regions(word):
+    """Начала областей RV и R2 (см. описание алгоритма)."""
+    rv = r1 = r2 = len(word)
+    for i, char in enumerate(word):
+        if char in VOWELS:
+            rv = i + 1
+            break
+    for i in range(1, len(word)):
+        if word[i - 1] in VOWELS and word[i] not in VOWELS:
+            r1 = i + 1
+            break
+    for i in range(r1 + 1, len(word)):
+        if word[i - 1] in VOWELS and word[i] not in VOWELS:
+            r2 = i + 1
+            break
+    return rv, r2
+
+
+def _strip(word, start, suffixes, after_a=False):
+    """Отрезает самый длинный подходящий суффикс, целиком лежащий в области [start:]. None — не найден."""
+    for suffix in sorted(suffixes, key=len, reverse=True):
+        if not word.endswith(suffix):
+            continue
+        position = len(word) - len(suffix)
+        if position < start:
+            continue
+        if after_a:
+            # суффикс группы 1 должен идти после «а» или «я», которые тоже лежат в RV
+            if position - 1 < start or word[position - 1] not in 'ая':
+                continue
+        return word[:position]
+    return None
+
+
+def _strip_grouped(word, start, group_1, group_2):
+    # из двух групп выбирается самое длинное совпадение
+    candidates = [
+        stripped for stripped in (_strip(word, start, group_1, after_a=True), _strip(word, start, group_2))
+        if stripped is not None
+    ]
+    return min(candidates, key=len) if candidates else None
+
+
+def stem(word):
+    word = word.lower().replace('ё', 'е')
+    if not _CYRILLIC_WORD.match(word):
+        return word
+    rv, r2 = _regions(word)
+
+    # шаг 1
+    stripped = _strip_grouped(word, rv, PERFECTIVE_GERUND_1, PERFECTIVE_GERUND_2)
+    if stripped is not None:
+        word = stripped
+    else:
+        word = _strip(word, rv, REFLEXIVE) or word
+        stripped = _strip(word, rv, ADJECTIVE)
+        if stripped is not None:
+            word = _strip_grouped(stripped, rv, PARTICIPLE_1, PARTICIPLE_2) or stripped
+        else:
+            stripped = _strip_grouped(word, rv, VERB_1, VERB_2)
+            if stripped is None:
+                stripped = _strip(word, rv, NOUN)
+            if stripped is not None:
+                word = stripped
+
+    # шаг 2
+    if word.endswith('и') and len(word) - 1 >= rv:
+        word = word[:-1]
+
+    # шаг 3
+    word = _strip(word, r2, DERIVATIONAL) or word
+
+    # шаг 4
+    if word.endswith('нн') and len(word) - 2 >= rv:
+        word = word[:-1]
+    else:
+        stripped = _strip(word, rv, SUPERLATIVE)
+        if stripped is not None:
+            word = stripped[:-1] if stripped.endswith('нн') else stripped
+        elif word.endswith('ь') and len(word) - 1 >= rv:
+            word = word[:-1]
+    return word
@@ -0,0 +1,135 @@
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from model_bakery import baker
+
+from apps.search.index import search
+from apps.search.stemmer import stem
+from apps.search.text import normalize_word, query_terms
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(params=["fts5", "python"])
+def backend(request, settings):
+    settings.SEARCH_BACKEND = request.param
+    return request.param
+
+
+@pytest.fixture
+def indexed(django_capture_on_commit_callbacks):
+    """Выполняет отложенную индексацию сразу после блока, как после коммита."""
+    return lambda: django_capture_on_commit_callbacks(execute=True)
+
+
+def test_russian_stemming():
+    assert stem("гоблинов") == stem("гоблины") == "гоблин"
+    assert stem("заклинания") == stem("заклинание")
+
+def test_terms_are_transliteration_insensitive():
+    assert normalize_word("Гоблинов") == normalize_word("goblin") == "goblin"
+    assert normalize_word("Эльф") == normalize_word("elf")
+
+def test_last_query_word_is_prefix_until_space():
+    assert query_terms("огненный гобл") == (["ognen", "gobl"], True)
+    assert query_terms("огненный гоблин ") == (["ognen", "goblin"], False)
+
+def test_creature_is_found_by_attack_text_and_transliteration(backend, indexed, creature_factory):
+    with indexed():
+        goblin = creature_factory(name="Гоблин", description="Мелкий и злобный.")
+        baker.make("wiki.CreatureAttack", creature=goblin, name="Укус", text="Огненное дыхание")
+        creature_factory(name="Тролль", description="Большой.")
+
+    assert [result.title for result in search("огненного")] == ["Гоблин"]
+    assert [result.title for result in search("goblin")] == ["Гоблин"]
+    assert [result.title for result in search("гобл")] == ["Гоблин"]
+    assert search("огненный тролль") == []
+
+def test_title_match_ranks_above_body_match(backend, indexed):
+    with indexed():
+        baker.make("wiki.Post", title="О драконах", text="Длинная статья про всех существ.", slug=None)
+        baker.make("wiki.Post", title="Бестиарий", text="Среди прочих упоминается дракон.", slug=None)
+
+    results = search("дракон")
+    assert [result.title for result in results] == ["О драконах", "Бестиарий"]
+    assert results[0].score > results[1].score
+
+def test_deleted_objects_leave_the_index(backend, indexed, creature_factory):
+    with indexed():
+        wolf = creature_factory(name="Волк")
+    with indexed():
+        wolf.delete()  # мягкое удаление
+
+    assert search("волк") == []
+
+def test_bulk_soft_delete_and_restore_update_the_index(backend, indexed, creature_factory):
+    from apps.wiki.models import Creature
+
+    with indexed():
+        creature_factory(name="Волк")
+    with indexed():
+        Creature.objects.filter(name="Волк").delete()
+    assert search("волк") == []
+
+    with indexed():
+        Creature.objects.restore()
+    assert [result.title for result in search("волк")] == ["Волк"]
+
+def test_kind_filter_and_rebuild_command(backend, creature_factory):
+    creature_factory(name="Дракон")
+    baker.make("wiki.Spell", name="Драконье пламя", slug=None)
+    call_command("rebuild_search_index")
+
+    assert {result.kind for result in search("дракон")} == {"creature", "spell"}
+    assert [result.kind for result in search("дракон", kinds=["spell"])] == ["spell"]
+
+def test_search_view(client, backend, indexed, creature_factory):
+    with indexed():
+        creature = creature_factory(name="Гоблин")
+
+    response = client.get(reverse("search:search"), {"q": "гоблин", "type": "creature"})
+
+    assert response.status_code == 200
+    assert [result.url for result in response.context["results"]] == [
+        reverse("wiki:creature_detail", kwargs={"slug": creature.slug})
+    ]
+
+def test_frequent_terms_stay_required(settings, indexed):
+    settings.SEARCH_BACKEND = "fts5"
+    with indexed():
+        baker.make("wiki.Post", title="Дракон", text="Про дракона.", slug=None)
+        baker.make("wiki.Post", title="Рыцарь", text="Про рыцаря.", slug=None)
+        baker.make("wiki.Post", title="Турнир", text="Про рыцаря.", slug=None)
+    settings.SEARCH_RANK_LIMIT = 1
+
+    # «рыцарь» есть в двух документах, но из запроса не выбрасывается
+    assert search("рыцарь дракон ") == []
+    # запрос только из частых терминов ранжирует первые SEARCH_RANK_LIMIT совпадений
+    assert len(search("рыцарь ")) == 1
+    settings.SEARCH_RANK_LIMIT = None
+    assert len(search("рыцарь ")) == 2
+
+def test_admin_search_falls_back_for_deleted_rows_and_broad_queries(indexed, creature_factory, monkeypatch):
+    from django.contrib import admin
+    from django.test import RequestFactory
+
+    from apps.search import admin as search_admin
+    from apps.wiki.models import Creature
+
+    with indexed():
+        wolf = creature_factory(name="Волк")
+        creature_factory(name="Волколак")
+    with indexed():
+        wolf.delete()
+    model_admin = admin.site._registry[Creature]
+    queryset = Creature.objects.unfiltered()
+
+    def found(**params):
+        request = RequestFactory().get("/", params)
+        results, _ = model_admin.get_search_results(request, queryset, "Волк")
+        return set(results.values_list("name", flat=True))
+
+    assert found() == {"Волколак"}
+    assert found(is_deleted__exact="1") == {"Волк", "Волколак"}
+    monkeypatch.setattr(search_admin, "ADMIN_SEARCH_LIMIT", 0)
+    assert found() == {"Волк", "Волколак"}
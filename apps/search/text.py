@@ -0,0 +1,68 @@
+"""
+Нормализация текста для поискового индекса.
+
+Каждое слово приводится к «термину»: нижний регистр, ё -> е, основа по русскому стеммеру (Snowball),
+затем транслитерация в латиницу. Латинские слова сначала переводятся в кириллицу (detranslify),
+чтобы пройти тот же стеммер, — так «гоблинов», «гоблин» и «goblin» дают один термин goblin.
+Индекс и запросы используют одну и ту же функцию, поэтому неточность обратной транслитерации не мешает совпадению.
+"""
+import re
+from functools import lru_cache
+
+from pytils.translit import detranslify, translify
+
+from apps.search.stemmer import stem
+
+_WORD_RE = re.compile(r'[^\W_]+')
+_CYRILLIC_RE = re.compile('[а-яё]')
+_NOT_TERM_CHAR_RE = re.compile('[^a-z0-9]')
+
+# разные схемы транслитерации одного звука сводим к одному написанию
+_LATIN_FOLDS = (
+    (re.compile('shch|sch'), 'sh'),
+    (re.compile('kh'), 'h'),
+    (re.compile('j'), 'y'),
+)
+
+# длиннее — уже не слово, а мусор (base64, ссылки), в индекс не берём
+MAX_TERM_LENGTH = 40
+
+
+@lru_cache(maxsize=100_000)
+def normalize_word(word):
+    """Термин для одного слова или пустая строка, если слово не индексируется."""
+    word = word.lower().replace('ё', 'е')
+    if word.isdigit():
+        return word
+    try:
+        if not _CYRILLIC_RE.search(word):
+            word = detranslify(word)
+        term = translify(stem(word))
+    except ValueError:
+        # символы вне кириллицы и латиницы (греческие, CJK...) — оставляем слово как есть
+        return word[:MAX_TERM_LENGTH]
+    term = _NOT_TERM_CHAR_RE.sub('', term.lower())
+    for pattern, replacement in _LATIN_FOLDS:
+        term = pattern.sub(replacement, term)
+    return term[:MAX_TERM_LENGTH]
+
+
+def terms(text):
+    """Термины текста в порядке следования (с повторами)."""
+    if not text:
+        return []
+    return [term for term in map(normalize_word, _WORD_RE.findall(text)) if term]
+
+
+def query_terms(query):
+    """
+    Термины поискового запроса без повторов и признак префиксного поиска для последнего:
+    пока пользователь дописывает слово («гобл»), последний термин ищется по префиксу.
+    """
+    words = terms(query)
+    unique = list(dict.fromkeys(words))
+    prefix = bool(unique) and bool(query) and not query[-1].isspace()
+    if prefix and unique[-1] != words[-1]:
+        # последнее слово уже встречалось раньше — префикс не нужен
+        prefix = False
+    return unique, prefix
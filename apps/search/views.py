@@ -0,0 +1,24 @@
+from django.views.generic import TemplateView
+
+from apps.search.index import KINDS, search
+
+# сколько результатов показываем на странице поиска
+SEARCH_RESULTS = 30
+MAX_QUERY_LENGTH = 200
+
+
+class SearchView(TemplateView):
+    template_name = 'search/search.html'
+    extra_context = {'title': 'Поиск', 'kinds': KINDS}
+    query_budget = 5
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        query = self.request.GET.get('q', '').strip()[:MAX_QUERY_LENGTH]
+        selected = [kind for kind in self.request.GET.getlist('type') if kind in KINDS]
+        context.update({
+            'query': query,
+            'selected_kinds': selected,
+            'results': search(query, kinds=selected, limit=SEARCH_RESULTS) if query else [],
+        })
+        return context
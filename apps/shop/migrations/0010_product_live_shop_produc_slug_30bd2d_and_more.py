@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:06
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0009_remove_productreview_unique_user_review_per_product_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['slug'], name='live_shop_produc_slug_30bd2d'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['name'], name='live_shop_produc_name_b8d5e9'),
+        ),
+        migrations.AddIndex(
+            model_name='productreview',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['-created_at'], name='live_shop_produc_create_63af82'),
+        ),
+    ]
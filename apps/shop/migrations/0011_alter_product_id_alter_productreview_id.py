@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:11
+
+import apps.common.utils
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0010_product_live_shop_produc_slug_30bd2d_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='product',
+            name='id',
+            field=models.UUIDField(default=apps.common.utils.new_uuid, editable=False, primary_key=True, serialize=False, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='productreview',
+            name='id',
+            field=models.UUIDField(default=apps.common.utils.new_uuid, editable=False, primary_key=True, serialize=False, unique=True),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0011_alter_product_id_alter_productreview_id'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='product',
+            name='live_shop_produc_name_b8d5e9',
+        ),
+        migrations.RemoveIndex(
+            model_name='productreview',
+            name='live_shop_produc_create_63af82',
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['name', 'id'], name='live_shop_produc_name_i_fca8e0'),
+        ),
+        migrations.AddIndex(
+            model_name='productreview',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['-created_at', 'id'], name='live_shop_produc_create_af574e'),
+        ),
+    ]
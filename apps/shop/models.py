@@ -5,13 +5,14 @@ from django.db import models
 from django.db.models import Q
 from django.urls import reverse
 
-from apps.common.models import IsDeletedModel
-from apps.common.utils import unique_slugify
+from apps.common.models import IsDeletedModel, UniqueSlugMixin
 
 
-class ProductCategory(models.Model):
+class ProductCategory(UniqueSlugMixin, models.Model):
     name = models.CharField('Категория', max_length=100)
     slug = models.SlugField('URL категории', max_length=100, unique=True, null=False, blank=False)
+    # отметка для условного GET списков, которые выводят названия (apps.common.conditional)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ('name',)
@@ -21,28 +22,20 @@ class ProductCategory(models.Model):
     def __str__(self):
         return self.name
 
-    def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = unique_slugify(self, self.name, self.slug)
-        super().save(*args, **kwargs)
 
-
-class ProductTag(models.Model):
+class ProductTag(UniqueSlugMixin, models.Model):
     name = models.CharField('Тег', max_length=40)
     slug = models.SlugField('URL тега', max_length=50, unique=True, null=True, blank=True)
+    # отметка для условного GET списков, которые выводят названия (apps.common.conditional)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ('name',)
         verbose_name = 'Тег товаров'
         verbose_name_plural = 'Теги товаров'
 
-    def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = unique_slugify(self, self.name, self.slug)
-        super().save(*args, **kwargs)
-
 
-class Product(IsDeletedModel):
+class Product(UniqueSlugMixin, IsDeletedModel):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True)
     name = models.CharField('Название товара', max_length=100)
     slug = models.SlugField('URL товара', max_length=100, unique=True, null=False, blank=False)
@@ -69,11 +62,6 @@ class Product(IsDeletedModel):
     def get_absolute_url(self):
         return reverse('shop:product_detail', kwargs={'slug': self.slug})
 
-    def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = unique_slugify(self, self.name, self.slug)
-        super().save(*args, **kwargs)
-
 
 def product_image_upload_to(instance, filename):
     return f'shop/products/{instance.product.slug}/{filename}'
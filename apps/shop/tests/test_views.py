@@ -0,0 +1,30 @@
+import pytest
+from django.urls import reverse
+from model_bakery import baker
+
+pytestmark = pytest.mark.django_db
+
+
+def test_product_list_shows_total_count_across_pages(client):
+    baker.make("shop.Product", slug=None, price=10, prom_price=5, quantity=1, _quantity=14)
+
+    response = client.get(reverse("shop:product_list"))
+
+    assert len(response.context["products"]) == 12
+    assert "Всего: 14" in response.content.decode()
+
+
+def test_product_list_etag_changes_after_tag_rename(client):
+    tag = baker.make("shop.ProductTag", name="Кубики", slug=None)
+    product = baker.make("shop.Product", slug=None, price=10, prom_price=5, quantity=1)
+    product.tags.add(tag)
+    url = reverse("shop:product_list")
+    etag = client.get(url)["ETag"]
+    assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+    tag.name = "Кости"
+    tag.save()
+
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert "Кости" in response.content.decode()
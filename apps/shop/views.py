@@ -1,10 +1,9 @@
 import json
 
 from django.contrib import messages
-from django.core.paginator import Paginator
 from django.db import transaction, IntegrityError
 from django.db.models import F
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, Http404
 from django.shortcuts import render, redirect
 from django.urls import reverse_lazy
 from django.utils.decorators import method_decorator
@@ -12,24 +11,68 @@ from django.views import View
 from django.views.decorators.http import require_POST
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
 
+from apps.common.conditional import ConditionalGetMixin, ConditionalListMixin, children_count, children_updated_at
+from apps.common.pagination import KeysetPaginationMixin, KeysetPaginator, InvalidCursor
 from apps.shop.forms import ProductForm, ProductImageFormset, ProductReviewForm
-from apps.shop.models import Product, ProductRating, ProductVote, ProductReview
+from apps.shop.models import Product, ProductCategory, ProductRating, ProductTag, ProductVote, ProductReview
 
 
-class ProductListView(ListView):
+REVIEWS_PER_PAGE = 10
+
+
+def reviews_page(product, cursor):
+    """
+    Страница отзывов товара по курсору (keyset-пагинация по -created_at, pk).
+    """
+    queryset = (ProductReview.objects
+                .filter(product=product)
+                .select_related('user')
+                .only('id', 'text', 'created_at', 'user', 'user__id'))
+    try:
+        page = KeysetPaginator(queryset, REVIEWS_PER_PAGE).page(cursor)
+    except InvalidCursor:
+        raise Http404('Некорректный курсор страницы')
+    # шаблон отзыва строит ссылку через review.product — товар уже загружен
+    for review in page:
+        review.product = product
+    return page
+
+
+class ProductListView(ConditionalListMixin, KeysetPaginationMixin, ListView):
     model = Product
     context_object_name = 'products'
     template_name = 'shop/product_list.html'
     extra_context = {'title': 'Страница просмотра товаров'}
+    paginate_by = 12
+    # карточка выводит названия категории и тегов; изображения и теги товара меняет форма товара,
+    # а она обновляет updated_at самого товара
+    related_models = (ProductCategory, ProductTag)
+    query_budget = 9
 
+    def get_queryset(self):
+        # карточка товара выводит категорию, первое изображение и теги
+        return super().get_queryset().select_related('category').prefetch_related('images', 'tags')
 
-class ProductDetailView(DetailView):
+
+class ProductDetailView(ConditionalGetMixin, DetailView):
     model = Product
     context_object_name = 'product'
     template_name = 'shop/product_detail.html'
+    query_budget = 12
+
+    def get_validators(self):
+        # изображения и теги меняются только формой товара, а она обновляет updated_at самого товара
+        return Product.objects.filter(slug=self.kwargs['slug']).values(
+            'updated_at', 'category__name', 'rating__up_count', 'rating__down_count',
+            reviews_updated_at=children_updated_at(ProductReview, 'product'),
+            review_count=children_count(ProductReview, 'product'),
+        ).first()
+
+    def get_queryset(self):
+        return Product.objects.select_related('category').prefetch_related('images', 'tags')
 
     def get_object(self, *args, **kwargs):
-        return Product.objects.get(slug=self.kwargs['slug'])
+        return self.get_queryset().get(slug=self.kwargs['slug'])
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -39,11 +82,7 @@ class ProductDetailView(DetailView):
         ProductRating.objects.get_or_create(product=self.object)
 
         # первая страница отзывов
-        queryset = (ProductReview.objects
-                    .filter(product=self.object)
-                    .select_related('user')
-                    .only('id', 'text', 'created_at', 'user', 'user__id'))
-        page = Paginator(queryset, 10).get_page(self.request.GET.get('page', 1))
+        page = reviews_page(self.object, self.request.GET.get('cursor'))
 
         context.update({
             'can_edit': bool(user.is_authenticated and (user.is_staff or self.object.user == user)),
@@ -58,6 +97,7 @@ class ProductCreateView(CreateView):
     model = Product
     form_class = ProductForm
     template_name = 'shop/product_form.html'
+    query_budget = 20
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -97,6 +137,7 @@ class ProductUpdateView(UpdateView):
     model = Product
     form_class = ProductForm
     template_name = 'shop/product_form.html'
+    query_budget = 20
     # авто-поиск object по slug
     slug_field = 'slug'
     slug_url_kwarg = 'slug'
@@ -140,6 +181,7 @@ class ProductDeleteView(DeleteView):
     template_name = 'shop/product_confirm_delete.html'
     extra_context = {'title': 'Удаление товара'}
     success_url = reverse_lazy('shop:product_list')
+    query_budget = 8
 
     def get_object(self, *args, **kwargs):
         return Product.objects.get(slug=self.kwargs['slug'])
@@ -155,6 +197,7 @@ class ProductVoteView(View):
         либо JSON, либо редирект на product_detail (PRG).
     """
     http_method_names = ['post']
+    query_budget = 15
 
     def post(self, request, slug):
         # 1) авторизация
@@ -247,6 +290,7 @@ class ProductVoteView(View):
 
 @method_decorator(require_POST, name='dispatch')
 class ProductReviewCreateView(CreateView):
+    query_budget = 10
     def post(self, request, slug):
         # проверка авторизации
         if not request.user.is_authenticated:
@@ -283,17 +327,10 @@ class ProductReviewCreateView(CreateView):
 
 
 class ProductReviewListView(ListView):
+    query_budget = 6
     def get(self, request, slug):
         product = Product.objects.get(slug=slug)
-        page_num = request.GET.get('page', 1)
-
-        queryset = (ProductReview.objects
-                    .filter(product=product)
-                    .select_related('user')
-                    .only('pk', 'text', 'created_at', 'user', 'user__pk'))
-
-        paginator = Paginator(queryset, 10)
-        page = paginator.get_page(page_num)
+        page = reviews_page(product, request.GET.get('cursor'))
 
         # Возвращаем только элементы + “кнопку ещё” как OOB-фрагмент
         return render(request, 'shop/partials/_review_items.html', {
@@ -303,6 +340,7 @@ class ProductReviewListView(ListView):
 
 @method_decorator(require_POST, name='dispatch')
 class ProductReviewDeleteView(View):
+    query_budget = 8
     def post(self, request, slug, pk):
         product = Product.objects.get(slug=slug)
         review = ProductReview.objects.get(pk=pk, product=product)
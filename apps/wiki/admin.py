@@ -1,11 +1,20 @@
-from django.contrib import admin
+import csv
+import io
+
+from django.contrib import admin, messages
 from django.contrib.admin.widgets import AdminTextareaWidget
 from django.db import models
 from django import forms
 from django.db.models import Count
 from django.forms import Textarea
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
 from django.utils.safestring import mark_safe
 
+from apps.search.admin import SearchIndexAdminMixin
+from apps.wiki.forms import BaseSpellEffectLinkFormSet, EffectChoiceField, WikiImportForm
+from apps.wiki.importer import ImportFormatError, format_for, import_wiki
 from apps.wiki.models import Post, Creature, CreatureAttack, CreaturePassive, CreatureCategory, Spell, SpellEffect, \
     SpellCategory, SpellEffectLink, PostCategory, News
 
@@ -15,7 +24,7 @@ class PostCategoryForm(admin.ModelAdmin):
     list_display = ("name", "slug")
 
 @admin.register(Post)
-class PostAdmin(admin.ModelAdmin):
+class PostAdmin(SearchIndexAdminMixin, admin.ModelAdmin):
     list_display = ('title', 'author', 'text', 'created_at')
     search_fields = ('title', 'text')
     list_filter = ('author', 'is_deleted')
@@ -42,7 +51,7 @@ class PostAdmin(admin.ModelAdmin):
 
 
 @admin.register(News)
-class NewsAdmin(admin.ModelAdmin):
+class NewsAdmin(SearchIndexAdminMixin, admin.ModelAdmin):
     list_display = ('title', 'slug', 'created_at')
     search_fields = ('title', 'text')
     readonly_fields = ('created_at', 'updated_at', 'is_deleted', 'deleted_at')
@@ -65,6 +74,57 @@ class NewsAdmin(admin.ModelAdmin):
 
 
 
+# Импорт из файла: кнопка «Импорт» над списком существ и заклинаний
+
+# сколько отклонённых строк показываем на странице отчёта, остальные только считаем
+IMPORT_REPORT_ROWS = 200
+
+
+class WikiImportAdminMixin:
+    change_list_template = 'admin/wiki/change_list_import.html'
+    import_kind = None
+
+    def get_urls(self):
+        info = self.model._meta.app_label, self.model._meta.model_name
+        return [
+            path('import/', self.admin_site.admin_view(self.import_view), name='%s_%s_import' % info),
+        ] + super().get_urls()
+
+    def import_view(self, request):
+        if not self.has_add_permission(request):
+            return redirect('admin:index')
+
+        form = WikiImportForm(request.POST or None, request.FILES or None, initial={'kind': self.import_kind})
+        errors = []
+        result = None
+        if request.method == 'POST' and form.is_valid():
+            upload = form.cleaned_data['file']
+
+            def on_error(number, row_errors):
+                if len(errors) < IMPORT_REPORT_ROWS:
+                    errors.append((number, row_errors))
+
+            try:
+                lines = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+                result = import_wiki(lines, format_for(upload.name), form.cleaned_data['kind'], on_error=on_error)
+            except (ImportFormatError, UnicodeDecodeError, csv.Error) as error:
+                form.add_error('file', str(error))
+            else:
+                messages.success(request, f'Импортировано существ: {result.created["creature"]}, '
+                                          f'заклинаний: {result.created["spell"]}, отклонено: {result.failed}')
+                if not result.failed:
+                    return redirect(f'admin:{self.model._meta.app_label}_{self.model._meta.model_name}_changelist')
+
+        return TemplateResponse(request, 'admin/wiki/import.html', {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': f'Импорт: {self.model._meta.verbose_name_plural}',
+            'form': form,
+            'result': result,
+            'errors': errors,
+        })
+
+
 # CREATURE
 @admin.register(CreatureCategory)
 class CreatureCategoryAdmin(admin.ModelAdmin):
@@ -99,10 +159,12 @@ class CreaturePassiveInline(admin.StackedInline):
     }
 
 @admin.register(Creature)
-class CreatureAdmin(admin.ModelAdmin):
+class CreatureAdmin(WikiImportAdminMixin, SearchIndexAdminMixin, admin.ModelAdmin):
+    import_kind = 'creature'
     # Отображение колонок в списке существ
     list_display = (
-        "preview_image", "name", "image", "category", "dangerous_level", "attacks_counter", "passives_counter", "is_deleted"
+        "preview_image", "name", "image", "category", "dangerous_level", "damage_per_round", "attacks_counter",
+        "passives_counter", "is_deleted"
     )
     list_select_related = ("category",) # предотвращение N+1 по CreatureCategory
     search_fields = ("name", "description",)
@@ -162,7 +224,8 @@ class CreatureAdmin(admin.ModelAdmin):
 
 @admin.register(CreatureAttack)
 class CreatureAttackAdmin(admin.ModelAdmin):
-    list_display = ("name", "creature", "text")
+    list_display = ("name", "creature", "text", "to_hit", "reach", "damage_dice", "damage_type", "average_damage")
+    list_filter = ("damage_type",)
     list_select_related = ("creature",)
     search_fields = ("name", "text", "creature__name")
     autocomplete_fields = ("creature",)
@@ -181,20 +244,31 @@ class CreaturePassiveAdmin(admin.ModelAdmin):
 
 class SpellEffectInline(admin.TabularInline):
     model = SpellEffectLink
+    formset = BaseSpellEffectLinkFormSet
     extra = 0
     min_num = 0
     autocomplete_fields = ("effect",)
     fields = ("effect", "note",)
+    # копия текста эффекта (apps.wiki.effect_notes), правка здесь всё равно перезаписалась бы
+    readonly_fields = ("note",)
     can_delete = True
     ordering = ("pk",)
 
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        # эффекты всех строк загружаются формсетом одним запросом
+        if db_field.name == "effect":
+            kwargs["form_class"] = EffectChoiceField
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
 
 @admin.register(Spell)
-class SpellAdmin(admin.ModelAdmin):
-    list_display = ("preview_image", "name", "category", "spell_level")
+class SpellAdmin(WikiImportAdminMixin, SearchIndexAdminMixin, admin.ModelAdmin):
+    import_kind = 'spell'
+    list_display = ("preview_image", "name", "category", "level")
     list_select_related = ("category",)
     search_fields = ("name", "description",)
-    list_filter = ("category", "spell_level")
+    # числовой уровень: фильтр и сортировка идут по индексу (category, level, name), заговор — 0
+    list_filter = ("category", "level")
 
     autocomplete_fields = ("category",)
     save_on_top = True
@@ -235,7 +309,7 @@ class SpellCategoryAdmin(admin.ModelAdmin):
     preview_image.short_description = "Превью"
 
 @admin.register(SpellEffect)
-class SpellEffectAdmin(admin.ModelAdmin):
+class SpellEffectAdmin(SearchIndexAdminMixin, admin.ModelAdmin):
     list_display = ("name",)
     search_fields = ("name",)
 
@@ -0,0 +1,174 @@
+"""
+Разбор текста атаки существа (CreatureAttack.text) в колонки.
+
+Текст в духе справочника, например:
+
+    Рукопашная атака оружием: +5 к попаданию, досягаемость 5 фт., одна цель.
+    Попадание: 10 (2d6 + 3) рубящего урона плюс 3 (1d6) урона огнём.
+
+даёт to_hit=5, reach=5, targets=1, damage_dice='2d6+3, 1d6', damage_type='slashing' (тип первой
+составляющей) и average_damage=13.5 (сумма средних всех составляющих). Кости пишутся латинской d или
+кириллической к/д; дистанция — «дистанция 80/320 фт.». Чего в тексте нет, остаётся пустым (None, '', 0).
+
+Колонки заполняет CreatureAttack.save(), у существа — Creature.damage_per_round: наибольший средний урон
+среди атак (существо совершает одну атаку действием; мультиатака не разбирается). Его пересчитывают
+обработчики apps.wiki.signals, а после массовых операций в обход сигналов — команда parse_attacks.
+"""
+import re
+
+from django.db import transaction
+from django.db.models import F, Max, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Now
+
+from apps.common.managers import DEFAULT_CHUNK_SIZE
+
+DAMAGE_TYPE_CHOICES = (
+    ('slashing', 'Рубящий'),
+    ('piercing', 'Колющий'),
+    ('bludgeoning', 'Дробящий'),
+    ('fire', 'Огонь'),
+    ('cold', 'Холод'),
+    ('poison', 'Яд'),
+    ('acid', 'Кислота'),
+    ('lightning', 'Электричество'),
+    ('thunder', 'Звук'),
+    ('radiant', 'Излучение'),
+    ('necrotic', 'Некротический'),
+    ('psychic', 'Психический'),
+    ('force', 'Силовое поле'),
+)
+
+# основа слова -> тип урона: «рубящего урона», «урона огнём», «некротической энергией»...
+DAMAGE_TYPE_STEMS = (
+    ('рубящ', 'slashing'), ('колющ', 'piercing'), ('дробящ', 'bludgeoning'),
+    ('огн', 'fire'), ('огон', 'fire'), ('холод', 'cold'), ('яд', 'poison'), ('кислот', 'acid'),
+    ('электр', 'lightning'), ('молни', 'lightning'), ('звук', 'thunder'), ('гром', 'thunder'),
+    ('излуч', 'radiant'), ('свет', 'radiant'), ('некрот', 'necrotic'), ('психи', 'psychic'),
+    ('силов', 'force'),
+)
+
+NUMBERS = {'одна': 1, 'один': 1, 'одно': 1, 'две': 2, 'два': 2, 'три': 3, 'четыре': 4, 'пять': 5}
+
+MINUS = '-−–'
+TO_HIT = re.compile(rf'([+{MINUS}]?)\s*(\d+)\s+к\s+попаданию', re.IGNORECASE)
+REACH = re.compile(r'досягаемост\w*\s+(\d+)', re.IGNORECASE)
+RANGE = re.compile(r'дистанци\w*\s+(\d+)(?:\s*/\s*(\d+))?', re.IGNORECASE)
+TARGETS = re.compile(rf'\b(\d+|{"|".join(NUMBERS)})\s+(?:цел|существ)', re.IGNORECASE)
+HIT = re.compile(r'попадание\s*:', re.IGNORECASE)
+DICE = re.compile(rf'(?<!\w)(\d*)\s*[dкд]\s*(\d+)(?:\s*([+{MINUS}])\s*(\d+))?(?!\w)', re.IGNORECASE)
+FLAT = re.compile(r'^\s*(\d+)\s+(?!\()', re.IGNORECASE)
+WORD = re.compile(r'[а-яё]+', re.IGNORECASE)
+# тип урона ищется в тексте после костей, до следующих костей или конца предложения
+TYPE_WINDOW = re.compile(r'[^.;]*?(?=(?<!\w)\d*\s*[dкд]\s*\d|[.;]|$)', re.IGNORECASE)
+
+PARSED_FIELDS = ('to_hit', 'reach', 'range_normal', 'range_long', 'targets', 'damage_dice', 'damage_type',
+                 'average_damage')
+
+
+def _damage_type(text):
+    for word in WORD.findall(text.lower()):
+        for stem, damage_type in DAMAGE_TYPE_STEMS:
+            if word.startswith(stem):
+                return damage_type
+    return ''
+
+
+def _signed(sign, value):
+    return -int(value) if sign and sign in MINUS else int(value)
+
+
+def parse_attack(text):
+    """Колонки атаки из текста: {поле из PARSED_FIELDS: значение}."""
+    text = text or ''
+    parsed = dict.fromkeys(PARSED_FIELDS)
+    parsed.update(damage_dice='', damage_type='', average_damage=0.0)
+
+    if match := TO_HIT.search(text):
+        parsed['to_hit'] = _signed(*match.groups())
+    if match := REACH.search(text):
+        parsed['reach'] = int(match[1])
+    if match := RANGE.search(text):
+        parsed['range_normal'] = int(match[1])
+        parsed['range_long'] = int(match[2]) if match[2] else None
+    if match := TARGETS.search(text):
+        parsed['targets'] = int(match[1]) if match[1].isdigit() else NUMBERS[match[1].lower()]
+
+    # урон — после «Попадание:», а если его нет, то по всему тексту
+    hit = HIT.search(text)
+    damage = text[hit.end():] if hit else text
+    dice, average, damage_type = [], 0.0, ''
+    for match in DICE.finditer(damage):
+        count, sides, sign, bonus = match.groups()
+        count, sides = int(count or 1), int(sides)
+        if not sides:
+            continue
+        bonus = _signed(sign, bonus) if bonus else 0
+        dice.append(f'{count}d{sides}{bonus:+d}' if bonus else f'{count}d{sides}')
+        average += count * (sides + 1) / 2 + bonus
+        if not damage_type:
+            damage_type = _damage_type(TYPE_WINDOW.match(damage, match.end())[0])
+    if not dice and hit and (match := FLAT.match(damage)):
+        # фиксированный урон: «Попадание: 1 дробящий урон»
+        average = float(match[1])
+        damage_type = _damage_type(TYPE_WINDOW.match(damage, match.end())[0])
+
+    parsed.update(damage_dice=', '.join(dice)[:50], damage_type=damage_type, average_damage=max(average, 0.0))
+    return parsed
+
+
+def damage_per_round(averages):
+    """Урон существа за раунд по средним урона его атак."""
+    return max(averages, default=0.0)
+
+
+def _damage_subquery():
+    from apps.wiki.models import CreatureAttack
+
+    # то же, что damage_per_round(), на стороне БД
+    attacks = CreatureAttack.objects.filter(creature=OuterRef('pk')).order_by().values('creature')
+    return Coalesce(Subquery(attacks.annotate(damage=Max('average_damage')).values('damage')), Value(0.0))
+
+
+def _update_damage(queryset):
+    # меняются только строки, где урон действительно другой; updated_at — чтобы списки и выгрузка увидели правку
+    return (queryset.alias(damage=_damage_subquery()).exclude(damage_per_round=F('damage'))
+            .update(damage_per_round=_damage_subquery(), updated_at=Now()))
+
+
+def rebuild_damage(creature_ids=None, chunk_size=DEFAULT_CHUNK_SIZE, using=None):
+    """
+    Пересчитывает Creature.damage_per_round по колонкам атак одним UPDATE с подзапросом: для перечисленных
+    существ или для всех (creature_ids=None, пачками по chunk_size), включая мягко удалённых.
+    Возвращает число существ, у которых урон изменился.
+    """
+    from apps.wiki.models import Creature
+
+    base = Creature._base_manager.db_manager(using)
+    if creature_ids is not None:
+        return _update_damage(base.filter(pk__in=list(creature_ids)))
+
+    rebuilt = 0
+    for pks in Creature.objects.db_manager(using).unfiltered().pk_chunks(chunk_size):
+        with transaction.atomic(using=using):
+            rebuilt += _update_damage(base.filter(pk__in=pks))
+    return rebuilt
+
+
+def reparse_attacks(chunk_size=DEFAULT_CHUNK_SIZE, using=None):
+    """
+    Заново разбирает текст всех атак и пересчитывает урон существ пачками существ: на пачку — выборка атак,
+    bulk_update и UPDATE урона в одной транзакции. Возвращает (число атак, число существ с изменённым уроном).
+    """
+    from apps.wiki.models import Creature, CreatureAttack
+
+    attacks = changed = 0
+    base = Creature._base_manager.db_manager(using)
+    for pks in Creature.objects.db_manager(using).unfiltered().pk_chunks(chunk_size):
+        batch = list(CreatureAttack.objects.using(using).filter(creature__in=pks).only('pk', 'creature', 'text'))
+        for attack in batch:
+            attack.fill_parsed()
+        with transaction.atomic(using=using):
+            CreatureAttack.objects.using(using).bulk_update(batch, PARSED_FIELDS, batch_size=chunk_size)
+            changed += _update_damage(base.filter(pk__in=pks))
+        attacks += len(batch)
+    return attacks, changed
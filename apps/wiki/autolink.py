@@ -0,0 +1,214 @@
+"""
+Ссылки на существа и заклинания в тексте статей и новостей.
+
+Названия всех существ и заклинаний собраны в автомат Ахо — Корасик: упоминания находятся за один проход
+по тексту, сколько бы названий ни было. Совпадения ищутся без учёта регистра и только целыми словами;
+из пересекающихся берётся самое левое, а из начинающихся в одной позиции — самое длинное.
+
+Набор названий хранится в процессе. Новое существо или заклинание добавляется в него на месте (apps.wiki.signals),
+переименование и удаление сбрасывают набор; автомат перестраивается при следующем обращении.
+Версия набора лежит в кэше: другие процессы, увидев новую версию, перечитывают названия из БД.
+Готовый HTML текста кэшируется по updated_at объекта и версии набора (render_text),
+так что на чтении автомат не нужен, пока ничего не изменилось.
+"""
+from collections import deque
+from threading import Lock
+
+from django.conf import settings
+from django.core.cache import caches
+from django.urls import reverse
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from apps.common.shared_version import SharedVersion
+
+TEXT_PREFIX = 'autolink'
+# при совпадении названий ссылка ведёт на существо
+DETAIL_VIEWS = {'wiki.creature': 'wiki:creature_detail', 'wiki.spell': 'wiki:spell_detail'}
+
+
+def _cache():
+    return caches[getattr(settings, 'FRAGMENT_CACHE_ALIAS', 'default')]
+
+
+class Automaton:
+    """
+    Автомат Ахо — Корасик над названиями: patterns — {название в нижнем регистре: ссылка}.
+    Узлы — словари переходов; fail — суффиксные ссылки; length/urls — название, которое кончается в узле;
+    output — ближайший по суффиксным ссылкам узел, где кончается другое название.
+    """
+
+    def __init__(self, patterns):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [0]
+        self.length = [0]
+        self.urls = [None]
+        for pattern, url in patterns.items():
+            self._insert(pattern, url)
+        self._link()
+
+    def _insert(self, pattern, url):
+        node = 0
+        for char in pattern:
+            following = self.goto[node].get(char)
+            if following is None:
+                following = len(self.goto)
+                self.goto[node][char] = following
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append(0)
+                self.length.append(0)
+                self.urls.append(None)
+            node = following
+        self.length[node] = len(pattern)
+        self.urls[node] = url
+
+    def _link(self):
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, following in self.goto[node].items():
+                queue.append(following)
+                state = self.fail[node]
+                while state and char not in self.goto[state]:
+                    state = self.fail[state]
+                fail = self.goto[state].get(char, 0) if node else 0
+                self.fail[following] = fail
+                self.output[following] = fail if self.length[fail] else self.output[fail]
+
+    def matches(self, text):
+        """
+        (начало, конец, ссылка) непересекающихся упоминаний целыми словами, слева направо.
+        text — уже в нижнем регистре той же длины, что и исходный.
+        """
+        found = []
+        node = 0
+        for index, char in enumerate(text):
+            while node and char not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(char, 0)
+            end = index + 1
+            if end < len(text) and _is_word(text[end]):
+                continue
+            match = node if self.length[node] else self.output[node]
+            while match:
+                start = end - self.length[match]
+                if not start or not _is_word(text[start - 1]):
+                    found.append((start, end, self.urls[match]))
+                match = self.output[match]
+
+        # самое левое, из начинающихся в одной позиции — самое длинное
+        found.sort(key=lambda item: (item[0], -item[1]))
+        chosen = []
+        for match in found:
+            if not chosen or match[0] >= chosen[-1][1]:
+                chosen.append(match)
+        return chosen
+
+
+def _is_word(char):
+    return char.isalnum() or char == '_'
+
+
+def _lower(text):
+    lowered = text.lower()
+    # некоторые символы в нижнем регистре длиннее (İ → i̇): тогда позиции считаем по символам
+    if len(lowered) != len(text):
+        lowered = ''.join(char.lower() if len(char.lower()) == 1 else char for char in text)
+    return lowered
+
+
+# Набор названий и автомат процесса
+
+_lock = Lock()
+_state = {'version': None, 'patterns': None, 'automaton': None}
+
+
+_version = SharedVersion('autolink:version')
+
+
+def version():
+    """Версия набора названий (общая для процессов через кэш, см. apps.common.shared_version)."""
+    return _version.get()
+
+
+def url_for(model, slug):
+    return reverse(DETAIL_VIEWS[model._meta.label_lower], kwargs={'slug': slug})
+
+
+def _load_patterns():
+    from django.apps import apps
+
+    patterns = {}
+    for label in DETAIL_VIEWS:
+        model = apps.get_model(label)
+        # среди заклинаний с одним названием — первое созданное
+        for name, slug in model.objects.order_by('created_at').values_list('name', 'slug'):
+            if name.strip() and slug:
+                patterns.setdefault(_lower(name.strip()), url_for(model, slug))
+    return patterns
+
+
+def automaton():
+    current = version()
+    with _lock:
+        if _state['version'] != current or _state['patterns'] is None:
+            _state.update(version=current, patterns=_load_patterns(), automaton=None)
+        if _state['automaton'] is None:
+            _state['automaton'] = Automaton(_state['patterns'])
+        return _state['automaton']
+
+
+def add_name(name, url):
+    """
+    Новое существо или заклинание: название добавляется в набор процесса на месте, если он актуален;
+    остальные процессы перечитают набор по новой версии.
+    """
+    with _lock:
+        seen = _state['version'] if _state['patterns'] is not None else None
+        new_version = _version.bump()
+        # другая версия — набор менялся ещё где-то: перечитаем его целиком
+        if seen is None or new_version != seen + 1:
+            return
+        if name and name.strip():
+            _state['patterns'].setdefault(_lower(name.strip()), url)
+        _state.update(version=new_version, automaton=None)
+
+
+def invalidate():
+    """
+    Название переименовано или удалено (его могло перекрывать другое с тем же названием) либо набор изменён
+    в обход сигналов (массовый импорт): все процессы перечитают набор из БД.
+    """
+    with _lock:
+        _version.bump()
+        _state.update(version=None, patterns=None, automaton=None)
+
+
+# Текст со ссылками
+
+def link_mentions(text):
+    """Экранированный HTML текста, где упоминания существ и заклинаний — ссылки на их страницы."""
+    text = text or ''
+    parts = []
+    position = 0
+    for start, end, url in automaton().matches(_lower(text)):
+        parts.append(escape(text[position:start]))
+        parts.append(f'<a class="autolink" href="{escape(url)}">{escape(text[start:end])}</a>')
+        position = end
+    parts.append(escape(text[position:]))
+    return mark_safe(''.join(parts))
+
+
+def render_text(obj, field='text'):
+    """link_mentions(obj.<field>) из кэша: запись действительна, пока не изменились updated_at и версия набора."""
+    cache = _cache()
+    key = f'{TEXT_PREFIX}:{obj._meta.label_lower}:{obj.pk}:{field}'
+    stamp = (obj.updated_at, version())
+    cached = cache.get(key)
+    if cached is not None and cached[0] == stamp:
+        return mark_safe(cached[1])
+    html = link_mentions(getattr(obj, field))
+    cache.set(key, (stamp, str(html)), timeout=getattr(settings, 'FRAGMENT_CACHE_TIMEOUT', 24 * 60 * 60))
+    return html
@@ -0,0 +1,232 @@
+"""
+Симуляция боя двух отрядов существ методом Монте-Карло («кто победит: 4 гоблина или 1 огр?»).
+
+Правила упрощены до одного действия за раунд. Каждое живое существо атакует случайного живого противника
+своей лучшей атакой (наибольший average_damage, см. apps.wiki.attacks). d20 + бонус попадания против КД цели;
+1 — всегда промах, 20 — попадание с удвоенными костями урона. Стороны ходят одновременно: урон раунда
+считается по состоянию на его начало. Бой кончается, когда у стороны не осталось живых, или по лимиту раундов
+(ничья).
+
+simulate() разыгрывает все бои пачками на массивах NumPy: состояние пачки — матрица хитов (бой × существо),
+броски, выбор целей и урон считаются сразу для всех боёв пачки, а урон по целям суммируется np.bincount.
+simulate_loop() — те же правила обычным циклом по боям и раундам, для сверки и бенчмарка
+(benchmarks/combat_simulation.py).
+"""
+import random
+import re
+import time
+
+import numpy as np
+
+DEFAULT_TRIALS = 10_000
+DEFAULT_BATCH_SIZE = 4096
+MAX_ROUNDS = 100
+
+_DICE = re.compile(r'(\d+)d(\d+)([+-]\d+)?')
+
+
+def modifier(score):
+    return (score - 10) // 2
+
+
+class Combatant:
+    """Боевые параметры одного существа: хиты, КД, бонус попадания, кости урона [(число, грани)] и бонус урона."""
+
+    def __init__(self, name, health, armor_class, to_hit, dice, bonus=0):
+        self.name = name
+        self.health = max(int(health), 1)
+        self.armor_class = int(armor_class)
+        self.to_hit = int(to_hit)
+        self.dice = [(int(count), int(sides)) for count, sides in dice if count and sides]
+        self.bonus = int(bonus)
+
+    @property
+    def average_damage(self):
+        return sum(count * (sides + 1) / 2 for count, sides in self.dice) + self.bonus
+
+    @classmethod
+    def from_creature(cls, creature):
+        """Из существа с подгруженными атаками (prefetch_related('attacks'))."""
+        attack = max(creature.attacks.all(), key=lambda attack: attack.average_damage, default=None)
+        ability = modifier(max(creature.strength, creature.dexterity))
+        to_hit = creature.mastery + ability
+        if attack is None or not attack.average_damage:
+            # безоружный удар: 1 + модификатор силы или ловкости
+            return cls(creature.name, creature.health, creature.armor_class, to_hit, [], max(1 + ability, 1))
+
+        dice, bonus = [], 0
+        for count, sides, extra in _DICE.findall(attack.damage_dice):
+            dice.append((int(count), int(sides)))
+            bonus += int(extra or 0)
+        if not dice:
+            # фиксированный урон без костей
+            bonus = round(attack.average_damage)
+        return cls(creature.name, creature.health, creature.armor_class,
+                   to_hit if attack.to_hit is None else attack.to_hit, dice, bonus)
+
+
+def _summary(a_wins, b_wins, rounds_total, finished, trials, elapsed):
+    return {
+        'trials': trials,
+        'a_wins': a_wins / trials if trials else 0.0,
+        'b_wins': b_wins / trials if trials else 0.0,
+        'draws': (trials - a_wins - b_wins) / trials if trials else 0.0,
+        # среди боёв, закончившихся до лимита раундов
+        'expected_rounds': rounds_total / finished if finished else None,
+        'elapsed': elapsed,
+    }
+
+
+# Векторная симуляция
+
+class _Side:
+    """Параметры стороны массивами по существам; кости развёрнуты в отдельные броски для матричного суммирования."""
+
+    def __init__(self, combatants):
+        self.size = len(combatants)
+        self.health = np.array([unit.health for unit in combatants], dtype=np.int32)
+        self.armor_class = np.array([unit.armor_class for unit in combatants], dtype=np.int32)
+        self.to_hit = np.array([unit.to_hit for unit in combatants], dtype=np.int32)
+        self.bonus = np.array([unit.bonus for unit in combatants], dtype=np.int32)
+        owners, sides = [], []
+        for index, unit in enumerate(combatants):
+            for count, faces in unit.dice:
+                owners += [index] * count
+                sides += [faces] * count
+        self.sides = np.array(sides, dtype=np.float32)
+        # кость -> владелец: (бой × кость) @ owner = сумма костей каждого существа; float32 — умножение через BLAS
+        self.owner = np.zeros((len(sides), self.size), dtype=np.float32)
+        self.owner[np.arange(len(sides)), owners] = 1
+
+    def roll_dice(self, rng, rows):
+        """Сумма костей урона каждого существа: матрица (rows × существо)."""
+        if not len(self.sides):
+            return np.zeros((rows, self.size), dtype=np.int32)
+        rolls = np.floor(rng.random((rows, len(self.sides)), dtype=np.float32) * self.sides) + 1
+        return (rolls @ self.owner).astype(np.int32)
+
+
+def _attack(rng, attackers, defenders, attacker_hp, defender_hp):
+    """Урон по каждому защитнику за раунд: матрица (бой × защитник)."""
+    batch = attacker_hp.shape[0]
+    # случайная живая цель: номера живых защитников собраны в начало строки, берётся случайный из первых alive
+    alive = defender_hp > 0
+    alive_index = np.argsort(~alive, axis=1, kind='stable')
+    pick = (rng.random((batch, attackers.size)) * alive.sum(axis=1, keepdims=True)).astype(np.intp)
+    target = np.take_along_axis(alive_index, pick, axis=1)
+
+    d20 = rng.integers(1, 21, size=(batch, attackers.size), dtype=np.int32)
+    hit = (attacker_hp > 0) & (d20 != 1) & ((d20 == 20) | (d20 + attackers.to_hit >= defenders.armor_class[target]))
+    damage = attackers.roll_dice(rng, batch) + attackers.bonus
+    # критическое попадание: кости бросаются ещё раз — только в боях, где оно было
+    crit = d20 == 20
+    crit_rows = np.flatnonzero(crit.any(axis=1))
+    damage[crit_rows] += attackers.roll_dice(rng, len(crit_rows)) * crit[crit_rows]
+    damage = np.where(hit, np.maximum(damage, 0), 0)
+
+    cells = (np.arange(batch)[:, None] * defenders.size + target).ravel()
+    taken = np.bincount(cells, weights=damage.ravel(), minlength=batch * defenders.size)
+    return taken.reshape(batch, defenders.size).astype(np.int32)
+
+
+def _simulate_batch(rng, side_a, side_b, batch, max_rounds):
+    hp_a = np.tile(side_a.health, (batch, 1))
+    hp_b = np.tile(side_b.health, (batch, 1))
+    rounds = np.zeros(batch, dtype=np.int32)
+    # 0 — идёт (или ничья по лимиту раундов), 1 — победа A, 2 — победа B, 3 — обе стороны пали в одном раунде
+    outcome = np.zeros(batch, dtype=np.int8)
+    active = np.ones(batch, dtype=bool)
+
+    for number in range(1, max_rounds + 1):
+        if not active.any():
+            break
+        # законченные бои не пересчитываются: пачка сжимается до идущих боёв
+        index = np.flatnonzero(active)
+        a, b = hp_a[index], hp_b[index]
+        to_b = _attack(rng, side_a, side_b, a, b)
+        to_a = _attack(rng, side_b, side_a, b, a)
+        a -= to_a
+        b -= to_b
+        hp_a[index], hp_b[index] = a, b
+
+        a_alive, b_alive = (a > 0).any(axis=1), (b > 0).any(axis=1)
+        ended = ~(a_alive & b_alive)
+        finished = index[ended]
+        outcome[finished] = np.where(a_alive[ended], 1, np.where(b_alive[ended], 2, 3))
+        rounds[finished] = number
+        active[finished] = False
+
+    done = outcome > 0
+    return int((outcome == 1).sum()), int((outcome == 2).sum()), int(rounds[done].sum()), int(done.sum())
+
+
+def simulate(side_a, side_b, trials=DEFAULT_TRIALS, batch_size=DEFAULT_BATCH_SIZE, max_rounds=MAX_ROUNDS,
+             seed=None, time_budget=None):
+    """
+    Разыгрывает trials боёв отряда side_a против side_b (списки Combatant) пачками по batch_size.
+    С time_budget (секунды) новые пачки не начинаются после истечения бюджета: trials в ответе —
+    сколько боёв успели разыграть. Возвращает {'trials', 'a_wins', 'b_wins', 'draws', 'expected_rounds',
+    'elapsed'}, доли побед — от числа разыгранных боёв.
+    """
+    if not side_a or not side_b:
+        raise ValueError('В каждом отряде должно быть хотя бы одно существо')
+    started = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    a, b = _Side(side_a), _Side(side_b)
+
+    done = a_wins = b_wins = rounds_total = finished = 0
+    while done < trials:
+        if time_budget is not None and done and time.perf_counter() - started >= time_budget:
+            break
+        batch = min(batch_size, trials - done)
+        wins_a, wins_b, rounds, ended = _simulate_batch(rng, a, b, batch, max_rounds)
+        a_wins += wins_a
+        b_wins += wins_b
+        rounds_total += rounds
+        finished += ended
+        done += batch
+    return _summary(a_wins, b_wins, rounds_total, finished, done, time.perf_counter() - started)
+
+
+# Эталон: цикл по боям и раундам
+
+def _attack_loop(rng, attackers, defenders, hp_attackers, hp_defenders):
+    taken = [0] * len(defenders)
+    alive = [index for index, hp in enumerate(hp_defenders) if hp > 0]
+    for unit, hp in zip(attackers, hp_attackers):
+        if hp <= 0:
+            continue
+        target = rng.choice(alive)
+        d20 = rng.randint(1, 20)
+        if d20 == 1 or (d20 != 20 and d20 + unit.to_hit < defenders[target].armor_class):
+            continue
+        rolls = 2 if d20 == 20 else 1
+        dice = sum(rng.randint(1, sides) for _ in range(rolls) for count, sides in unit.dice for _ in range(count))
+        taken[target] += max(dice + unit.bonus, 0)
+    return taken
+
+
+def simulate_loop(side_a, side_b, trials=DEFAULT_TRIALS, max_rounds=MAX_ROUNDS, seed=None):
+    """Те же правила, что у simulate(), циклом Python: бой за боем, раунд за раундом."""
+    if not side_a or not side_b:
+        raise ValueError('В каждом отряде должно быть хотя бы одно существо')
+    started = time.perf_counter()
+    rng = random.Random(seed)
+    a_wins = b_wins = rounds_total = finished = 0
+    for _ in range(trials):
+        hp_a = [unit.health for unit in side_a]
+        hp_b = [unit.health for unit in side_b]
+        for number in range(1, max_rounds + 1):
+            to_b = _attack_loop(rng, side_a, side_b, hp_a, hp_b)
+            to_a = _attack_loop(rng, side_b, side_a, hp_b, hp_a)
+            hp_a = [hp - damage for hp, damage in zip(hp_a, to_a)]
+            hp_b = [hp - damage for hp, damage in zip(hp_b, to_b)]
+            a_alive, b_alive = any(hp > 0 for hp in hp_a), any(hp > 0 for hp in hp_b)
+            if a_alive and b_alive:
+                continue
+            a_wins += a_alive
+            b_wins += b_alive
+            rounds_total += number
+            finished += 1
+            break
+    return _summary(a_wins, b_wins, rounds_total, finished, trials, time.perf_counter() - started)
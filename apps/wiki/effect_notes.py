@@ -0,0 +1,54 @@
+"""
+Примечание связи заклинания с эффектом (SpellEffectLink.note) — копия текста эффекта.
+
+Копию заполняет fill_notes(): из уже загруженных эффектов, а остальные тексты — одним запросом на все связи.
+Её вызывают SpellEffectLink.save() и bulk_create() связей; формсет связей (apps.wiki.forms) загружает
+выбранные эффекты одним запросом на все формы, так что при сохранении форм эффекты уже в кэше экземпляров.
+Правка текста эффекта переписывает копии одним UPDATE (propagate_note, обработчик в apps.wiki.signals),
+а расхождения, накопленные в обход сигналов, исправляет команда repair_effect_notes.
+"""
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery
+from django.db.models.functions import Now
+
+from apps.common.managers import DEFAULT_CHUNK_SIZE
+
+
+def fill_notes(links, using=None):
+    """Заполняет note у связей текстом их эффектов. Возвращает links."""
+    from apps.wiki.models import SpellEffect, SpellEffectLink
+
+    cached = SpellEffectLink.effect.is_cached
+    missing = {link.effect_id for link in links if link.effect_id is not None and not cached(link)}
+    texts = dict(SpellEffect.objects.using(using).filter(pk__in=missing).values_list('pk', 'text')) if missing else {}
+    for link in links:
+        link.note = link.effect.text if cached(link) else texts.get(link.effect_id)
+    return links
+
+
+def propagate_note(effect_id, text, using=None):
+    """Переписывает примечания связей эффекта одним UPDATE. Возвращает число изменённых связей."""
+    from apps.wiki.models import SpellEffectLink
+
+    # updated_at — отметка кэша фрагмента и валидаторов страницы заклинания
+    return (SpellEffectLink.objects.using(using).filter(effect_id=effect_id).exclude(note=text)
+            .update(note=text, updated_at=Now()))
+
+
+def repair_notes(chunk_size=DEFAULT_CHUNK_SIZE, using=None):
+    """
+    Исправляет примечания, разошедшиеся с текстом эффекта: одним UPDATE на пачку эффектов.
+    Возвращает число исправленных связей.
+    """
+    from apps.wiki.models import SpellEffect, SpellEffectLink
+
+    effect_ids = list(SpellEffect.objects.using(using).order_by('pk').values_list('pk', flat=True))
+    text = Subquery(SpellEffect.objects.filter(pk=OuterRef('effect_id')).values('text')[:1])
+    repaired = 0
+    for start in range(0, len(effect_ids), chunk_size):
+        with transaction.atomic(using=using):
+            repaired += (SpellEffectLink.objects.using(using)
+                         .filter(effect__in=effect_ids[start:start + chunk_size])
+                         .exclude(note=F('effect__text'))
+                         .update(note=text, updated_at=Now()))
+    return repaired
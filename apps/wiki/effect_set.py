@@ -0,0 +1,89 @@
+"""
+Денормализованный набор эффектов заклинания.
+
+Spell.effect_set — отсортированные pk эффектов заклинания строкой вида ",3,17,42,". Условие
+«есть эффекты A и B, нет C» проверяется по этой строке в самой строке заклинания (LIKE '%,A,%'),
+без JOIN или подзапроса к SpellEffectLink на каждый эффект; выражение одинаково работает на любой БД.
+
+Набор пересчитывают обработчики apps.wiki.signals при изменении SpellEffectLink, а после массовых
+операций в обход сигналов — команда rebuild_effect_sets. Spell.save() существующей строки колонку
+не перезаписывает (Spell.derived_fields), поэтому устаревший экземпляр не затирает набор.
+"""
+from collections import defaultdict
+
+from django.db.models import Exists, OuterRef, Q
+
+from apps.common.managers import DEFAULT_CHUNK_SIZE
+
+SEPARATOR = ','
+
+
+def encode(effect_ids):
+    """Строка набора для pk эффектов: ',3,17,42,' (пустой набор — '')."""
+    ids = sorted(set(effect_ids))
+    return f'{SEPARATOR}{SEPARATOR.join(map(str, ids))}{SEPARATOR}' if ids else ''
+
+
+def decode(effect_set):
+    return [int(effect_id) for effect_id in (effect_set or '').split(SEPARATOR) if effect_id]
+
+
+def _has(effect_id):
+    return Q(effect_set__contains=f'{SEPARATOR}{effect_id}{SEPARATOR}')
+
+
+def filter_by_effects(queryset, all_ids=(), any_ids=(), none_ids=()):
+    """
+    Заклинания, у которых есть все эффекты all_ids, хотя бы один из any_ids (если задан) и ни одного из none_ids.
+    """
+    condition = Q()
+    for effect_id in all_ids:
+        condition &= _has(effect_id)
+    if any_ids:
+        any_condition = Q()
+        for effect_id in any_ids:
+            any_condition |= _has(effect_id)
+        condition &= any_condition
+    for effect_id in none_ids:
+        condition &= ~_has(effect_id)
+    return queryset.filter(condition) if condition else queryset
+
+
+def _link_exists(effect_ids):
+    from apps.wiki.models import SpellEffectLink
+    return Exists(SpellEffectLink.objects.filter(spell=OuterRef('pk'), effect__in=effect_ids))
+
+
+def filter_by_links(queryset, all_ids=(), any_ids=(), none_ids=()):
+    """Тот же фильтр через SpellEffectLink: подзапрос на каждый обязательный эффект (для сверки и бенчмарка)."""
+    for effect_id in all_ids:
+        queryset = queryset.filter(_link_exists([effect_id]))
+    if any_ids:
+        queryset = queryset.filter(_link_exists(list(any_ids)))
+    if none_ids:
+        queryset = queryset.exclude(_link_exists(list(none_ids)))
+    return queryset
+
+
+def rebuild_effect_sets(spell_ids=None, chunk_size=DEFAULT_CHUNK_SIZE, using=None):
+    """
+    Пересчитывает наборы по SpellEffectLink: для перечисленных заклинаний или для всех (spell_ids=None),
+    включая мягко удалённые. Возвращает число обработанных заклинаний.
+    """
+    from apps.wiki.models import Spell, SpellEffectLink
+
+    spells = Spell.objects.db_manager(using).unfiltered()
+    if spell_ids is not None:
+        spells = spells.filter(pk__in=list(spell_ids))
+
+    rebuilt = 0
+    for pks in spells.pk_chunks(chunk_size):
+        effects = defaultdict(list)
+        links = SpellEffectLink.objects.using(using).filter(spell__in=pks).values_list('spell_id', 'effect_id')
+        for spell_id, effect_id in links:
+            effects[spell_id].append(effect_id)
+        Spell._base_manager.db_manager(using).bulk_update(
+            [Spell(pk=pk, effect_set=encode(effects[pk])) for pk in pks], ['effect_set'],
+        )
+        rebuilt += len(pks)
+    return rebuilt
@@ -0,0 +1,276 @@
+"""
+Генератор встреч: подбор существ под бюджет опыта группы.
+
+Опасность существа (dangerous_level) читается как показатель опасности и переводится в опыт (XP_BY_DANGER);
+бюджет встречи — порог сложности на уровень персонажа (THRESHOLDS) × размер группы. Суммарный опыт
+существ умножается на множитель их числа (encounter_multiplier), и результат должен попасть в окно от порога
+выбранной сложности до порога следующей.
+
+Подбор — задача о рюкзаке без ограничения числа предметов одного веса: для каждого числа существ n
+множество достижимых сумм опыта хранится битовой маской (целое Python, бит i — сумма i × шаг),
+reach[n] = OR по уровням опасности (reach[n - 1] << опыт уровня). Уровней не больше 21, поэтому
+решение — десятки сдвигов длинного целого вместо перебора сочетаний существ. Сумма выбирается
+случайно внутри окна, уровни восстанавливаются обратным ходом по маскам, а конкретные существа —
+случайно из корзин индекса.
+
+Индекс (EncounterIndex) — корзины существ по (опасность, категория, размер), держится в памяти процесса.
+Изменения существ правят его на месте (apps.wiki.signals), массовые операции сбрасывают; версия общая
+для процессов через кэш (apps.common.shared_version).
+"""
+import random
+from math import ceil, gcd
+from threading import Lock
+
+from apps.common.shared_version import SharedVersion
+
+DIFFICULTIES = ('easy', 'medium', 'hard', 'deadly')
+
+# опыт за существо по опасности (как за показатель опасности 0–20)
+XP_BY_DANGER = (10, 200, 450, 700, 1100, 1800, 2300, 2900, 3900, 5000, 5900,
+                7200, 8400, 10000, 11500, 13000, 15000, 18000, 20000, 22000, 25000)
+
+# пороги опыта на одного персонажа: уровень -> (лёгкая, средняя, сложная, смертельная)
+THRESHOLDS = {
+    1: (25, 50, 75, 100), 2: (50, 100, 150, 200), 3: (75, 150, 225, 400), 4: (125, 250, 375, 500),
+    5: (250, 500, 750, 1100), 6: (300, 600, 900, 1400), 7: (350, 750, 1100, 1700), 8: (450, 900, 1400, 2100),
+    9: (550, 1100, 1600, 2400), 10: (600, 1200, 1900, 2800), 11: (800, 1600, 2400, 3600),
+    12: (1000, 2000, 3000, 4500), 13: (1100, 2200, 3400, 5100), 14: (1250, 2500, 3800, 5700),
+    15: (1400, 2800, 4300, 6400), 16: (1600, 3200, 4800, 7200), 17: (2000, 3900, 5900, 8800),
+    18: (2100, 4200, 6300, 9500), 19: (2400, 4900, 7300, 10900), 20: (2800, 5700, 8500, 12700),
+}
+# верхняя граница окна смертельной встречи — порог × DEADLY_CEILING
+DEADLY_CEILING = 1.5
+
+MULTIPLIERS = (0.5, 1, 1.5, 2, 2.5, 3, 4, 5)
+MAX_MONSTERS = 8
+MAX_PARTY = 10
+DEFAULT_RESULTS = 5
+
+
+def encounter_multiplier(monsters, party_size):
+    """Множитель опыта за число существ; маленькой группе (< 3) встреча тяжелее, большой (≥ 6) — легче."""
+    step = 1 if monsters == 1 else 2 if monsters == 2 else 3 if monsters <= 6 else 4 if monsters <= 10 \
+        else 5 if monsters <= 14 else 6
+    if party_size < 3:
+        step += 1
+    elif party_size >= 6:
+        step -= 1
+    return MULTIPLIERS[step]
+
+
+def budget(party_size, party_level, difficulty):
+    """Окно скорректированного опыта [от, до) для встречи выбранной сложности."""
+    thresholds = THRESHOLDS[party_level]
+    position = DIFFICULTIES.index(difficulty)
+    low = thresholds[position] * party_size
+    high = thresholds[position + 1] * party_size if position + 1 < len(thresholds) else low * DEADLY_CEILING
+    return low, high
+
+
+class _Bucket:
+    """Существа одной корзины: список для случайного выбора и позиции для удаления за O(1)."""
+
+    def __init__(self):
+        self.items = []
+        self.positions = {}
+
+    def add(self, pk, entry):
+        self.positions[pk] = len(self.items)
+        self.items.append((pk, entry))
+
+    def remove(self, pk):
+        position = self.positions.pop(pk)
+        last = self.items.pop()
+        if last[0] != pk:
+            self.items[position] = last
+            self.positions[last[0]] = position
+
+
+class EncounterIndex:
+    """
+    Корзины существ по ключу (опасность, категория, размер); в записи — (название, слаг).
+    locations — pk -> ключ корзины, чтобы правка существа переносила его без поиска.
+    """
+
+    def __init__(self, rows=()):
+        self.buckets = {}
+        self.locations = {}
+        for pk, danger, category_id, size, name, slug in rows:
+            self.put(pk, danger, category_id, size, name, slug)
+
+    def put(self, pk, danger, category_id, size, name, slug):
+        self.discard(pk)
+        if not 0 <= danger < len(XP_BY_DANGER):
+            return
+        key = (danger, category_id, size)
+        self.buckets.setdefault(key, _Bucket()).add(pk, (name, slug))
+        self.locations[pk] = key
+
+    def discard(self, pk):
+        key = self.locations.pop(pk, None)
+        if key is not None:
+            bucket = self.buckets[key]
+            bucket.remove(pk)
+            if not bucket.items:
+                del self.buckets[key]
+
+    def __len__(self):
+        return len(self.locations)
+
+    def candidates(self, categories=(), sizes=()):
+        """{опасность: [корзины]} — корзины, подходящие под фильтры категорий и размеров."""
+        categories, sizes = set(categories), set(sizes)
+        levels = {}
+        for (danger, category_id, size), bucket in self.buckets.items():
+            if (not categories or category_id in categories) and (not sizes or size in sizes):
+                levels.setdefault(danger, []).append(bucket)
+        return levels
+
+
+def _pick(rng, buckets):
+    """Случайное существо уровня: корзина — пропорционально размеру, затем запись в ней."""
+    bucket = rng.choices(buckets, weights=[len(bucket.items) for bucket in buckets])[0]
+    return rng.choice(bucket.items)
+
+
+def _bits(mask):
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def solve(levels, party_size, window, max_monsters=MAX_MONSTERS, results=DEFAULT_RESULTS, rng=None):
+    """
+    Сочетания уровней опасности под окно скорректированного опыта window = (от, до).
+    levels — доступные уровни опасности. Возвращает до results списков уровней (по одному на существо).
+    """
+    rng = rng or random.Random()
+    levels = sorted(set(levels))
+    if not levels:
+        return []
+    step = 0
+    for danger in levels:
+        step = gcd(step, XP_BY_DANGER[danger])
+    weights = {danger: XP_BY_DANGER[danger] // step for danger in levels}
+    low, high = window
+    # сумм больше этой не бывает ни при каком числе существ: множитель не меньше 0.5
+    limit = int(high / min(MULTIPLIERS) / step) + 1
+    cap = (1 << limit) - 1
+
+    reach = [1]
+    windows = []
+    for monsters in range(1, max_monsters + 1):
+        previous = reach[-1]
+        current = 0
+        for weight in weights.values():
+            current |= previous << weight
+        reach.append(current & cap)
+        multiplier = encounter_multiplier(monsters, party_size)
+        start, stop = ceil(low / multiplier / step), ceil(high / multiplier / step)
+        inside = reach[-1] >> start & ((1 << max(stop - start, 0)) - 1)
+        if inside:
+            windows.append((monsters, start, inside))
+
+    found = []
+    seen = set()
+    attempts = 0
+    while windows and len(found) < results and attempts < results * 4:
+        attempts += 1
+        monsters, start, inside = rng.choice(windows)
+        sums = list(_bits(inside))
+        total = start + rng.choice(sums)
+        chosen = []
+        for remaining in range(monsters, 0, -1):
+            # уровень, после вычитания которого сумма достижима оставшимися существами
+            options = [danger for danger, weight in weights.items()
+                       if weight <= total and reach[remaining - 1] >> (total - weight) & 1]
+            danger = rng.choice(options)
+            chosen.append(danger)
+            total -= weights[danger]
+        key = tuple(sorted(chosen))
+        if key not in seen:
+            seen.add(key)
+            found.append(sorted(chosen, reverse=True))
+    return found
+
+
+def build_encounters(index, party_size, party_level, difficulty, categories=(), sizes=(),
+                     max_monsters=MAX_MONSTERS, results=DEFAULT_RESULTS, seed=None):
+    """
+    Встречи для группы: [{'xp', 'adjusted_xp', 'monsters': [{'pk', 'name', 'slug', 'danger', 'count'}]}],
+    от меньшего числа существ к большему.
+    """
+    rng = random.Random(seed)
+    candidates = index.candidates(categories, sizes)
+    window = budget(party_size, party_level, difficulty)
+    encounters = []
+    for levels in solve(candidates, party_size, window, max_monsters, results, rng):
+        counts = {}
+        for danger in levels:
+            pk, (name, slug) = _pick(rng, candidates[danger])
+            entry = counts.setdefault(pk, {'pk': pk, 'name': name, 'slug': slug, 'danger': danger, 'count': 0})
+            entry['count'] += 1
+        xp = sum(XP_BY_DANGER[danger] for danger in levels)
+        encounters.append({
+            'xp': xp,
+            'adjusted_xp': xp * encounter_multiplier(len(levels), party_size),
+            'monsters': list(counts.values()),
+        })
+    encounters.sort(key=lambda encounter: (sum(m['count'] for m in encounter['monsters']), encounter['xp']))
+    return encounters
+
+
+# Индекс процесса
+
+_lock = Lock()
+_state = {'version': None, 'index': None}
+_version = SharedVersion('encounters:version')
+
+
+def _load():
+    from apps.wiki.models import Creature
+
+    return EncounterIndex(Creature.objects.order_by().values_list(
+        'pk', 'dangerous_level', 'category_id', 'size', 'name', 'slug',
+    ).iterator(chunk_size=2000))
+
+
+def index():
+    """Индекс существ процесса; перестраивается из БД, если версия в кэше сменилась."""
+    current = _version.get()
+    with _lock:
+        if _state['version'] != current or _state['index'] is None:
+            _state.update(version=current, index=_load())
+        return _state['index']
+
+
+def _apply(change):
+    with _lock:
+        seen = _state['version'] if _state['index'] is not None else None
+        new_version = _version.bump()
+        # версия сменилась ещё где-то — индекс перечитается целиком
+        if seen is None or new_version != seen + 1:
+            _state.update(version=None, index=None)
+            return
+        change(_state['index'])
+        _state['version'] = new_version
+
+
+def creature_saved(pk, danger, category_id, size, name, slug, is_deleted=False):
+    """Существо создано или изменено: переносится в свою корзину (удалённое — убирается)."""
+    if is_deleted:
+        _apply(lambda current: current.discard(pk))
+    else:
+        _apply(lambda current: current.put(pk, danger, category_id, size, name, slug))
+
+
+def creature_deleted(pk):
+    _apply(lambda current: current.discard(pk))
+
+
+def invalidate():
+    """Существа изменены в обход сигналов (массовый импорт): все процессы перечитают индекс из БД."""
+    with _lock:
+        _version.bump()
+        _state.update(version=None, index=None)
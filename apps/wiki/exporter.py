@@ -0,0 +1,210 @@
+"""
+Потоковая выгрузка вики в JSON Lines или CSV: существа (с атаками и особенностями), заклинания
+(с эффектами и примечаниями), статьи и новости.
+
+Формат существ и заклинаний совпадает с форматом apps.wiki.importer, так что выгрузку можно загрузить
+обратно командой import_wiki. Вложенные списки в CSV записываются JSON в ячейке.
+
+Строки выбираются .iterator(chunk_size): дочерние строки подгружаются prefetch_related на каждую пачку,
+в памяти — только текущая пачка, сколько бы строк ни было в таблице.
+
+Инкрементальная выгрузка (since): строки, у которых позже отметки изменилась сама строка (updated_at),
+мягкое удаление (deleted_at) или дочерние строки (их updated_at: правки атак и эффектов в своих админках,
+propagate_note; удаление дочерней строки обновляет updated_at родителя, см. apps.wiki.signals). Строки идут
+по возрастанию даты изменения. Мягко удалённые выгружаются как {"id", "type", "deleted": true}, чтобы
+получатель удалил их у себя. Новая отметка — наибольшая дата изменения в выгрузке (last_watermark).
+
+Даты ставятся при записи, а видны после фиксации: транзакция, зафиксированная позже выгрузки, может
+принести строки с датой раньше новой отметки. Поэтому выборка начинается на SINCE_OVERLAP раньше отметки —
+часть строк прошлой выгрузки повторяется, получатель применяет их повторно по id.
+"""
+import csv
+import json
+from datetime import timedelta
+
+from django.db.models import F, Q
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from apps.common.archive import ArchiveJSONEncoder
+from apps.common.conditional import children_updated_at
+from apps.common.managers import DEFAULT_CHUNK_SIZE
+from apps.wiki.importer import CHILD_FIELDS, CREATURE_FIELDS, SPELL_FIELDS
+from apps.wiki.models import Creature, CreatureAttack, CreaturePassive, News, Post, Spell, SpellEffectLink
+
+FORMATS = ('jsonl', 'csv')
+CONTENT_TYPES = {'jsonl': 'application/x-ndjson; charset=utf-8', 'csv': 'text/csv; charset=utf-8'}
+META_FIELDS = ('id', 'created_at', 'updated_at')
+# насколько раньше отметки начинается инкрементальная выгрузка: запас на долгие транзакции
+SINCE_OVERLAP = timedelta(minutes=5)
+
+
+def parse_watermark(value):
+    """Отметка инкрементальной выгрузки из ISO-строки; время без зоны считается в TIME_ZONE проекта."""
+    moment = parse_datetime(value.strip()) if value else None
+    if moment is None:
+        raise ValueError(f'Некорректная отметка времени: {value!r}, ожидается ISO 8601')
+    return timezone.make_aware(moment) if timezone.is_naive(moment) else moment
+
+
+def _children(objects):
+    return [{name: getattr(obj, name) for name in CHILD_FIELDS} for obj in objects]
+
+
+def _creature(creature):
+    return {
+        'category': creature.category.name,
+        **{name: getattr(creature, name) for name in CREATURE_FIELDS},
+        # порядок как на странице существа: Meta.ordering дочерних моделей
+        'attacks': _children(creature.attacks.all()),
+        'passives': _children(creature.passives.all()),
+    }
+
+
+def _spell(spell):
+    return {
+        'category': spell.category.slug or spell.category.name,
+        **{name: getattr(spell, name) for name in SPELL_FIELDS},
+        'effects': [
+            {'slug': link.effect.slug, 'name': link.effect.name, 'note': link.note}
+            for link in spell.spelleffectlink_set.all()
+        ],
+    }
+
+
+def _post(post):
+    return {
+        'title': post.title, 'slug': post.slug, 'text': post.text,
+        'category': post.category.slug if post.category else None,
+        'author': post.author.full_name,
+    }
+
+
+def _news(news):
+    return {'title': news.title, 'slug': news.slug, 'text': news.text}
+
+
+class Export:
+    """
+    Что выгружается для модели: вид записи, ключи записи (колонки CSV), связи для select/prefetch,
+    дочерние модели (модель, поле родителя), правки которых тоже попадают в инкрементальную выгрузку.
+    """
+
+    def __init__(self, kind, model, serialize, fields, related=(), prefetch=(), children=()):
+        self.kind = kind
+        self.model = model
+        self.serialize = serialize
+        self.columns = ['type', *META_FIELDS, *fields]
+        self.related = related
+        self.prefetch = prefetch
+        self.children = children
+
+
+EXPORTS = {
+    'creatures': Export('creature', Creature, _creature, ['category', *CREATURE_FIELDS, 'attacks', 'passives'],
+                        related=('category',), prefetch=('attacks', 'passives'),
+                        children=((CreatureAttack, 'creature'), (CreaturePassive, 'creature'))),
+    'spells': Export('spell', Spell, _spell, ['category', *SPELL_FIELDS, 'effects'],
+                     related=('category',), prefetch=('spelleffectlink_set__effect',),
+                     children=((SpellEffectLink, 'spell'),)),
+    'posts': Export('post', Post, _post, ['title', 'slug', 'text', 'category', 'author'],
+                    related=('category', 'author')),
+    'news': Export('news', News, _news, ['title', 'slug', 'text']),
+}
+
+
+class WikiExport:
+    """
+    Одна выгрузка: итерация по rows() или lines(fmt). После прохода count — число строк,
+    last_watermark — наибольшая дата изменения среди них (или since, если строк не было).
+    """
+
+    def __init__(self, name, since=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.export = EXPORTS[name]
+        self.since = since
+        self.chunk_size = chunk_size
+        self.count = 0
+        self.last_watermark = since
+
+    def queryset(self):
+        model = self.export.model
+        # дата изменения строки — для порядка и отметки; без дочерних строк — просто updated_at
+        dates = [Coalesce(children_updated_at(child, parent_field), 'updated_at')
+                 for child, parent_field in self.export.children]
+        if self.since is None:
+            queryset = model.objects.order_by('pk')
+        else:
+            since = self.since - SINCE_OVERLAP
+            # deleted_at: мягкое удаление не обновляет updated_at
+            changed = Q(updated_at__gt=since) | Q(deleted_at__gt=since)
+            for child, parent_field in self.export.children:
+                changed |= Q(pk__in=child.objects.filter(updated_at__gt=since).values(parent_field))
+            dates.append(Coalesce('deleted_at', 'updated_at'))
+            queryset = model.objects.unfiltered().filter(changed)
+        queryset = queryset.annotate(changed_at=Greatest('updated_at', *dates) if dates else F('updated_at'))
+        if self.since is not None:
+            queryset = queryset.order_by('changed_at', 'pk')
+        if self.export.related:
+            queryset = queryset.select_related(*self.export.related)
+        return queryset
+
+    def rows(self):
+        queryset = self.queryset()
+        if self.export.prefetch:
+            queryset = queryset.prefetch_related(*self.export.prefetch)
+        for obj in queryset.iterator(chunk_size=self.chunk_size):
+            changed = obj.changed_at
+            if self.last_watermark is None or changed > self.last_watermark:
+                self.last_watermark = changed
+            self.count += 1
+            if obj.is_deleted:
+                yield {'type': self.export.kind, 'id': obj.pk, 'deleted': True}
+                continue
+            yield {
+                'type': self.export.kind, 'id': obj.pk, 'created_at': obj.created_at, 'updated_at': obj.updated_at,
+                **self.export.serialize(obj),
+            }
+
+    def lines(self, fmt):
+        """Строки файла выгрузки (str) по одной — для StreamingHttpResponse и записи в файл."""
+        if fmt == 'jsonl':
+            for row in self.rows():
+                yield json.dumps(row, cls=ArchiveJSONEncoder, ensure_ascii=False) + '\n'
+            return
+
+        buffer = _LineBuffer()
+        columns = self.export.columns + (['deleted'] if self.since is not None else [])
+        writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction='ignore')
+        writer.writeheader()
+        yield buffer.pop()
+        encoder = ArchiveJSONEncoder(ensure_ascii=False)
+        for row in self.rows():
+            writer.writerow({
+                key: encoder.encode(value) if isinstance(value, (list, dict)) else _csv_value(value)
+                for key, value in row.items()
+            })
+            yield buffer.pop()
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+class _LineBuffer:
+    """Файлоподобный объект для csv.writer: отдаёт записанную строку, не накапливая файл."""
+
+    def __init__(self):
+        self._parts = []
+
+    def write(self, value):
+        self._parts.append(value)
+
+    def pop(self):
+        line = ''.join(self._parts)
+        self._parts.clear()
+        return line
@@ -0,0 +1,219 @@
+"""
+Фильтры списков вики: бестиарий (CreatureFilterForm) и заклинания (SpellFilterForm).
+
+CreatureFilterForm разбирает GET-параметры списка существ: категории, размеры, диапазоны опасности,
+хитов, КД, шести характеристик и урона за раунд (Creature.damage_per_round), сортировку. Фасеты
+(сколько существ в каждой категории, размере и полосе опасности) считаются одним GROUP BY по
+(category, size, dangerous_level): групп не больше «категории × 5 размеров × 21 уровень», а счётчики
+каждого фасета собираются из них в Python.
+Фасет не учитывает собственный фильтр — выбрав категорию, видно, сколько существ в соседних.
+
+SpellFilterForm фильтрует заклинания по числовому уровню (Spell.level: точные значения и диапазон), категории и сочетаниям эффектов
+«все из / хотя бы один из / ни одного из» по денормализованному набору эффектов (apps.wiki.effect_set).
+"""
+from django import forms
+from django.db.models import Count
+from django.utils.functional import cached_property
+
+from apps.wiki.effect_set import filter_by_effects
+from apps.wiki.models import CREATURE_SIZE_CHOICES, SPELL_LEVEL_NUMBER_CHOICES
+
+# колонки с фильтром «от–до»: имя поля -> подпись
+RANGE_FIELDS = {
+    'dangerous_level': 'Опасность',
+    'health': 'Хиты',
+    'armor_class': 'КД',
+    'strength': 'Сила',
+    'dexterity': 'Ловкость',
+    'body_condition': 'Телосложение',
+    'intelligence': 'Интеллект',
+    'wisdom': 'Мудрость',
+    'charisma': 'Харизма',
+    'damage_per_round': 'Урон за раунд',
+}
+
+# полосы опасности для фасета: (нижняя граница, верхняя граница)
+DANGER_BANDS = ((0, 4), (5, 8), (9, 12), (13, 16), (17, 20))
+
+SORT_CHOICES = (
+    ('name', 'По названию'),
+    ('-dangerous_level', 'Сначала опасные'),
+    ('dangerous_level', 'Сначала безобидные'),
+    ('-health', 'Больше хитов'),
+    ('-armor_class', 'Выше КД'),
+    ('-damage_per_round', 'Больше урона за раунд'),
+)
+
+SPELL_SORT_CHOICES = (
+    ('name', 'По названию'),
+    ('level', 'По уровню'),
+    ('-level', 'Сначала высокий уровень'),
+)
+
+
+class CreatureFilterForm(forms.Form):
+    category = forms.TypedMultipleChoiceField(label='Категория', coerce=int, required=False,
+                                              widget=forms.CheckboxSelectMultiple)
+    size = forms.MultipleChoiceField(label='Размер', choices=CREATURE_SIZE_CHOICES, required=False,
+                                     widget=forms.CheckboxSelectMultiple)
+    sort = forms.ChoiceField(label='Сортировка', choices=SORT_CHOICES, required=False)
+
+    def __init__(self, *args, categories=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        # категории передаются готовым списком: форма не делает своих запросов к БД
+        self.fields['category'].choices = [(category.pk, category.name) for category in categories]
+        for name, label in RANGE_FIELDS.items():
+            self.fields[f'{name}_min'] = forms.IntegerField(label=f'{label} от', min_value=0, required=False)
+            self.fields[f'{name}_max'] = forms.IntegerField(label=f'{label} до', min_value=0, required=False)
+
+    def range_rows(self):
+        """Пары полей «от–до» для шаблона."""
+        return [(label, self[f'{name}_min'], self[f'{name}_max']) for name, label in RANGE_FIELDS.items()]
+
+    @cached_property
+    def values(self):
+        # некорректные значения просто не участвуют в фильтрации
+        self.is_valid()
+        cleaned = getattr(self, 'cleaned_data', {})
+        return {name: value for name, value in cleaned.items() if value not in (None, '', [])}
+
+    def ranges(self):
+        """{поле: (от, до)} — только заданные диапазоны."""
+        values = self.values
+        return {
+            name: (values.get(f'{name}_min'), values.get(f'{name}_max'))
+            for name in RANGE_FIELDS
+            if f'{name}_min' in values or f'{name}_max' in values
+        }
+
+    def ordering(self):
+        sort = self.values.get('sort', 'name')
+        return [sort] if sort == 'name' else [sort, 'name']
+
+    def filter(self, queryset, facets=True):
+        """
+        Применяет фильтры. facets=False пропускает фильтры по категории, размеру и опасности —
+        их учитывает подсчёт фасетов.
+        """
+        values = self.values
+        ranges = self.ranges()
+        lookups = {}
+        for name, (low, high) in ranges.items():
+            if name == 'dangerous_level' and not facets:
+                continue
+            if low is not None:
+                lookups[f'{name}__gte'] = low
+            if high is not None:
+                lookups[f'{name}__lte'] = high
+        if facets and values.get('category'):
+            lookups['category__in'] = values['category']
+        if facets and values.get('size'):
+            lookups['size__in'] = values['size']
+        return queryset.filter(**lookups)
+
+    def facets(self, queryset):
+        """
+        Счётчики фасетов одним запросом. queryset — ещё не отфильтрованная выборка существ.
+        Возвращает {'category': {pk: n}, 'size': {размер: n}, 'danger': {(от, до): n}, 'total': n}.
+        """
+        values = self.values
+        categories = set(values.get('category', ()))
+        sizes = set(values.get('size', ()))
+        danger_low, danger_high = self.ranges().get('dangerous_level', (None, None))
+
+        def category_ok(category):
+            return not categories or category in categories
+
+        def size_ok(size):
+            return not sizes or size in sizes
+
+        def danger_ok(level):
+            return (danger_low is None or level >= danger_low) and (danger_high is None or level <= danger_high)
+
+        groups = (
+            self.filter(queryset, facets=False)
+            .order_by()
+            .values_list('category', 'size', 'dangerous_level')
+            .annotate(count=Count('pk'))
+        )
+        counts = {'category': {}, 'size': {}, 'danger': dict.fromkeys(DANGER_BANDS, 0), 'total': 0}
+        for category, size, level, count in groups:
+            if size_ok(size) and danger_ok(level):
+                counts['category'][category] = counts['category'].get(category, 0) + count
+            if category_ok(category) and danger_ok(level):
+                counts['size'][size] = counts['size'].get(size, 0) + count
+            if category_ok(category) and size_ok(size):
+                for band in DANGER_BANDS:
+                    if band[0] <= level <= band[1]:
+                        counts['danger'][band] += count
+            if category_ok(category) and size_ok(size) and danger_ok(level):
+                counts['total'] += count
+        return counts
+
+    def facet_rows(self, counts):
+        """Фасеты для боковой панели: чекбоксы категорий и размеров со счётчиками, полосы опасности."""
+        danger_low, danger_high = self.ranges().get('dangerous_level', (None, None))
+        return {
+            'category': [
+                (widget, counts['category'].get(widget.data['value'], 0)) for widget in self['category']
+            ],
+            'size': [(widget, counts['size'].get(widget.data['value'], 0)) for widget in self['size']],
+            'danger': [
+                {'low': low, 'high': high, 'count': count, 'active': (danger_low, danger_high) == (low, high)}
+                for (low, high), count in counts['danger'].items()
+            ],
+            'total': counts['total'],
+        }
+
+
+class SpellFilterForm(forms.Form):
+    level = forms.TypedMultipleChoiceField(label='Уровень', choices=SPELL_LEVEL_NUMBER_CHOICES, coerce=int,
+                                           required=False, widget=forms.CheckboxSelectMultiple)
+    level_min = forms.IntegerField(label='Уровень от', min_value=0, max_value=6, required=False)
+    level_max = forms.IntegerField(label='Уровень до', min_value=0, max_value=6, required=False)
+    category = forms.MultipleChoiceField(label='Категория', required=False, widget=forms.CheckboxSelectMultiple)
+    effects_all = forms.MultipleChoiceField(label='Все эффекты', required=False)
+    effects_any = forms.MultipleChoiceField(label='Любой из эффектов', required=False)
+    effects_none = forms.MultipleChoiceField(label='Без эффектов', required=False)
+    sort = forms.ChoiceField(label='Сортировка', choices=SPELL_SORT_CHOICES, required=False)
+
+    def __init__(self, *args, categories=(), effects=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        # в URL — слаги; для фильтра нужны pk, поэтому запоминаем соответствие
+        self.category_ids = {category.slug: category.pk for category in categories if category.slug}
+        self.effect_ids = {effect.slug: effect.pk for effect in effects if effect.slug}
+        self.fields['category'].choices = [(category.slug, category.name) for category in categories if category.slug]
+        effect_choices = [(effect.slug, effect.name) for effect in effects if effect.slug]
+        for name in ('effects_all', 'effects_any', 'effects_none'):
+            self.fields[name].choices = effect_choices
+
+    @cached_property
+    def values(self):
+        self.is_valid()
+        cleaned = getattr(self, 'cleaned_data', {})
+        return {name: value for name, value in cleaned.items() if value not in (None, '', [])}
+
+    def ordering(self):
+        sort = self.values.get('sort', 'name')
+        return [sort] if sort == 'name' else [sort, 'name']
+
+    @property
+    def grouped_by_level(self):
+        return self.values.get('sort', 'name') != 'name'
+
+    def filter(self, queryset):
+        values = self.values
+        if values.get('level'):
+            queryset = queryset.filter(level__in=values['level'])
+        if 'level_min' in values:
+            queryset = queryset.filter(level__gte=values['level_min'])
+        if 'level_max' in values:
+            queryset = queryset.filter(level__lte=values['level_max'])
+        if values.get('category'):
+            queryset = queryset.filter(category__in=[self.category_ids[slug] for slug in values['category']])
+        return filter_by_effects(
+            queryset,
+            all_ids=[self.effect_ids[slug] for slug in values.get('effects_all', ())],
+            any_ids=[self.effect_ids[slug] for slug in values.get('effects_any', ())],
+            none_ids=[self.effect_ids[slug] for slug in values.get('effects_none', ())],
+        )
@@ -73,19 +73,71 @@ class SpellForm(forms.ModelForm):
         }
 
 
+class EffectChoiceField(forms.ModelChoiceField):
+    """Выбор эффекта: сначала среди эффектов, загруженных формсетом для всех форм (resolved)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.resolved = {}
+
+    def to_python(self, value):
+        effect = self.resolved.get(str(value))
+        return effect if effect is not None else super().to_python(value)
+
+
+class BaseSpellEffectLinkFormSet(forms.BaseInlineFormSet):
+    """
+    Эффекты, выбранные во всех формах, загружаются одним запросом, а не ModelChoiceField.to_python() на каждую
+    форму; сохранённые связи берут текст для примечания из уже загруженного эффекта (apps.wiki.effect_notes).
+    """
+
+    def full_clean(self):
+        if self.is_bound:
+            values = {str(self.data.get(form.add_prefix('effect'), '')) for form in self.forms}
+            pks = [int(value) for value in values if value.isdigit()]
+            queryset = self.form.base_fields['effect'].queryset
+            resolved = {str(pk): effect for pk, effect in queryset.in_bulk(pks).items()} if pks else {}
+            for form in self.forms:
+                if isinstance(form.fields.get('effect'), EffectChoiceField):
+                    form.fields['effect'].resolved = resolved
+        super().full_clean()
+
+    def clean(self):
+        super().clean()
+        # пара (заклинание, эффект) уникальна; формы не проверяют её сами (SpellEffectLinkForm)
+        seen = set()
+        for form in self.forms:
+            effect = form.cleaned_data.get('effect') if form.cleaned_data else None
+            if effect is None or (self.can_delete and form.cleaned_data.get('DELETE')):
+                continue
+            if effect in seen:
+                raise forms.ValidationError(f'Эффект «{effect}» указан несколько раз.')
+            seen.add(effect)
+
+
 class SpellEffectLinkForm(forms.ModelForm):
     class Meta:
         model = SpellEffectLink
         fields = ['effect']
+        field_classes = {'effect': EffectChoiceField}
         widgets = {
             'note': forms.Textarea(attrs={'rows': 6, 'style': 'resize: vertical'}),
         }
 
+    def _get_validation_exclusions(self):
+        exclude = super()._get_validation_exclusions()
+        # эффект найден запросом формсета: без исключения модель проверяла бы его существование и пару
+        # (заклинание, эффект) запросом на форму; повторы пар проверяет BaseSpellEffectLinkFormSet.clean()
+        if self.cleaned_data.get('effect') in self.fields['effect'].resolved.values():
+            exclude.add('effect')
+        return exclude
+
 
 SpellEffectFormSet = inlineformset_factory(
     parent_model=Spell,
     model=SpellEffectLink,
     form=SpellEffectLinkForm,
+    formset=BaseSpellEffectLinkFormSet,
     extra=1,
     can_delete=True,
     validate_max=False,
@@ -96,3 +148,24 @@ SpellEffectFormSet = inlineformset_factory(
 
 
 
+
+
+# Импорт существ и заклинаний из файла (админка, см. apps.wiki.importer)
+
+# импорт идёт прямо в запросе админки: файлы больше этого — командой import_wiki
+IMPORT_MAX_UPLOAD_SIZE = 5 * 1024 * 1024
+
+
+class WikiImportForm(forms.Form):
+    file = forms.FileField(label='Файл', help_text='JSON Lines (.jsonl) или CSV (.csv), не больше 5 МБ')
+    kind = forms.ChoiceField(label='Вид записей без поля type', choices=(('creature', 'Существа'),
+                                                                       ('spell', 'Заклинания')))
+
+    def clean_file(self):
+        upload = self.cleaned_data['file']
+        if upload.size > IMPORT_MAX_UPLOAD_SIZE:
+            raise forms.ValidationError(
+                f'Файл больше {IMPORT_MAX_UPLOAD_SIZE // (1024 * 1024)} МБ: загрузите его командой '
+                f'manage.py import_wiki.'
+            )
+        return upload
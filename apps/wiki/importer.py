@@ -0,0 +1,352 @@
+"""
+Потоковый импорт существ и заклинаний из JSON Lines или CSV.
+
+Одна запись — одно существо (с атаками и особенностями) или одно заклинание (с эффектами):
+
+    {"type": "creature", "name": "Волк", "category": "Звери", "description": "...", "health": 11,
+     "attacks": [{"name": "Укус", "text": "..."}], "passives": [{"name": "Чутьё", "text": "..."}]}
+    {"type": "spell", "name": "Огненный шар", "category": "evocation", "spell_level": "3",
+     "description": "...", "effects": ["ogon", "vzryv"]}
+
+Категория задаётся названием (у заклинаний — ещё и слагом), эффекты — слагами или названиями (или объектами
+{"slug": ...}, как в выгрузке apps.wiki.exporter; id и даты выгрузки пропускаются). В CSV каждая
+колонка — поле, вложенные attacks/passives/effects — JSON в ячейке; колонка type необязательна, если вид
+записей передан вызывающим кодом.
+
+Записи читаются и проверяются пачками по chunk_size: справочники загружаются один раз, занятые имена и слаги
+проверяются одним запросом на пачку, пачка пишется bulk_create в собственной транзакции. Память не растёт
+с размером файла: в ней только текущая пачка. Ошибки отдаются по строкам файла через on_error.
+"""
+import csv
+import json
+from collections import defaultdict
+
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, transaction
+
+from apps.common.managers import DEFAULT_CHUNK_SIZE
+from apps.common.utils import bulk_unique_slugify
+from apps.wiki import autolink, encounters, related, similar
+from apps.wiki.attacks import damage_per_round
+from apps.wiki.effect_set import encode
+from apps.wiki.models import Creature, CreatureAttack, CreatureCategory, CreaturePassive, Spell, SpellCategory, \
+    SpellEffect, SpellEffectLink, SPELL_LEVEL_NUMBERS
+
+FORMATS = ('jsonl', 'csv')
+KINDS = ('creature', 'spell')
+
+CREATURE_FIELDS = (
+    'name', 'slug', 'description', 'health', 'armor_class', 'speed', 'size', 'saving_throws', 'skills',
+    'dangerous_level', 'mastery', 'strength', 'dexterity', 'body_condition', 'intelligence', 'wisdom', 'charisma',
+)
+SPELL_FIELDS = (
+    'name', 'slug', 'description', 'spell_level', 'casting_time', 'distance', 'duration', 'requirements',
+    'special_components',
+)
+CHILD_FIELDS = ('name', 'text')
+# служебные поля выгрузки (apps.wiki.exporter): при импорте не используются
+IGNORED_FIELDS = ('type', 'id', 'created_at', 'updated_at')
+NESTED_FIELDS = {'creature': ('attacks', 'passives'), 'spell': ('effects',)}
+
+
+class ImportFormatError(ValueError):
+    """Файл целиком не читается: неизвестный формат или вид записей."""
+
+
+def format_for(filename):
+    """Формат по расширению файла: .jsonl/.ndjson/.json — JSON Lines, .csv — CSV."""
+    suffix = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    if suffix in ('jsonl', 'ndjson', 'json'):
+        return 'jsonl'
+    if suffix == 'csv':
+        return 'csv'
+    raise ImportFormatError(f'Не удалось определить формат файла {filename}: ожидается .jsonl или .csv')
+
+
+def read_records(lines, fmt):
+    """Отдаёт (номер строки, запись или ValidationError) по мере чтения текстового потока."""
+    if fmt == 'jsonl':
+        for number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as error:
+                yield number, ValidationError(f'Некорректный JSON: {error}')
+                continue
+            if not isinstance(record, dict):
+                yield number, ValidationError('Запись должна быть JSON-объектом')
+                continue
+            yield number, record
+    elif fmt == 'csv':
+        reader = csv.DictReader(lines)
+        for row in reader:
+            record = {key: value for key, value in row.items() if key and value not in (None, '')}
+            for name in ('attacks', 'passives', 'effects'):
+                if name in record:
+                    try:
+                        record[name] = json.loads(record[name])
+                    except ValueError:
+                        # эффекты можно перечислить и без JSON: "ogon;vzryv"
+                        record[name] = record[name].split(';') if name == 'effects' else record[name]
+            yield reader.line_num, record
+    else:
+        raise ImportFormatError(f'Неизвестный формат {fmt}, доступны: {", ".join(FORMATS)}')
+
+
+def _batches(records, size):
+    batch = []
+    for item in records:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _clean(instance, exclude):
+    # проверки полей без запросов к БД: уникальность проверяется одним запросом на пачку
+    instance.clean_fields(exclude=exclude)
+    instance.clean()
+
+
+def _error_dict(error):
+    return error.message_dict if hasattr(error, 'error_dict') else {'__all__': error.messages}
+
+
+class WikiImporter:
+    """
+    Импорт одного файла. Справочники категорий и эффектов загружаются при первом обращении и не меняются
+    за время импорта: новые категории и эффекты импорт не создаёт.
+
+    created — {'creature': n, 'spell': n}, failed — число отклонённых записей.
+    """
+
+    def __init__(self, kind=None, chunk_size=DEFAULT_CHUNK_SIZE, on_error=None, index=True):
+        if kind is not None and kind not in KINDS:
+            raise ImportFormatError(f'Неизвестный вид записей {kind}, доступны: {", ".join(KINDS)}')
+        self.kind = kind
+        self.chunk_size = chunk_size
+        self.on_error = on_error
+        self.index = index
+        self.created = {kind: 0 for kind in KINDS}
+        self.failed = 0
+        self._lookups = {}
+
+    # справочники
+
+    def _lookup(self, name):
+        if name not in self._lookups:
+            if name == 'creature_category':
+                rows = CreatureCategory.objects.values_list('name', 'pk')
+            elif name == 'spell_category':
+                rows = [(key, pk) for pk, slug, title in SpellCategory.objects.values_list('pk', 'slug', 'name')
+                        for key in (title, slug) if key]
+            else:
+                rows = [(key, pk) for pk, slug, title in SpellEffect.objects.values_list('pk', 'slug', 'name')
+                        for key in (title, slug) if key]
+            self._lookups[name] = dict(rows)
+        return self._lookups[name]
+
+    # чтение
+
+    def run(self, lines, fmt):
+        for batch in _batches(read_records(lines, fmt), self.chunk_size):
+            self._import_batch(batch)
+        return self
+
+    def _reject(self, number, errors):
+        self.failed += 1
+        if self.on_error:
+            self.on_error(number, errors)
+
+    def _import_batch(self, batch):
+        built = defaultdict(list)
+        for number, record in batch:
+            if isinstance(record, ValidationError):
+                self._reject(number, _error_dict(record))
+                continue
+            kind = record.get('type', self.kind)
+            if kind not in KINDS:
+                self._reject(number, {'type': [f'Неизвестный вид записи: {kind!r}']})
+                continue
+            try:
+                built[kind].append((number, *getattr(self, f'_build_{kind}')(record)))
+            except ValidationError as error:
+                self._reject(number, _error_dict(error))
+
+        if built['creature']:
+            self._write(Creature, built['creature'], self._write_creatures)
+        if built['spell']:
+            self._write(Spell, built['spell'], self._write_spells)
+
+    # сборка объектов
+
+    def _build_children(self, model, items, field):
+        if not isinstance(items, list):
+            raise ValidationError({field: ['Ожидается список объектов {"name", "text"}']})
+        children = []
+        for item in items:
+            if not isinstance(item, dict) or set(item) - set(CHILD_FIELDS):
+                raise ValidationError({field: ['Ожидается список объектов {"name", "text"}']})
+            child = model(**item)
+            try:
+                _clean(child, exclude=['creature'])
+            except ValidationError as error:
+                raise ValidationError({field: [f'{key}: {" ".join(messages)}'
+                                               for key, messages in error.message_dict.items()]})
+            children.append(child)
+        return children
+
+    def _split(self, record, kind, fields):
+        unknown = set(record) - set(fields) - set(NESTED_FIELDS[kind]) - set(IGNORED_FIELDS) - {'category'}
+        if unknown:
+            raise ValidationError({'__all__': [f'Неизвестные поля: {", ".join(sorted(unknown))}']})
+        return {name: record[name] for name in fields if name in record}
+
+    def _build_creature(self, record):
+        creature = Creature(**self._split(record, 'creature', CREATURE_FIELDS))
+        errors = {}
+        category_id = self._lookup('creature_category').get(record.get('category'))
+        if category_id is None:
+            errors['category'] = [f'Категория существ {record.get("category")!r} не найдена']
+        creature.category_id = category_id
+        try:
+            _clean(creature, exclude=['slug', 'category', 'image'])
+        except ValidationError as error:
+            errors.update(error.message_dict)
+
+        children = {}
+        for field, model in (('attacks', CreatureAttack), ('passives', CreaturePassive)):
+            try:
+                children[field] = self._build_children(model, record.get(field, []), field)
+            except ValidationError as error:
+                errors.update(error.message_dict)
+        if errors:
+            raise ValidationError(errors)
+        # bulk_create не вызывает save(): колонки атак и урон за раунд заполняются здесь
+        for attack in children['attacks']:
+            attack.fill_parsed()
+        creature.damage_per_round = damage_per_round(attack.average_damage for attack in children['attacks'])
+        return creature, children
+
+    def _build_spell(self, record):
+        spell = Spell(**self._split(record, 'spell', SPELL_FIELDS))
+        errors = {}
+        category_id = self._lookup('spell_category').get(record.get('category'))
+        if category_id is None:
+            errors['category'] = [f'Категория заклинаний {record.get("category")!r} не найдена']
+        spell.category_id = category_id
+        try:
+            _clean(spell, exclude=['slug', 'category', 'image'])
+        except ValidationError as error:
+            errors.update(error.message_dict)
+
+        effects = record.get('effects', [])
+        if isinstance(effects, list):
+            # в выгрузке эффект — объект {"slug", "name", "note"}; примечание берётся из текста эффекта
+            effects = [effect.get('slug') or effect.get('name') if isinstance(effect, dict) else effect
+                       for effect in effects]
+        else:
+            effects = None
+        known = self._lookup('spell_effect')
+        missing = [effect for effect in effects or [] if not isinstance(effect, str) or effect not in known]
+        if effects is None or missing:
+            errors['effects'] = [f'Эффекты не найдены: {", ".join(map(str, missing))}' if missing
+                                 else 'Ожидается список слагов или названий эффектов']
+        if errors:
+            raise ValidationError(errors)
+
+        # save() и обработчики связей не вызываются: производные поля заполняются здесь,
+        # примечания связей — в SpellEffectLink.objects.bulk_create() по текстам эффектов на момент записи
+        links = list(dict.fromkeys(known[effect] for effect in effects))
+        spell.level = SPELL_LEVEL_NUMBERS.get(spell.spell_level, 0)
+        spell.effect_set = encode(links)
+        return spell, {'effects': [SpellEffectLink(effect_id=pk) for pk in links]}
+
+    # запись
+
+    def _unique_names(self, model, rows):
+        """Отклоняет строки с уже занятыми именами — одним запросом на пачку и с учётом повторов внутри неё."""
+        if not any(field.name == 'name' and field.unique for field in model._meta.fields):
+            return rows
+        names = [obj.name for _, obj, _ in rows]
+        taken = set(model._base_manager.filter(name__in=names).values_list('name', flat=True))
+        accepted = []
+        for row in rows:
+            number, obj, _ = row
+            if obj.name in taken:
+                self._reject(number, {'name': [f'{model._meta.verbose_name} с таким названием уже существует']})
+                continue
+            taken.add(obj.name)
+            accepted.append(row)
+        return accepted
+
+    def _unique_slugs(self, model, rows):
+        given = [obj.slug for _, obj, _ in rows if obj.slug]
+        taken = set(model._base_manager.filter(slug__in=given).values_list('slug', flat=True))
+        accepted = []
+        for row in rows:
+            number, obj, _ = row
+            if obj.slug and obj.slug in taken:
+                self._reject(number, {'slug': ['Слаг уже занят']})
+                continue
+            if obj.slug:
+                taken.add(obj.slug)
+            accepted.append(row)
+        return accepted
+
+    def _write(self, model, rows, write_children):
+        rows = self._unique_slugs(model, self._unique_names(model, rows))
+        if not rows:
+            return
+        objects = bulk_unique_slugify([obj for _, obj, _ in rows])
+        try:
+            with transaction.atomic():
+                model.objects.bulk_create(objects)
+                write_children(rows)
+        except DatabaseError as error:
+            # гонка за имя или слаг с параллельной записью: пачка откатывается целиком
+            for number, _, _ in rows:
+                self._reject(number, {'__all__': [f'Пачка не записана: {error}']})
+            return
+
+        self.created[model._meta.model_name] += len(objects)
+        # bulk_create идёт без сигналов: ссылки в текстах и индекс встреч перечитаются из БД
+        transaction.on_commit(autolink.invalidate)
+        if model is Creature:
+            transaction.on_commit(encounters.invalidate)
+            pks = [obj.pk for obj in objects]
+            transaction.on_commit(lambda: similar.update_creatures(pks))
+        if model is Spell:
+            # ряды новых заклинаний; в ряды прежних они попадут при rebuild_related_spells
+            related.schedule([obj.pk for obj in objects])
+        if self.index:
+            from apps.search.index import index_objects
+            index_objects(model, [obj.pk for obj in objects])
+
+    def _write_creatures(self, rows):
+        attacks, passives = [], []
+        for _, creature, children in rows:
+            for attack in children['attacks']:
+                attack.creature = creature
+                attacks.append(attack)
+            for passive in children['passives']:
+                passive.creature = creature
+                passives.append(passive)
+        CreatureAttack.objects.bulk_create(attacks)
+        CreaturePassive.objects.bulk_create(passives)
+
+    def _write_spells(self, rows):
+        links = []
+        for _, spell, children in rows:
+            for link in children['effects']:
+                link.spell = spell
+                links.append(link)
+        SpellEffectLink.objects.bulk_create(links)
+
+
+def import_wiki(lines, fmt, kind=None, chunk_size=DEFAULT_CHUNK_SIZE, on_error=None, index=True):
+    """Импортирует записи из текстового потока lines. Возвращает WikiImporter с итогами."""
+    return WikiImporter(kind, chunk_size, on_error, index).run(lines, fmt)
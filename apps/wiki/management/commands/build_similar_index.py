@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from apps.wiki.similar import rebuild
+
+
+class Command(BaseCommand):
+    help = (
+        'Строит индекс похожих существ (SIMILAR_INDEX_DIR): заново нормирует характеристики по всему '
+        'бестиарию и пишет новое поколение файлов. Сайт индекс не строит — без него панель похожих пуста. '
+        'Запускать при развёртывании, после загрузки фикстур и массовых изменений существ: правки существ '
+        'индекс подхватывает сам, но нормировку не пересчитывает, а новые строки ограничены ёмкостью.'
+    )
+
+    def handle(self, *args, **options):
+        count = rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Индекс похожих существ перестроен: {count} существ'))
@@ -0,0 +1,51 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.common.managers import DEFAULT_CHUNK_SIZE
+from apps.wiki.exporter import EXPORTS, FORMATS, WikiExport, parse_watermark
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково выгружает существа, заклинания, статьи или новости в JSON Lines или CSV. '
+        'С --since или --state-file выгружает только изменённое после отметки (вместе с удалёнными).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', choices=sorted(EXPORTS), help='Что выгружать.')
+        parser.add_argument('--format', choices=FORMATS, default='jsonl', help='Формат (по умолчанию jsonl).')
+        parser.add_argument('--output', help='Файл выгрузки (по умолчанию stdout).')
+        parser.add_argument('--since', help='Выгрузить строки, изменённые после этой отметки (ISO 8601).')
+        parser.add_argument('--state-file',
+                            help='Файл с отметкой прошлой выгрузки: читается вместо --since, после успешной '
+                                 'выгрузки в него записывается новая отметка.')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                            help='Сколько строк выбирать из БД за один запрос (с дочерними строками).')
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] <= 0:
+            raise CommandError('--chunk-size должен быть > 0.')
+
+        since = options['since']
+        state_file = Path(options['state_file']) if options['state_file'] else None
+        if since is None and state_file and state_file.exists():
+            since = state_file.read_text(encoding='utf-8').strip() or None
+        try:
+            since = parse_watermark(since) if since else None
+        except ValueError as error:
+            raise CommandError(str(error))
+
+        export = WikiExport(options['name'], since, options['chunk_size'])
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as output:
+                output.writelines(export.lines(options['format']))
+        else:
+            for line in export.lines(options['format']):
+                self.stdout.write(line, ending='')
+
+        watermark = export.last_watermark.isoformat() if export.last_watermark else None
+        if state_file and watermark:
+            state_file.write_text(watermark, encoding='utf-8')
+        # stdout может быть самой выгрузкой — итог пишем в stderr
+        self.stderr.write(self.style.SUCCESS(f'{options["name"]}: выгружено {export.count}, отметка {watermark or "—"}'))
@@ -0,0 +1,68 @@
+import csv
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.common.managers import DEFAULT_CHUNK_SIZE
+from apps.wiki.importer import FORMATS, KINDS, ImportFormatError, format_for, import_wiki
+
+
+class Command(BaseCommand):
+    help = (
+        'Импортирует существа (с атаками и особенностями) и заклинания (с эффектами) из JSON Lines или CSV. '
+        'Файл читается потоком, записи проверяются и пишутся пачками; отклонённые строки выводятся в отчёт.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к файлу или «-» для чтения из stdin.')
+        parser.add_argument('--format', choices=FORMATS,
+                            help='Формат файла (по умолчанию — по расширению; для stdin обязателен).')
+        parser.add_argument('--type', choices=KINDS, dest='kind',
+                            help='Вид записей, у которых нет поля type (например, для CSV только с существами).')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                            help='Сколько записей проверять и записывать за одну транзакцию.')
+        parser.add_argument('--report', help='Записать отклонённые строки в JSONL-файл вместо stderr.')
+        parser.add_argument('--no-search-index', action='store_false', dest='index',
+                            help='Не индексировать импортированное для поиска (потом: rebuild_search_index).')
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] <= 0:
+            raise CommandError('--chunk-size должен быть > 0.')
+        path = options['path']
+        if path == '-' and not options['format']:
+            raise CommandError('Для чтения из stdin укажите --format.')
+
+        try:
+            fmt = options['format'] or format_for(path)
+        except ImportFormatError as error:
+            raise CommandError(str(error))
+
+        report = open(options['report'], 'w', encoding='utf-8') if options['report'] else None
+
+        def on_error(number, errors):
+            if report:
+                report.write(json.dumps({'line': number, 'errors': errors}, ensure_ascii=False) + '\n')
+            else:
+                details = '; '.join(f'{field}: {" ".join(messages)}' for field, messages in errors.items())
+                self.stderr.write(f'строка {number}: {details}')
+
+        try:
+            stream = sys.stdin if path == '-' else open(path, encoding='utf-8-sig', newline='')
+        except OSError as error:
+            raise CommandError(str(error))
+        try:
+            result = import_wiki(stream, fmt, options['kind'], options['chunk_size'], on_error, options['index'])
+        except (ImportFormatError, UnicodeDecodeError, csv.Error) as error:
+            raise CommandError(str(error))
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+            if report:
+                report.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Импортировано существ: {result.created["creature"]}, заклинаний: {result.created["spell"]}'
+        ))
+        if result.failed:
+            self.stdout.write(self.style.WARNING(f'Отклонено записей: {result.failed}'))
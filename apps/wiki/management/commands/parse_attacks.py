@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.common.managers import DEFAULT_CHUNK_SIZE
+from apps.wiki.attacks import reparse_attacks
+
+
+class Command(BaseCommand):
+    help = (
+        'Заново разбирает текст атак существ в колонки (бонус попадания, досягаемость, кости и тип урона) '
+        'и пересчитывает урон за раунд. Нужен после изменения разбора, загрузки фикстур и массовых '
+        'операций с атаками в обход сигналов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                            help='Сколько существ обрабатывать за одну транзакцию.')
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] <= 0:
+            raise CommandError('--chunk-size должен быть > 0.')
+        attacks, changed = reparse_attacks(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Разобрано атак: {attacks}, изменился урон у существ: {changed}'))
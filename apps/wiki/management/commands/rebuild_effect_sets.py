@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.common.managers import DEFAULT_CHUNK_SIZE
+from apps.wiki.effect_set import rebuild_effect_sets
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает наборы эффектов заклинаний (Spell.effect_set) по SpellEffectLink. Нужен после загрузки '
+        'фикстур и массовых bulk_create/update() связей в обход сигналов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                            help='Сколько заклинаний обновлять за один запрос.')
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] <= 0:
+            raise CommandError('--chunk-size должен быть > 0.')
+        rebuilt = rebuild_effect_sets(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Пересчитано наборов эффектов: {rebuilt}'))
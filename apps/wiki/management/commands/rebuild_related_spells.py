@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.common.managers import DEFAULT_CHUNK_SIZE
+from apps.wiki.related import RELATED_LIMIT, rebuild_related_spells
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает таблицу похожих заклинаний (RelatedSpell) по общим эффектам с весом IDF. Запускается '
+        'по расписанию: сайт после правки связей пересчитывает только ряды изменённых заклинаний, а ряды '
+        'остальных заклинаний с теми же эффектами и веса после появления новых заклинаний выравнивает эта '
+        'команда. Нужна и после загрузки фикстур и массовых операций со связями в обход сигналов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                            help='Сколько заклинаний пересчитывать за одну транзакцию.')
+        parser.add_argument('--limit', type=int, default=RELATED_LIMIT,
+                            help='Сколько похожих заклинаний хранить для каждого.')
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] <= 0:
+            raise CommandError('--chunk-size должен быть > 0.')
+        if options['limit'] <= 0:
+            raise CommandError('--limit должен быть > 0.')
+        rebuilt = rebuild_related_spells(chunk_size=options['chunk_size'], limit=options['limit'])
+        self.stdout.write(self.style.SUCCESS(f'Пересчитаны похожие заклинания: {rebuilt}'))
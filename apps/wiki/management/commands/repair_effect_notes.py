@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.common.managers import DEFAULT_CHUNK_SIZE
+from apps.wiki.effect_notes import repair_notes
+
+
+class Command(BaseCommand):
+    help = (
+        'Переписывает примечания связей заклинаний с эффектами (SpellEffectLink.note), разошедшиеся с текстом '
+        'эффекта. Нужен после загрузки фикстур и массовых update() эффектов или связей в обход сигналов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                            help='Сколько эффектов обрабатывать за один запрос.')
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] <= 0:
+            raise CommandError('--chunk-size должен быть > 0.')
+        repaired = repair_notes(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Исправлено примечаний: {repaired}'))
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:06
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wiki', '0021_alter_spellcategory_options'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='creature',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['slug'], name='live_wiki_creatu_slug_fe2cfe'),
+        ),
+        migrations.AddIndex(
+            model_name='creature',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['name'], name='live_wiki_creatu_name_b81625'),
+        ),
+        migrations.AddIndex(
+            model_name='news',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['slug'], name='live_wiki_news_slug_ecf463'),
+        ),
+        migrations.AddIndex(
+            model_name='news',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['title'], name='live_wiki_news_title_33f6b6'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['slug'], name='live_wiki_post_slug_07a552'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['title'], name='live_wiki_post_title_7b7820'),
+        ),
+        migrations.AddIndex(
+            model_name='spell',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['slug'], name='live_wiki_spell_slug_0944db'),
+        ),
+        migrations.AddIndex(
+            model_name='spell',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['name'], name='live_wiki_spell_name_c2ad57'),
+        ),
+    ]
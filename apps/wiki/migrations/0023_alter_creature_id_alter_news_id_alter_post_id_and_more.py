@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:11
+
+import apps.common.utils
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wiki', '0022_creature_live_wiki_creatu_slug_fe2cfe_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='creature',
+            name='id',
+            field=models.UUIDField(default=apps.common.utils.new_uuid, editable=False, primary_key=True, serialize=False, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='news',
+            name='id',
+            field=models.UUIDField(default=apps.common.utils.new_uuid, editable=False, primary_key=True, serialize=False, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='id',
+            field=models.UUIDField(default=apps.common.utils.new_uuid, editable=False, primary_key=True, serialize=False, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='spell',
+            name='id',
+            field=models.UUIDField(default=apps.common.utils.new_uuid, editable=False, primary_key=True, serialize=False, unique=True),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wiki', '0023_alter_creature_id_alter_news_id_alter_post_id_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='creature',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['category', 'size', 'dangerous_level'], name='creature_cat_size_danger'),
+        ),
+        migrations.AddIndex(
+            model_name='creature',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['category', 'name'], name='creature_category_name'),
+        ),
+        migrations.AddIndex(
+            model_name='creature',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['dangerous_level', 'name'], name='creature_danger_name'),
+        ),
+        migrations.AddIndex(
+            model_name='creature',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['size', 'dangerous_level'], name='creature_size_danger'),
+        ),
+    ]
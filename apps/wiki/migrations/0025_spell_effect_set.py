@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:46
+
+from collections import defaultdict
+
+from django.db import migrations, models
+
+
+def fill_effect_sets(apps, schema_editor):
+    # тот же формат, что строит apps.wiki.effect_set.encode: ',3,17,42,'
+    Spell = apps.get_model('wiki', 'Spell')
+    SpellEffectLink = apps.get_model('wiki', 'SpellEffectLink')
+    db = schema_editor.connection.alias
+
+    effects = defaultdict(set)
+    for spell_id, effect_id in SpellEffectLink.objects.using(db).values_list('spell_id', 'effect_id').iterator():
+        effects[spell_id].add(effect_id)
+    spells = [
+        Spell(pk=spell_id, effect_set=f',{",".join(map(str, sorted(ids)))},')
+        for spell_id, ids in effects.items()
+    ]
+    Spell.objects.using(db).bulk_update(spells, ['effect_set'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wiki', '0024_creature_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='spell',
+            name='effect_set',
+            field=models.TextField(blank=True, default='', editable=False, verbose_name='Набор эффектов'),
+        ),
+        migrations.RunPython(fill_effect_sets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:50
+
+from django.db import migrations, models
+from django.db.models import Case, Value, When
+
+# значения spell_level на момент миграции; заговор — 0
+SPELL_LEVELS = ('заговор', '1', '2', '3', '4', '5', '6')
+
+
+def fill_level(apps, schema_editor):
+    # один UPDATE на всю таблицу, включая мягко удалённые заклинания
+    Spell = apps.get_model('wiki', 'Spell')
+    Spell.objects.using(schema_editor.connection.alias).update(level=Case(
+        *[When(spell_level=value, then=Value(number)) for number, value in enumerate(SPELL_LEVELS)],
+        default=Value(0),
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wiki', '0025_spell_effect_set'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='spell',
+            name='level',
+            field=models.PositiveSmallIntegerField(choices=[(0, 'Заговор'), (1, '1'), (2, '2'), (3, '3'), (4, '4'), (5, '5'), (6, '6')], default=0, editable=False, verbose_name='Уровень'),
+        ),
+        migrations.RunPython(fill_level, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='spell',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['category', 'level', 'name'], name='spell_category_level_name'),
+        ),
+        migrations.AddIndex(
+            model_name='spell',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['level', 'name'], name='spell_level_name'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wiki', '0026_spell_level_number'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='creatureattack',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='creaturepassive',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='spelleffectlink',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
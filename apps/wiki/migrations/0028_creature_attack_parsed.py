@@ -0,0 +1,187 @@
+# Generated by Django 5.2.18 on 2026-10-17 11:15
+
+import re
+from collections import defaultdict
+
+from django.db import migrations, models
+
+CHUNK_SIZE = 500
+
+# Разбор текста атаки — копия apps.wiki.attacks на момент миграции: миграция не зависит от кода приложения
+
+# основа слова -> тип урона: «рубящего урона», «урона огнём», «некротической энергией»...
+DAMAGE_TYPE_STEMS = (
+    ('рубящ', 'slashing'), ('колющ', 'piercing'), ('дробящ', 'bludgeoning'),
+    ('огн', 'fire'), ('огон', 'fire'), ('холод', 'cold'), ('яд', 'poison'), ('кислот', 'acid'),
+    ('электр', 'lightning'), ('молни', 'lightning'), ('звук', 'thunder'), ('гром', 'thunder'),
+    ('излуч', 'radiant'), ('свет', 'radiant'), ('некрот', 'necrotic'), ('психи', 'psychic'),
+    ('силов', 'force'),
+)
+
+NUMBERS = {'одна': 1, 'один': 1, 'одно': 1, 'две': 2, 'два': 2, 'три': 3, 'четыре': 4, 'пять': 5}
+
+MINUS = '-−–'
+TO_HIT = re.compile(rf'([+{MINUS}]?)\s*(\d+)\s+к\s+попаданию', re.IGNORECASE)
+REACH = re.compile(r'досягаемост\w*\s+(\d+)', re.IGNORECASE)
+RANGE = re.compile(r'дистанци\w*\s+(\d+)(?:\s*/\s*(\d+))?', re.IGNORECASE)
+TARGETS = re.compile(rf'\b(\d+|{"|".join(NUMBERS)})\s+(?:цел|существ)', re.IGNORECASE)
+HIT = re.compile(r'попадание\s*:', re.IGNORECASE)
+DICE = re.compile(rf'(?<!\w)(\d*)\s*[dкд]\s*(\d+)(?:\s*([+{MINUS}])\s*(\d+))?(?!\w)', re.IGNORECASE)
+FLAT = re.compile(r'^\s*(\d+)\s+(?!\()', re.IGNORECASE)
+WORD = re.compile(r'[а-яё]+', re.IGNORECASE)
+# тип урона ищется в тексте после костей, до следующих костей или конца предложения
+TYPE_WINDOW = re.compile(r'[^.;]*?(?=(?<!\w)\d*\s*[dкд]\s*\d|[.;]|$)', re.IGNORECASE)
+
+PARSED_FIELDS = ('to_hit', 'reach', 'range_normal', 'range_long', 'targets', 'damage_dice', 'damage_type',
+                 'average_damage')
+
+
+def _damage_type(text):
+    for word in WORD.findall(text.lower()):
+        for stem, damage_type in DAMAGE_TYPE_STEMS:
+            if word.startswith(stem):
+                return damage_type
+    return ''
+
+
+def _signed(sign, value):
+    return -int(value) if sign and sign in MINUS else int(value)
+
+
+def parse_attack(text):
+    """Колонки атаки из текста: {поле из PARSED_FIELDS: значение}."""
+    text = text or ''
+    parsed = dict.fromkeys(PARSED_FIELDS)
+    parsed.update(damage_dice='', damage_type='', average_damage=0.0)
+
+    if match := TO_HIT.search(text):
+        parsed['to_hit'] = _signed(*match.groups())
+    if match := REACH.search(text):
+        parsed['reach'] = int(match[1])
+    if match := RANGE.search(text):
+        parsed['range_normal'] = int(match[1])
+        parsed['range_long'] = int(match[2]) if match[2] else None
+    if match := TARGETS.search(text):
+        parsed['targets'] = int(match[1]) if match[1].isdigit() else NUMBERS[match[1].lower()]
+
+    # урон — после «Попадание:», а если его нет, то по всему тексту
+    hit = HIT.search(text)
+    damage = text[hit.end():] if hit else text
+    dice, average, damage_type = [], 0.0, ''
+    for match in DICE.finditer(damage):
+        count, sides, sign, bonus = match.groups()
+        count, sides = int(count or 1), int(sides)
+        if not sides:
+            continue
+        bonus = _signed(sign, bonus) if bonus else 0
+        dice.append(f'{count}d{sides}{bonus:+d}' if bonus else f'{count}d{sides}')
+        average += count * (sides + 1) / 2 + bonus
+        if not damage_type:
+            damage_type = _damage_type(TYPE_WINDOW.match(damage, match.end())[0])
+    if not dice and hit and (match := FLAT.match(damage)):
+        # фиксированный урон: «Попадание: 1 дробящий урон»
+        average = float(match[1])
+        damage_type = _damage_type(TYPE_WINDOW.match(damage, match.end())[0])
+
+    parsed.update(damage_dice=', '.join(dice)[:50], damage_type=damage_type, average_damage=max(average, 0.0))
+    return parsed
+
+
+def damage_per_round(averages):
+    """Урон существа за раунд по средним урона его атак."""
+    return max(averages, default=0.0)
+
+
+def parse_attacks(apps, schema_editor):
+    # разбор пачками по pk атак, урон существ — одним проходом по собранным средним
+    CreatureAttack = apps.get_model('wiki', 'CreatureAttack')
+    Creature = apps.get_model('wiki', 'Creature')
+    alias = schema_editor.connection.alias
+    averages = defaultdict(list)
+    last_pk = 0
+    while True:
+        batch = list(CreatureAttack.objects.using(alias).filter(pk__gt=last_pk).order_by('pk')[:CHUNK_SIZE])
+        if not batch:
+            break
+        for attack in batch:
+            for name, value in parse_attack(attack.text).items():
+                setattr(attack, name, value)
+            averages[attack.creature_id].append(attack.average_damage)
+        CreatureAttack.objects.using(alias).bulk_update(batch, PARSED_FIELDS)
+        last_pk = batch[-1].pk
+    Creature.objects.using(alias).bulk_update(
+        [Creature(pk=pk, damage_per_round=damage_per_round(values)) for pk, values in averages.items()],
+        ['damage_per_round'], batch_size=CHUNK_SIZE,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wiki', '0027_child_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='creature',
+            name='damage_per_round',
+            field=models.FloatField(default=0, editable=False, verbose_name='Урон за раунд'),
+        ),
+        migrations.AddField(
+            model_name='creatureattack',
+            name='average_damage',
+            field=models.FloatField(default=0, editable=False, verbose_name='Средний урон'),
+        ),
+        migrations.AddField(
+            model_name='creatureattack',
+            name='damage_dice',
+            field=models.CharField(blank=True, default='', editable=False, max_length=50, verbose_name='Кости урона'),
+        ),
+        migrations.AddField(
+            model_name='creatureattack',
+            name='damage_type',
+            field=models.CharField(blank=True, choices=[('slashing', 'Рубящий'), ('piercing', 'Колющий'), ('bludgeoning', 'Дробящий'), ('fire', 'Огонь'), ('cold', 'Холод'), ('poison', 'Яд'), ('acid', 'Кислота'), ('lightning', 'Электричество'), ('thunder', 'Звук'), ('radiant', 'Излучение'), ('necrotic', 'Некротический'), ('psychic', 'Психический'), ('force', 'Силовое поле')], default='', editable=False, max_length=20, verbose_name='Тип урона'),
+        ),
+        migrations.AddField(
+            model_name='creatureattack',
+            name='range_long',
+            field=models.PositiveSmallIntegerField(editable=False, null=True, verbose_name='Макс. дистанция, фт.'),
+        ),
+        migrations.AddField(
+            model_name='creatureattack',
+            name='range_normal',
+            field=models.PositiveSmallIntegerField(editable=False, null=True, verbose_name='Дистанция, фт.'),
+        ),
+        migrations.AddField(
+            model_name='creatureattack',
+            name='reach',
+            field=models.PositiveSmallIntegerField(editable=False, null=True, verbose_name='Досягаемость, фт.'),
+        ),
+        migrations.AddField(
+            model_name='creatureattack',
+            name='targets',
+            field=models.PositiveSmallIntegerField(editable=False, null=True, verbose_name='Целей'),
+        ),
+        migrations.AddField(
+            model_name='creatureattack',
+            name='to_hit',
+            field=models.SmallIntegerField(editable=False, null=True, verbose_name='Бонус попадания'),
+        ),
+        migrations.RunPython(parse_attacks, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='creature',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['damage_per_round', 'name'], name='creature_damage_name'),
+        ),
+        migrations.AddIndex(
+            model_name='creatureattack',
+            index=models.Index(fields=['reach'], name='creatureattack_reach'),
+        ),
+        migrations.AddIndex(
+            model_name='creatureattack',
+            index=models.Index(fields=['range_normal'], name='creatureattack_range'),
+        ),
+        migrations.AddIndex(
+            model_name='creatureattack',
+            index=models.Index(fields=['damage_type', 'average_damage'], name='creatureattack_type_damage'),
+        ),
+    ]
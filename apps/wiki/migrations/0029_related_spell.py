@@ -0,0 +1,125 @@
+# Generated by Django 5.2.18 on 2026-10-17 11:26
+
+import django.db.models.deletion
+import numpy as np
+from django.db import migrations, models
+from django.utils import timezone
+
+CHUNK_SIZE = 500
+
+# Оценки — копия apps.wiki.related на момент миграции: миграция не зависит от кода приложения
+
+# сколько соседей хранится у заклинания
+RELATED_LIMIT = 12
+# ячеек плотного блока оценок (ряд × заклинание) при пересчёте: ~32 МБ float64
+BLOCK_CELLS = 4_000_000
+
+
+class EffectMatrix:
+    """Связи заклинание — эффект массивами NumPy, упорядоченные по эффекту (столбцы матрицы A)."""
+
+    def __init__(self, links, total):
+        self.keys = {}
+        spells, effects = [], []
+        for spell_id, effect_id in links:
+            spells.append(self.keys.setdefault(spell_id, len(self.keys)))
+            effects.append(effect_id)
+        self.pks = list(self.keys)
+        spells = np.array(spells, dtype=np.int64)
+        _, effects = np.unique(np.array(effects, dtype=np.int64), return_inverse=True)
+        self.df = np.bincount(effects)
+        self.idf = np.log1p(max(total, 1) / np.maximum(self.df, 1))
+        order = np.argsort(effects, kind='stable')
+        # заклинания каждого эффекта подряд: эффект e — column_spells[starts[e]:starts[e] + df[e]]
+        self.column_spells = spells[order]
+        self.starts = np.concatenate(([0], np.cumsum(self.df)[:-1]))
+        self.link_spells, self.link_effects = spells, effects
+
+    def top(self, spell_ids, limit=RELATED_LIMIT):
+        """[(pk, pk похожего, оценка, общих эффектов, место)] — лучшие limit соседей для spell_ids."""
+        rows = np.array([self.keys[pk] for pk in spell_ids if pk in self.keys], dtype=np.int64)
+        found = []
+        # ряды блоками: плотный блок (ряд × заклинание) не больше BLOCK_CELLS ячеек
+        block = max(1, BLOCK_CELLS // max(len(self.pks), 1))
+        for start in range(0, len(rows), block):
+            found.extend(self._top_block(rows[start:start + block], limit))
+        return found
+
+    def _top_block(self, rows, limit):
+        size = len(self.pks)
+        position = np.full(size, -1, dtype=np.int64)
+        position[rows] = np.arange(len(rows))
+        selected = position[self.link_spells] >= 0
+        row_spells, row_effects = position[self.link_spells[selected]], self.link_effects[selected]
+
+        # каждая связь ряда (s, e) разворачивается в пары (s, t) по всем t с эффектом e;
+        # вклады пар складываются в плотный блок: np.bincount — один проход без сортировки
+        counts = self.df[row_effects]
+        sources = np.repeat(row_spells, counts)
+        shift = np.repeat(self.starts[row_effects] - np.cumsum(counts) + counts, counts)
+        cells = sources * size + self.column_spells[shift + np.arange(counts.sum())]
+        scores = np.bincount(cells, weights=np.repeat(self.idf[row_effects], counts),
+                             minlength=len(rows) * size).reshape(len(rows), size)
+        shared = np.bincount(cells, minlength=len(rows) * size).reshape(len(rows), size)
+        scores[np.arange(len(rows)), rows] = 0
+
+        k = min(limit, size)
+        candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        found = []
+        for number, row in enumerate(rows):
+            targets = candidates[number][scores[number, candidates[number]] > 0]
+            # по оценке, затем по числу общих эффектов
+            targets = targets[np.lexsort((targets, -shared[number, targets], -scores[number, targets]))]
+            found.extend(
+                (self.pks[row], self.pks[target], float(scores[number, target]), int(shared[number, target]), rank)
+                for rank, target in enumerate(targets)
+            )
+        return found
+
+
+def build_related_spells(apps, schema_editor):
+    # то же, что rebuild_related_spells, на исторических моделях
+    Spell = apps.get_model('wiki', 'Spell')
+    SpellEffectLink = apps.get_model('wiki', 'SpellEffectLink')
+    RelatedSpell = apps.get_model('wiki', 'RelatedSpell')
+
+    links = SpellEffectLink.objects.filter(spell__is_deleted=False).order_by().values_list('spell_id', 'effect_id')
+    matrix = EffectMatrix(links, Spell.objects.filter(is_deleted=False).count())
+    pks = list(matrix.keys)
+    now = timezone.now()
+    for start in range(0, len(pks), CHUNK_SIZE):
+        RelatedSpell.objects.bulk_create([
+            RelatedSpell(spell_id=spell_id, related_id=related_id, score=score, shared=shared, rank=rank,
+                         updated_at=now)
+            for spell_id, related_id, score, shared, rank in matrix.top(pks[start:start + CHUNK_SIZE])
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wiki', '0028_creature_attack_parsed'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedSpell',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField(verbose_name='Сходство')),
+                ('shared', models.PositiveSmallIntegerField(verbose_name='Общих эффектов')),
+                ('rank', models.PositiveSmallIntegerField(verbose_name='Место')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('related', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='wiki.spell')),
+                ('spell', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related_rows', to='wiki.spell')),
+            ],
+            options={
+                'verbose_name': 'Похожее заклинание',
+                'verbose_name_plural': 'Похожие заклинания',
+                'ordering': ('spell', 'rank'),
+                'indexes': [models.Index(fields=['spell', 'rank'], name='relatedspell_spell_rank')],
+                'unique_together': {('spell', 'related')},
+            },
+        ),
+        migrations.RunPython(build_related_spells, migrations.RunPython.noop),
+    ]
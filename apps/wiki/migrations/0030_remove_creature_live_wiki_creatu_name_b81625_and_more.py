@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wiki', '0029_related_spell'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='creature',
+            name='live_wiki_creatu_name_b81625',
+        ),
+        migrations.RemoveIndex(
+            model_name='news',
+            name='live_wiki_news_title_33f6b6',
+        ),
+        migrations.RemoveIndex(
+            model_name='post',
+            name='live_wiki_post_title_7b7820',
+        ),
+        migrations.RemoveIndex(
+            model_name='spell',
+            name='live_wiki_spell_name_c2ad57',
+        ),
+        migrations.AddIndex(
+            model_name='creature',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['name', 'id'], name='live_wiki_creatu_name_i_114cfc'),
+        ),
+        migrations.AddIndex(
+            model_name='news',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['title', 'id'], name='live_wiki_news_title__f07e43'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['title', 'id'], name='live_wiki_post_title__eedc33'),
+        ),
+        migrations.AddIndex(
+            model_name='spell',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['name', 'id'], name='live_wiki_spell_name_i_14ba0b'),
+        ),
+    ]
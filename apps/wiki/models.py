@@ -2,13 +2,14 @@ from django.db import models
 from django.db.models import PositiveIntegerField
 
 from apps.accounts.models import CustomUser
-from apps.common.models import IsDeletedModel
-from apps.common.utils import unique_slugify
+from apps.common.models import IsDeletedModel, UniqueSlugMixin, LIVE_ROWS
+from apps.wiki.attacks import DAMAGE_TYPE_CHOICES, PARSED_FIELDS, parse_attack
+from apps.wiki.effect_notes import fill_notes
 
 
 # ПОСТЫ: Категории, Посты
 
-class PostCategory(models.Model):
+class PostCategory(UniqueSlugMixin, models.Model):
     name = models.CharField(max_length=50)
     slug = models.SlugField(unique=True, null=False, blank=False)
 
@@ -20,13 +21,8 @@ class PostCategory(models.Model):
     def __str__(self):
         return self.name
 
-    def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = unique_slugify(self, self.name, self.slug)
-        super().save(*args, **kwargs)
-
 
-class Post(IsDeletedModel):
+class Post(UniqueSlugMixin, IsDeletedModel):
     title = models.CharField(max_length=100)
     slug = models.SlugField(max_length=100, unique=True, null=True, blank=True)
     category = models.ForeignKey(PostCategory, on_delete=models.CASCADE, null=True, blank=True)
@@ -34,6 +30,8 @@ class Post(IsDeletedModel):
     image = models.ImageField(upload_to='post_images/', null=True, blank=True)
     author = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
 
+    slug_source = 'title'
+
     class Meta:
         ordering = ('title',)
         verbose_name = "Статья"
@@ -42,17 +40,14 @@ class Post(IsDeletedModel):
     def __str__(self):
         return self.title
 
-    def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = unique_slugify(self, self.name, self.slug)
-        super().save(*args, **kwargs)
 
-
-class News(IsDeletedModel):
+class News(UniqueSlugMixin, IsDeletedModel):
     title = models.CharField('Название', max_length=100)
     slug = models.SlugField('URL', max_length=100, unique=True, null=True, blank=True)
     text = models.TextField('Текст', max_length=1500)
 
+    slug_source = 'title'
+
     class Meta:
         ordering = ('title',)
         verbose_name = "Новость"
@@ -61,17 +56,14 @@ class News(IsDeletedModel):
     def __str__(self):
         return self.title
 
-    def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = unique_slugify(self, self.name, self.slug)
-        super().save(*args, **kwargs)
-
 
 # СУЩЕСТВА: Категории, существа, атаки, пассивные особенности
 
 class CreatureCategory(models.Model):
     name = models.CharField(max_length=50)
     image = models.ImageField(upload_to='creature_category_images/', null=True, blank=True)
+    # отметка для условного GET списков, которые выводят названия (apps.common.conditional)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['name']
@@ -89,7 +81,7 @@ CREATURE_SIZE_CHOICES = [
     ('giant', 'Giant'),
 ]
 
-class Creature(IsDeletedModel):
+class Creature(UniqueSlugMixin, IsDeletedModel):
     name = models.CharField('Название существа', max_length=50, unique=True)
     slug = models.SlugField(max_length=100, unique=True, null=True, blank=True)
     description = models.TextField('Описание существа', max_length=1000)
@@ -114,29 +106,68 @@ class Creature(IsDeletedModel):
     wisdom = models.PositiveIntegerField('Мудрость', choices=((i, i) for i in range(20, 0, -1)), default=10)
     charisma = models.PositiveIntegerField('Харизма', choices=((i, i) for i in range(20, 0, -1)), default=10)
 
+    # наибольший средний урон среди атак (apps.wiki.attacks); пишут только обработчики изменений атак
+    damage_per_round = models.FloatField('Урон за раунд', default=0, editable=False)
+
+    derived_fields = ('damage_per_round',)
+
     class Meta:
         ordering = ('name',)
         verbose_name = 'Существо'
         verbose_name_plural = 'Существа'
+        # составные индексы под фильтры бестиария (apps.wiki.filters); первый покрывает и GROUP BY фасетов
+        indexes = [
+            models.Index(fields=['category', 'size', 'dangerous_level'], condition=LIVE_ROWS,
+                         name='creature_cat_size_danger'),
+            models.Index(fields=['category', 'name'], condition=LIVE_ROWS, name='creature_category_name'),
+            models.Index(fields=['dangerous_level', 'name'], condition=LIVE_ROWS, name='creature_danger_name'),
+            models.Index(fields=['size', 'dangerous_level'], condition=LIVE_ROWS, name='creature_size_danger'),
+            # фильтр и сортировка бестиария по урону за раунд
+            models.Index(fields=['damage_per_round', 'name'], condition=LIVE_ROWS, name='creature_damage_name'),
+        ]
 
     def __str__(self):
         return self.name
 
-    def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = unique_slugify(self, self.name, self.slug)
-        super().save(*args, **kwargs)
-
 
 class CreatureAttack(models.Model):
     creature = models.ForeignKey(Creature, on_delete=models.CASCADE, related_name='attacks')
     name = models.CharField('Название', max_length=20)
     text = models.TextField('Описание', max_length=200)
+    # входит в отметку кэша фрагмента и валидаторы страницы существа
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # разобранный текст (apps.wiki.attacks), заполняется в save()
+    to_hit = models.SmallIntegerField('Бонус попадания', null=True, editable=False)
+    reach = models.PositiveSmallIntegerField('Досягаемость, фт.', null=True, editable=False)
+    range_normal = models.PositiveSmallIntegerField('Дистанция, фт.', null=True, editable=False)
+    range_long = models.PositiveSmallIntegerField('Макс. дистанция, фт.', null=True, editable=False)
+    targets = models.PositiveSmallIntegerField('Целей', null=True, editable=False)
+    damage_dice = models.CharField('Кости урона', max_length=50, blank=True, default='', editable=False)
+    damage_type = models.CharField('Тип урона', max_length=20, choices=DAMAGE_TYPE_CHOICES, blank=True, default='',
+                                   editable=False)
+    average_damage = models.FloatField('Средний урон', default=0, editable=False)
 
     class Meta:
         ordering = ('name',)
         verbose_name = 'Атака существа'
         verbose_name_plural = 'Атаки существ'
+        indexes = [
+            models.Index(fields=['reach'], name='creatureattack_reach'),
+            models.Index(fields=['range_normal'], name='creatureattack_range'),
+            models.Index(fields=['damage_type', 'average_damage'], name='creatureattack_type_damage'),
+        ]
+
+    def fill_parsed(self):
+        for name, value in parse_attack(self.text).items():
+            setattr(self, name, value)
+
+    def save(self, *args, **kwargs):
+        self.fill_parsed()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'text' in update_fields:
+            kwargs['update_fields'] = {*update_fields, *PARSED_FIELDS}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.name
@@ -146,6 +177,7 @@ class CreaturePassive(models.Model):
     creature = models.ForeignKey(Creature, on_delete=models.CASCADE, related_name='passives')
     name = models.CharField('Название', max_length=30)
     text = models.TextField('Описание', max_length=300)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ('name',)
@@ -162,10 +194,12 @@ class CreaturePassive(models.Model):
 # ЗАКЛИНАНИЯ: Категории, заклинания, эффекты
 
 
-class SpellCategory(models.Model):
+class SpellCategory(UniqueSlugMixin, models.Model):
     name = models.CharField(max_length=50)
     slug = models.SlugField(max_length=60, unique=True, null=True, blank=True)
     image = models.ImageField(upload_to='wiki/spell_category_images/', null=True, blank=True)
+    # отметка для условного GET списков, которые выводят названия (apps.common.conditional)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ('name',)
@@ -175,15 +209,12 @@ class SpellCategory(models.Model):
     def __str__(self):
         return self.name
 
-    def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = unique_slugify(self, self.name, self.slug)
-        super().save(*args, **kwargs)
-
-class SpellEffect(models.Model):
+class SpellEffect(UniqueSlugMixin, models.Model):
     name = models.CharField(max_length=50)
     slug = models.SlugField(max_length=60, unique=True, null=True, blank=True)
     text = models.TextField(max_length=500)
+    # отметка для условного GET списков, которые выводят названия (apps.common.conditional)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ('name',)
@@ -193,33 +224,60 @@ class SpellEffect(models.Model):
     def __str__(self):
         return self.name
 
-    def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = unique_slugify(self, self.name, self.slug)
-        super().save(*args, **kwargs)
+
+class SpellEffectLinkQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        # примечания — копии текстов эффектов: тексты загружаются одним запросом на всю вставку
+        objs = fill_notes(list(objs), using=self.db)
+        return super().bulk_create(objs, *args, **kwargs)
 
 
 class SpellEffectLink(models.Model):
     spell = models.ForeignKey('Spell', on_delete=models.CASCADE)
     effect = models.ForeignKey(SpellEffect, on_delete=models.PROTECT)
+    # копия SpellEffect.text, см. apps.wiki.effect_notes
     note = models.TextField(max_length=500, null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = SpellEffectLinkQuerySet.as_manager()
 
     class Meta:
         unique_together = ('spell', 'effect')
         ordering = ('id',)
 
     def save(self, *args, **kwargs):
-        self.note = self.effect.text
+        # эффект из формы или формсета уже загружен; без него текст читается отдельным запросом
+        fill_notes([self], using=kwargs.get('using'))
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'effect' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'note'}
         super().save(*args, **kwargs)
 
 
-class Spell(IsDeletedModel):
+SPELL_LEVEL_CHOICES = (
+    ('заговор', 'Заговор'),
+    ('1', '1'),
+    ('2', '2'),
+    ('3', '3'),
+    ('4', '4'),
+    ('5', '5'),
+    ('6', '6'),
+)
+
+# числовой уровень для сортировки и диапазонов: заговор — 0
+SPELL_LEVEL_NUMBERS = {value: number for number, (value, _) in enumerate(SPELL_LEVEL_CHOICES)}
+SPELL_LEVEL_NUMBER_CHOICES = tuple((number, label) for number, (_, label) in enumerate(SPELL_LEVEL_CHOICES))
+
+
+class Spell(UniqueSlugMixin, IsDeletedModel):
     name = models.CharField('Название', max_length=100)
     slug = models.SlugField('URL', max_length=100, unique=True, null=True, blank=True)
     category = models.ForeignKey(SpellCategory, on_delete=models.CASCADE, related_name='spells')
     description = models.TextField('Описание', max_length=1000)
     image = models.ImageField(upload_to='wiki/spell_images/', null=True, blank=True)
     effects = models.ManyToManyField(SpellEffect, through='SpellEffectLink', related_name='spells', blank=True)
+    # pk эффектов строкой ",3,17,42," для фильтров без JOIN, см. apps.wiki.effect_set
+    effect_set = models.TextField('Набор эффектов', default='', blank=True, editable=False)
 
     # Аспекты заклинания
     casting_time = models.CharField('Время накладывания', max_length=100, null=True, blank=True)
@@ -227,28 +285,32 @@ class Spell(IsDeletedModel):
     duration = models.CharField('Длительность', max_length=100, null=True, blank=True)
     requirements = models.CharField('Требования', max_length=300, default='отсутствуют')
     special_components = models.CharField('Особые компоненты', max_length=300, default='отсутствуют')
-    spell_level = models.CharField('Уровень заклинания', max_length=100, choices=(
-        ('заговор', 'Заговор'),
-        ('1', '1'),
-        ('2', '2'),
-        ('3', '3'),
-        ('4', '4'),
-        ('5', '5'),
-        ('6', '6'),
-    ))
+    spell_level = models.CharField('Уровень заклинания', max_length=100, choices=SPELL_LEVEL_CHOICES)
+    # производное от spell_level, заполняется в save(): строковые уровни сортируются лексически
+    level = models.PositiveSmallIntegerField('Уровень', choices=SPELL_LEVEL_NUMBER_CHOICES, default=0, editable=False)
+
+    derived_fields = ('effect_set',)
 
     class Meta:
         ordering = ('name',)
         verbose_name = 'Заклинание'
         verbose_name_plural = 'Заклинания'
+        # диапазон и группировка по уровню внутри категории и без неё (SpellListView, SpellAdmin)
+        indexes = [
+            models.Index(fields=['category', 'level', 'name'], condition=LIVE_ROWS, name='spell_category_level_name'),
+            models.Index(fields=['level', 'name'], condition=LIVE_ROWS, name='spell_level_name'),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.level = SPELL_LEVEL_NUMBERS.get(self.spell_level, 0)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'spell_level' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'level'}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.name
 
-    def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = unique_slugify(self, self.name, self.slug)
-        super().save(*args, **kwargs)
 
 
 
@@ -258,3 +320,26 @@ class Spell(IsDeletedModel):
 
 
 
+
+class RelatedSpell(models.Model):
+    """Похожее заклинание: ряды пересчитывает apps.wiki.related, вручную не редактируются."""
+    spell = models.ForeignKey(Spell, on_delete=models.CASCADE, related_name='related_rows')
+    related = models.ForeignKey(Spell, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField('Сходство')
+    shared = models.PositiveSmallIntegerField('Общих эффектов')
+    rank = models.PositiveSmallIntegerField('Место')
+    # входит в валидаторы страницы заклинания
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('spell', 'related')
+        ordering = ('spell', 'rank')
+        verbose_name = 'Похожее заклинание'
+        verbose_name_plural = 'Похожие заклинания'
+        # соседи заклинания по порядку (SpellDetailView)
+        indexes = [
+            models.Index(fields=['spell', 'rank'], name='relatedspell_spell_rank'),
+        ]
+
+    def __str__(self):
+        return f'{self.spell_id} → {self.related_id}'
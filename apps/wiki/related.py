@@ -0,0 +1,198 @@
+"""
+Похожие заклинания: материализованная таблица RelatedSpell.
+
+Сходство двух заклинаний — сумма весов их общих эффектов, вес эффекта — IDF: log(1 + N / df), где N — число
+действующих заклинаний, df — у скольких из них есть эффект. Общий редкий эффект говорит о сходстве больше,
+чем «урон», который есть у половины книги. Для каждого заклинания хранятся лучшие RELATED_LIMIT соседей
+с местом (rank), так что страница заклинания читает их одним запросом по индексу (spell, rank).
+
+Оценки — произведение разреженных матриц S = A · diag(idf) · Aᵀ, где A — заклинание × эффект
+(SpellEffectLink). scipy в зависимостях нет, поэтому произведение считается на NumPy по парам связей
+(координатный формат): для каждой связи (заклинание, эффект) строки — все заклинания с тем же эффектом,
+вклады складываются np.bincount в плотный блок рядов, лучшие соседи ряда — np.argpartition.
+
+Связь (s, e) меняет df эффекта e, то есть оценки всех пар заклинаний с e, и оценки s с остальными.
+После фиксации транзакции (schedule) ряды изменённых заклинаний пересчитываются целиком — формсет из
+десятка связей пересчитывает ряд один раз. В рядах остальных заклинаний t, у которых s был или должен
+появиться, правится только пара (t, s): оценка пересчитывается, s встаёт на своё место или уходит из ряда,
+так что «похожие» симметричны и между перестройками. Сдвиг оценок пар (t, u) из-за нового df и роста N,
+а также освободившееся в ряду t место выравнивает команда rebuild_related_spells, которую запускают
+по расписанию.
+"""
+from collections import defaultdict
+from threading import local
+
+import numpy as np
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from apps.common.managers import DEFAULT_CHUNK_SIZE
+
+# сколько соседей хранится у заклинания
+RELATED_LIMIT = 12
+# ячеек плотного блока оценок (ряд × заклинание) при пересчёте: ~32 МБ float64
+BLOCK_CELLS = 4_000_000
+
+
+class EffectMatrix:
+    """Связи заклинание — эффект массивами NumPy, упорядоченные по эффекту (столбцы матрицы A)."""
+
+    def __init__(self, links, total):
+        self.keys = {}
+        spells, effects = [], []
+        for spell_id, effect_id in links:
+            spells.append(self.keys.setdefault(spell_id, len(self.keys)))
+            effects.append(effect_id)
+        self.pks = list(self.keys)
+        spells = np.array(spells, dtype=np.int64)
+        _, effects = np.unique(np.array(effects, dtype=np.int64), return_inverse=True)
+        self.df = np.bincount(effects)
+        self.idf = np.log1p(max(total, 1) / np.maximum(self.df, 1))
+        order = np.argsort(effects, kind='stable')
+        # заклинания каждого эффекта подряд: эффект e — column_spells[starts[e]:starts[e] + df[e]]
+        self.column_spells = spells[order]
+        self.starts = np.concatenate(([0], np.cumsum(self.df)[:-1]))
+        self.link_spells, self.link_effects = spells, effects
+
+    def _blocks(self, spell_ids):
+        """Номера рядов spell_ids блоками: плотный блок (ряд × заклинание) не больше BLOCK_CELLS ячеек."""
+        rows = np.array([self.keys[pk] for pk in spell_ids if pk in self.keys], dtype=np.int64)
+        block = max(1, BLOCK_CELLS // max(len(self.pks), 1))
+        for start in range(0, len(rows), block):
+            yield rows[start:start + block]
+
+    def top(self, spell_ids, limit=RELATED_LIMIT):
+        """[(pk, pk похожего, оценка, общих эффектов, место)] — лучшие limit соседей для spell_ids."""
+        found = []
+        for rows in self._blocks(spell_ids):
+            found.extend(self._top_block(rows, limit))
+        return found
+
+    def pairs(self, spell_ids):
+        """[(pk, pk соседа, оценка, общих эффектов)] — все пары spell_ids с ненулевой оценкой."""
+        found = []
+        for rows in self._blocks(spell_ids):
+            scores, shared = self._scores(rows)
+            numbers, targets = np.nonzero(scores > 0)
+            found.extend(
+                (self.pks[rows[number]], self.pks[target], float(scores[number, target]), int(shared[number, target]))
+                for number, target in zip(numbers, targets)
+            )
+        return found
+
+    def _scores(self, rows):
+        """Плотные блоки (ряд × заклинание): оценки пар и число общих эффектов."""
+        size = len(self.pks)
+        position = np.full(size, -1, dtype=np.int64)
+        position[rows] = np.arange(len(rows))
+        selected = position[self.link_spells] >= 0
+        row_spells, row_effects = position[self.link_spells[selected]], self.link_effects[selected]
+
+        # каждая связь ряда (s, e) разворачивается в пары (s, t) по всем t с эффектом e;
+        # вклады пар складываются в плотный блок: np.bincount — один проход без сортировки
+        counts = self.df[row_effects]
+        sources = np.repeat(row_spells, counts)
+        shift = np.repeat(self.starts[row_effects] - np.cumsum(counts) + counts, counts)
+        cells = sources * size + self.column_spells[shift + np.arange(counts.sum())]
+        scores = np.bincount(cells, weights=np.repeat(self.idf[row_effects], counts),
+                             minlength=len(rows) * size).reshape(len(rows), size)
+        shared = np.bincount(cells, minlength=len(rows) * size).reshape(len(rows), size)
+        scores[np.arange(len(rows)), rows] = 0
+        return scores, shared
+
+    def _top_block(self, rows, limit):
+        scores, shared = self._scores(rows)
+        k = min(limit, len(self.pks))
+        candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        found = []
+        for number, row in enumerate(rows):
+            targets = candidates[number][scores[number, candidates[number]] > 0]
+            # по оценке, затем по числу общих эффектов
+            targets = targets[np.lexsort((targets, -shared[number, targets], -scores[number, targets]))]
+            found.extend(
+                (self.pks[row], self.pks[target], float(scores[number, target]), int(shared[number, target]), rank)
+                for rank, target in enumerate(targets)
+            )
+        return found
+
+
+def _write(spell_ids, rows, using):
+    from apps.wiki.models import RelatedSpell
+
+    with transaction.atomic(using=using):
+        RelatedSpell.objects.using(using).filter(spell__in=spell_ids).delete()
+        RelatedSpell.objects.using(using).bulk_create([
+            RelatedSpell(spell_id=spell_id, related_id=related_id, score=score, shared=shared, rank=rank)
+            for spell_id, related_id, score, shared, rank in rows
+        ])
+
+
+def rebuild_related_spells(chunk_size=DEFAULT_CHUNK_SIZE, limit=RELATED_LIMIT, using=None):
+    """Пересчитывает таблицу целиком: связи читаются один раз, ряды пишутся пачками. Возвращает число заклинаний."""
+    from apps.wiki.models import Spell, SpellEffectLink
+
+    links = (SpellEffectLink.objects.using(using).filter(spell__is_deleted=False).order_by()
+             .values_list('spell_id', 'effect_id').iterator(chunk_size=2000))
+    matrix = EffectMatrix(links, Spell.objects.db_manager(using).count())
+    rebuilt = 0
+    # вместе с мягко удалёнными: их ряды очищаются
+    for pks in Spell.objects.db_manager(using).unfiltered().pk_chunks(chunk_size):
+        _write(pks, matrix.top(pks, limit), using)
+        rebuilt += len(pks)
+    return rebuilt
+
+
+def update_related_spells(spell_ids, limit=RELATED_LIMIT, using=None):
+    """
+    Пересчитывает ряды spell_ids — после добавления или удаления их связей с эффектами, мягкого удаления
+    или восстановления. Ряды удалённых заклинаний очищаются. В рядах соседей правятся пары с spell_ids.
+    """
+    from apps.wiki.models import RelatedSpell, Spell, SpellEffectLink
+
+    spell_ids = set(spell_ids)
+    if not spell_ids:
+        return
+    # все связи эффектов этих заклинаний: из них и df эффектов, и кандидаты в соседи
+    effects = SpellEffectLink.objects.using(using).filter(spell__in=spell_ids).values('effect_id')
+    links = (SpellEffectLink.objects.using(using).filter(effect__in=effects, spell__is_deleted=False).order_by()
+             .values_list('spell_id', 'effect_id'))
+    matrix = EffectMatrix(links, Spell.objects.db_manager(using).count())
+
+    # пары (t, s): оценка симметрична, поэтому берётся из рядов самих изменённых заклинаний
+    incoming = defaultdict(dict)
+    for spell_id, related_id, score, shared in matrix.pairs(spell_ids):
+        if related_id not in spell_ids:
+            incoming[related_id][spell_id] = (score, shared)
+    rows = RelatedSpell.objects.using(using)
+    neighbours = {*incoming, *rows.filter(related__in=spell_ids).exclude(spell__in=spell_ids)
+                  .values_list('spell_id', flat=True)}
+    kept = defaultdict(dict)
+    for spell_id, related_id, score, shared in (rows.filter(spell__in=neighbours).exclude(related__in=spell_ids)
+                                                .values_list('spell_id', 'related_id', 'score', 'shared')):
+        kept[spell_id][related_id] = (score, shared)
+
+    found = matrix.top(spell_ids, limit)
+    for spell_id in neighbours:
+        candidates = {**kept[spell_id], **incoming[spell_id]}
+        ranked = sorted(candidates.items(), key=lambda item: (-item[1][0], -item[1][1], str(item[0])))[:limit]
+        found.extend(
+            (spell_id, related_id, score, shared, rank) for rank, (related_id, (score, shared)) in enumerate(ranked)
+        )
+    _write(spell_ids | neighbours, found, using)
+
+
+# Отложенный пересчёт: изменения копятся до фиксации транзакции (своя очередь у каждого потока)
+
+_pending = local()
+
+
+def schedule(spell_ids, using=None):
+    using = using or DEFAULT_DB_ALIAS
+    _pending.__dict__.setdefault(using, set()).update(spell_ids)
+    # колбэк на каждое изменение, а пересчёт — в первом из них; остальные застают пустую очередь
+    transaction.on_commit(lambda: flush(using), using=using)
+
+
+def flush(using=DEFAULT_DB_ALIAS):
+    spell_ids = _pending.__dict__.pop(using, ())
+    if spell_ids:
+        update_related_spells(spell_ids, using=using)
@@ -1,47 +1,280 @@
-import os
-from django.db.models.signals import pre_save, post_delete
+from django.db import transaction
+from django.db.models.signals import pre_save, post_delete, post_init, post_save, m2m_changed
 from django.dispatch import receiver
+from django.utils import timezone
 
-from .models import Creature
+from apps.common import fragment_cache
+from apps.common.signals import is_deleted_changed
+from apps.common.utils import delete_file_on_commit
+from . import autolink, encounters, related, similar
+from .attacks import rebuild_damage
+from .effect_notes import propagate_note
+from .effect_set import rebuild_effect_sets
+from .models import Creature, CreatureAttack, CreatureCategory, CreaturePassive, Post, Spell, SpellCategory, \
+    SpellEffect, SpellEffectLink
 
 
 # Creature: предотвращение накопления ненужных / устаревших изображений
 
 
-def _delete_file(path):
-    try:
-        if path and os.path.exists(path):
-            os.remove(path)
-    except OSError:
-        pass
-
 # удаление изображения после удаления существа
 @receiver(post_delete, sender=Creature, dispatch_uid='wiki.creature.delete_image_on_delete')
-def delete_image_on_delete(sender, instance, **kwargs):
+def delete_image_on_delete(sender, instance, using, **kwargs):
     if instance.image and instance.image.path:
-        _delete_file(instance.image.path)
+        delete_file_on_commit(instance.image.path, using)
 
 
 # удаление изображения в случае замены другим через редактирование существа
 @receiver(pre_save, sender=Creature, dispatch_uid='wiki.creature.delete_old_image_on_change')
-def delete_old_image_on_change(sender, instance, **kwargs):
+def delete_old_image_on_change(sender, instance, using, **kwargs):
     if not instance.image:
         return
     try:
-        old = Creature.objects.get(pk=instance.pk)
+        # _base_manager: нужно состояние из БД, а не сохраняемый экземпляр из карты идентичности запроса
+        old = Creature._base_manager.get(pk=instance.pk)
     except Creature.DoesNotExist:
         return
 
     # удаление старого файла в случае изменения пути
     if old.image and old.image.path and old.image != instance.image:
-        _delete_file(old.image.path)
+        delete_file_on_commit(old.image.path, using)
+
+
+# Spell: набор эффектов пересчитывается при любом изменении связей заклинания с эффектами
+
+@receiver(post_save, sender=SpellEffectLink, dispatch_uid='wiki.spelleffectlink.rebuild_effect_set_on_save')
+@receiver(post_delete, sender=SpellEffectLink, dispatch_uid='wiki.spelleffectlink.rebuild_effect_set_on_delete')
+def rebuild_effect_set_on_link_change(sender, instance, using, raw=False, **kwargs):
+    # raw — загрузка фикстур: наборы строятся потом командой rebuild_effect_sets
+    if not raw:
+        rebuild_effect_sets([instance.spell_id], using=using)
+
+
+# spell.effects.add()/remove()/clear() создают и удаляют связи без post_save
+@receiver(m2m_changed, sender=Spell.effects.through, dispatch_uid='wiki.spell.rebuild_effect_set_on_m2m_change')
+def rebuild_effect_set_on_m2m_change(sender, instance, action, reverse, pk_set, using, **kwargs):
+    if reverse and action == 'pre_clear':
+        # effect.spells.clear(): после очистки связанные заклинания уже не найти
+        instance._cleared_spell_ids = list(instance.spells.values_list('pk', flat=True))
+    elif action in ('post_add', 'post_remove'):
+        rebuild_effect_sets(pk_set if reverse else [instance.pk], using=using)
+    elif action == 'post_clear':
+        rebuild_effect_sets(instance.__dict__.pop('_cleared_spell_ids', []) if reverse else [instance.pk],
+                             using=using)
+
+
+
+
+# SpellEffectLink.note — копия текста эффекта: правка эффекта переписывает копии одним UPDATE
+
+@receiver(post_save, sender=SpellEffect, dispatch_uid='wiki.spelleffect.propagate_note_on_save')
+def propagate_note_on_effect_save(sender, instance, created, using, update_fields=None, raw=False, **kwargs):
+    # raw — загрузка фикстур: примечания исправляет потом команда repair_effect_notes
+    if raw or created or (update_fields is not None and 'text' not in update_fields):
+        return
+    propagate_note(instance.pk, instance.text, using=using)
+
+# Похожие заклинания (apps.wiki.related): ряды пересчитываются после фиксации транзакции, один раз на транзакцию
+
+@receiver(post_init, sender=SpellEffectLink, dispatch_uid='wiki.spelleffectlink.remember_related_key')
+def remember_related_key(sender, instance, **kwargs):
+    instance._related_key = (instance.spell_id, instance.effect_id)
+
+
+@receiver(post_save, sender=SpellEffectLink, dispatch_uid='wiki.spelleffectlink.update_related_on_save')
+def update_related_on_link_save(sender, instance, created, using, raw=False, **kwargs):
+    old, new = instance._related_key, (instance.spell_id, instance.effect_id)
+    instance._related_key = new
+    # правка одного примечания соседей не меняет
+    if raw or (not created and old == new):
+        return
+    related.schedule({old[0], new[0]} - {None}, using=using)
+
+
+@receiver(post_delete, sender=SpellEffectLink, dispatch_uid='wiki.spelleffectlink.update_related_on_delete')
+def update_related_on_link_delete(sender, instance, using, **kwargs):
+    related.schedule([instance.spell_id], using=using)
+
+
+@receiver(m2m_changed, sender=Spell.effects.through, dispatch_uid='wiki.spell.update_related_on_m2m_change')
+def update_related_on_m2m_change(sender, instance, action, reverse, pk_set, using, **kwargs):
+    # пересчёт отложен до фиксации, поэтому связи, снимаемые clear(), можно собрать до очистки
+    if action == 'pre_clear':
+        related.schedule(instance.spells.values_list('pk', flat=True) if reverse else [instance.pk], using=using)
+    elif action in ('post_add', 'post_remove'):
+        related.schedule(pk_set if reverse else [instance.pk], using=using)
+
+
+@receiver(post_save, sender=Spell, dispatch_uid='wiki.spell.update_related_on_soft_delete')
+def update_related_on_soft_delete(sender, instance, using, update_fields=None, raw=False, **kwargs):
+    # мягкое удаление и восстановление: ряд заклинания очищается (или считается заново); из чужих рядов
+    # удалённое отбрасывает страница, а сами ряды выравнивает rebuild_related_spells
+    if not raw and update_fields is not None and 'is_deleted' in update_fields:
+        related.schedule([instance.pk], using=using)
+
+
+@receiver(is_deleted_changed, sender=Spell, dispatch_uid='wiki.spell.update_related_on_bulk_delete')
+def update_related_on_bulk_delete(sender, pks, using, **kwargs):
+    related.schedule(pks, using=using)
+
+# Creature: урон за раунд пересчитывается при любом изменении атак существа
+
+@receiver(post_save, sender=CreatureAttack, dispatch_uid='wiki.creatureattack.rebuild_damage_on_save')
+@receiver(post_delete, sender=CreatureAttack, dispatch_uid='wiki.creatureattack.rebuild_damage_on_delete')
+def rebuild_damage_on_attack_change(sender, instance, using, raw=False, **kwargs):
+    # raw — загрузка фикстур: урон пересчитывается потом командой parse_attacks
+    if not raw:
+        rebuild_damage([instance.creature_id], using=using)
+
+
+# Инкрементальная выгрузка (apps.wiki.exporter) видит правки дочерних строк по их updated_at, а удаление —
+# только по updated_at родителя
+
+@receiver(post_delete, sender=CreatureAttack, dispatch_uid='wiki.creatureattack.touch_creature_on_delete')
+@receiver(post_delete, sender=CreaturePassive, dispatch_uid='wiki.creaturepassive.touch_creature_on_delete')
+def touch_creature_on_child_delete(sender, instance, using, **kwargs):
+    Creature._base_manager.using(using).filter(pk=instance.creature_id).update(updated_at=timezone.now())
+
+
+@receiver(post_delete, sender=SpellEffectLink, dispatch_uid='wiki.spelleffectlink.touch_spell_on_delete')
+def touch_spell_on_link_delete(sender, instance, using, **kwargs):
+    Spell._base_manager.using(using).filter(pk=instance.spell_id).update(updated_at=timezone.now())
 
 
+# Кэш фрагментов страниц деталей: фрагмент удаляется при изменении объекта или того, что выводится вместе с ним.
+# Отметка фрагмента (updated_at объекта и дочерних строк) ловит правки через save() и сама по себе, но не удаление
+# дочерней строки и не правку категории или эффекта — их покрывают только эти обработчики.
 
+@receiver(post_save, sender=Post, dispatch_uid='wiki.post.invalidate_fragment_on_save')
+@receiver(post_delete, sender=Post, dispatch_uid='wiki.post.invalidate_fragment_on_delete')
+@receiver(post_save, sender=Creature, dispatch_uid='wiki.creature.invalidate_fragment_on_save')
+@receiver(post_delete, sender=Creature, dispatch_uid='wiki.creature.invalidate_fragment_on_delete')
+@receiver(post_save, sender=Spell, dispatch_uid='wiki.spell.invalidate_fragment_on_save')
+@receiver(post_delete, sender=Spell, dispatch_uid='wiki.spell.invalidate_fragment_on_delete')
+def invalidate_fragment(sender, instance, **kwargs):
+    fragment_cache.invalidate(sender, instance.pk)
 
 
+@receiver(post_save, sender=CreatureAttack, dispatch_uid='wiki.creatureattack.invalidate_fragment_on_save')
+@receiver(post_delete, sender=CreatureAttack, dispatch_uid='wiki.creatureattack.invalidate_fragment_on_delete')
+@receiver(post_save, sender=CreaturePassive, dispatch_uid='wiki.creaturepassive.invalidate_fragment_on_save')
+@receiver(post_delete, sender=CreaturePassive, dispatch_uid='wiki.creaturepassive.invalidate_fragment_on_delete')
+def invalidate_creature_fragment(sender, instance, **kwargs):
+    fragment_cache.invalidate(Creature, instance.creature_id)
 
 
+@receiver(post_save, sender=SpellEffectLink, dispatch_uid='wiki.spelleffectlink.invalidate_fragment_on_save')
+@receiver(post_delete, sender=SpellEffectLink, dispatch_uid='wiki.spelleffectlink.invalidate_fragment_on_delete')
+def invalidate_spell_fragment(sender, instance, **kwargs):
+    fragment_cache.invalidate(Spell, instance.spell_id)
+
+
+@receiver(m2m_changed, sender=Spell.effects.through, dispatch_uid='wiki.spell.invalidate_fragment_on_m2m_change')
+def invalidate_spell_fragment_on_m2m_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('pre_clear', 'post_add', 'post_remove'):
+        return
+    if not reverse:
+        fragment_cache.invalidate(Spell, instance.pk)
+    elif action == 'pre_clear':
+        fragment_cache.invalidate(Spell, *instance.spells.values_list('pk', flat=True))
+    else:
+        fragment_cache.invalidate(Spell, *pk_set)
+
+
+# название эффекта и категория выводятся во фрагментах всех связанных объектов
+
+@receiver(post_save, sender=SpellEffect, dispatch_uid='wiki.spelleffect.invalidate_spell_fragments')
+def invalidate_effect_spell_fragments(sender, instance, **kwargs):
+    fragment_cache.invalidate(Spell, *instance.spells.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=SpellCategory, dispatch_uid='wiki.spellcategory.invalidate_spell_fragments')
+def invalidate_category_spell_fragments(sender, instance, **kwargs):
+    fragment_cache.invalidate(Spell, *instance.spells.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=CreatureCategory, dispatch_uid='wiki.creaturecategory.invalidate_creature_fragments')
+def invalidate_category_creature_fragments(sender, instance, **kwargs):
+    fragment_cache.invalidate(Creature, *Creature.objects.filter(category=instance).values_list('pk', flat=True))
+
+
+# Ссылки на существа и заклинания в тексте статей (apps.wiki.autolink): новое название добавляется в набор на месте,
+# переименование и удаление сбрасывают его. Правки без смены названия и слага набор не трогают.
+# Версия меняется после фиксации транзакции: иначе другой процесс перечитал бы названия без незафиксированного.
+
+@receiver(post_init, sender=Creature, dispatch_uid='wiki.creature.remember_autolink_name')
+@receiver(post_init, sender=Spell, dispatch_uid='wiki.spell.remember_autolink_name')
+def remember_autolink_name(sender, instance, **kwargs):
+    # __dict__: отложенное поле не подгружается лишним запросом
+    instance._autolink_name = (instance.__dict__.get('name'), instance.__dict__.get('slug'))
+
+
+@receiver(post_save, sender=Creature, dispatch_uid='wiki.creature.update_autolink_on_save')
+@receiver(post_save, sender=Spell, dispatch_uid='wiki.spell.update_autolink_on_save')
+def update_autolink_on_save(sender, instance, created, using, raw=False, **kwargs):
+    if raw:
+        return
+    old, instance._autolink_name = instance._autolink_name, (instance.name, instance.slug)
+    if created:
+        name, url = instance.name, autolink.url_for(sender, instance.slug)
+        transaction.on_commit(lambda: autolink.add_name(name, url), using=using)
+    elif instance.is_deleted or old != instance._autolink_name:
+        transaction.on_commit(autolink.invalidate, using=using)
+
+
+@receiver(post_delete, sender=Creature, dispatch_uid='wiki.creature.update_autolink_on_delete')
+@receiver(post_delete, sender=Spell, dispatch_uid='wiki.spell.update_autolink_on_delete')
+def update_autolink_on_delete(sender, instance, using, **kwargs):
+    transaction.on_commit(autolink.invalidate, using=using)
+
+
+# массовое мягкое удаление и восстановление идут без post_save
+@receiver(is_deleted_changed, sender=Creature, dispatch_uid='wiki.creature.update_autolink_on_bulk_delete')
+@receiver(is_deleted_changed, sender=Spell, dispatch_uid='wiki.spell.update_autolink_on_bulk_delete')
+def update_autolink_on_bulk_delete(sender, using, **kwargs):
+    transaction.on_commit(autolink.invalidate, using=using)
+
+
+# Индекс генератора встреч (apps.wiki.encounters): существо переносится в свою корзину после фиксации транзакции
+
+@receiver(post_save, sender=Creature, dispatch_uid='wiki.creature.update_encounter_index_on_save')
+def update_encounter_index_on_save(sender, instance, using, raw=False, **kwargs):
+    if raw:
+        return
+    values = (instance.pk, instance.dangerous_level, instance.category_id, instance.size, instance.name,
+              instance.slug, instance.is_deleted)
+    transaction.on_commit(lambda: encounters.creature_saved(*values), using=using)
+
+
+@receiver(post_delete, sender=Creature, dispatch_uid='wiki.creature.update_encounter_index_on_delete')
+def update_encounter_index_on_delete(sender, instance, using, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: encounters.creature_deleted(pk), using=using)
+
+
+@receiver(is_deleted_changed, sender=Creature, dispatch_uid='wiki.creature.update_encounter_index_on_bulk_delete')
+def update_encounter_index_on_bulk_delete(sender, using, **kwargs):
+    transaction.on_commit(encounters.invalidate, using=using)
+
+
+# Индекс похожих существ (apps.wiki.similar): строка существа правится после фиксации транзакции
+
+@receiver(post_save, sender=Creature, dispatch_uid='wiki.creature.update_similar_index_on_save')
+def update_similar_index_on_save(sender, instance, using, update_fields=None, raw=False, **kwargs):
+    if raw or (update_fields is not None and not {*similar.FEATURES, 'is_deleted'} & set(update_fields)):
+        return
+    pk, values = instance.pk, [getattr(instance, name) for name in similar.FEATURES]
+    is_deleted = instance.is_deleted
+    transaction.on_commit(lambda: similar.creature_saved(pk, values, is_deleted), using=using)
+
 
+@receiver(post_delete, sender=Creature, dispatch_uid='wiki.creature.update_similar_index_on_delete')
+def update_similar_index_on_delete(sender, instance, using, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: similar.creature_saved(pk, None, is_deleted=True), using=using)
 
 
+@receiver(is_deleted_changed, sender=Creature, dispatch_uid='wiki.creature.update_similar_index_on_bulk_delete')
+def update_similar_index_on_bulk_delete(sender, pks, using, **kwargs):
+    pks = list(pks)
+    transaction.on_commit(lambda: similar.update_creatures(pks), using=using)
@@ -0,0 +1,271 @@
+"""
+Похожие существа: ближайшие соседи по профилю характеристик.
+
+Профиль — FEATURES существа, нормированные по всему бестиарию (z-оценка: (x − среднее) / отклонение),
+так что хиты в сотнях и характеристики в единицах весят одинаково. Сходство — евклидово расстояние
+между профилями; ближайшие k ищутся одним векторным проходом по матрице и np.argpartition.
+
+Индекс лежит в файлах .npy в SIMILAR_INDEX_DIR и открывается как memmap: процессы сайта делят одни
+страницы файла через кэш ОС, а не держат по копии матрицы. Файлы одного поколения:
+
+    vectors-<g>.npy  float32 (ёмкость × len(FEATURES)) — нормированные профили;
+    keys-<g>.npy     uint8 (ёмкость × 16) — UUID существ;
+    live-<g>.npy     bool (ёмкость) — строка действующая (не удалена);
+    header-<g>.npy   int64 [число строк, счётчик изменений];
+    stats-<g>.npy    float32 (2 × len(FEATURES)) — среднее и отклонение, по которым нормированы профили.
+
+Номер текущего поколения — в файле current. rebuild() пишет новое поколение и подменяет current;
+процессы замечают это при следующем обращении. Сохранение и мягкое удаление существ правят строки на месте
+(новое существо дописывается в конец, пока хватает ёмкости) под файловой блокировкой; остальные процессы
+видят правки сразу — это тот же файл, а новые строки подхватывают по числу строк в заголовке.
+Нормировка при правках не пересчитывается: после массовых изменений стоит запустить build_similar_index.
+"""
+import fcntl
+import logging
+import os
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from threading import Lock
+
+import numpy as np
+from django.conf import settings
+
+FEATURES = ('health', 'armor_class', 'speed', 'mastery', 'dangerous_level', 'strength', 'dexterity',
+            'body_condition', 'intelligence', 'wisdom', 'charisma')
+DEFAULT_NEIGHBOURS = 6
+# запас ёмкости под новые существа до следующей перестройки
+GROWTH = 1.25
+MIN_CAPACITY = 1024
+
+logger = logging.getLogger('apps.wiki.similar')
+
+
+def _directory():
+    return Path(settings.SIMILAR_INDEX_DIR)
+
+
+@contextmanager
+def _file_lock():
+    """Блокировка записи в индекс между процессами."""
+    directory = _directory()
+    directory.mkdir(parents=True, exist_ok=True)
+    with open(directory / 'lock', 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _read_generation():
+    try:
+        return int((_directory() / 'current').read_text())
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+class SimilarIndex:
+    """Одно поколение индекса, открытое как memmap."""
+
+    def __init__(self, generation, mode='r+'):
+        directory = _directory()
+        self.directory = directory
+        self.generation = generation
+        open_file = lambda name: np.load(directory / f'{name}-{generation}.npy', mmap_mode=mode)  # noqa: E731
+        self.vectors = open_file('vectors')
+        self.keys = open_file('keys')
+        self.live = open_file('live')
+        self.header = open_file('header')
+        self.mean, self.scale = open_file('stats')
+        self.rows = {}
+        self.known = 0
+        self.refresh()
+
+    @classmethod
+    def create(cls, generation, pks, values, capacity=None):
+        """Записывает новое поколение из pk и матрицы характеристик (строка на существо)."""
+        directory = _directory()
+        directory.mkdir(parents=True, exist_ok=True)
+        values = np.asarray(values, dtype=np.float32).reshape(len(pks), len(FEATURES))
+        mean = values.mean(axis=0) if len(values) else np.zeros(len(FEATURES), dtype=np.float32)
+        scale = values.std(axis=0) if len(values) else np.ones(len(FEATURES), dtype=np.float32)
+        scale[scale == 0] = 1
+        capacity = max(capacity or int(len(pks) * GROWTH), len(pks), MIN_CAPACITY)
+
+        def create_file(name, dtype, shape):
+            return np.lib.format.open_memmap(directory / f'{name}-{generation}.npy', mode='w+', dtype=dtype,
+                                             shape=shape)
+
+        vectors = create_file('vectors', np.float32, (capacity, len(FEATURES)))
+        vectors[:len(pks)] = (values - mean) / scale
+        keys = create_file('keys', np.uint8, (capacity, 16))
+        keys[:len(pks)] = np.frombuffer(b''.join(pk.bytes for pk in pks), dtype=np.uint8).reshape(-1, 16)
+        live = create_file('live', np.bool_, (capacity,))
+        live[:len(pks)] = True
+        header = create_file('header', np.int64, (2,))
+        header[:] = (len(pks), 0)
+        stats = create_file('stats', np.float32, (2, len(FEATURES)))
+        stats[:] = (mean, scale)
+        for array in (vectors, keys, live, header, stats):
+            array.flush()
+        return cls(generation)
+
+    @property
+    def count(self):
+        return int(self.header[0])
+
+    @property
+    def capacity(self):
+        return len(self.vectors)
+
+    @property
+    def token(self):
+        """Меняется при любой правке индекса — для валидаторов условного GET."""
+        return self.generation, int(self.header[0]), int(self.header[1])
+
+    def refresh(self):
+        """Подхватывает строки, дописанные другими процессами."""
+        count = self.count
+        for row in range(self.known, count):
+            self.rows[uuid.UUID(bytes=self.keys[row].tobytes())] = row
+        self.known = count
+
+    def normalize(self, values):
+        return (np.asarray(values, dtype=np.float32) - self.mean) / self.scale
+
+    def upsert(self, changes):
+        """
+        changes — [(pk, значения FEATURES или None для удалённого)]. Вызывается под _file_lock().
+        Возвращает False, если ёмкости не хватило (нужна перестройка).
+        """
+        self.refresh()
+        new = [pk for pk, values in changes if values is not None and pk not in self.rows]
+        if self.count + len(new) > self.capacity:
+            return False
+        for pk, values in changes:
+            row = self.rows.get(pk)
+            if values is None:
+                if row is not None:
+                    self.live[row] = False
+                continue
+            if row is None:
+                row = self.count
+                self.keys[row] = np.frombuffer(pk.bytes, dtype=np.uint8)
+                self.header[0] = row + 1
+                self.rows[pk] = row
+                self.known = row + 1
+            self.vectors[row] = self.normalize(values)
+            self.live[row] = True
+        self.header[1] += 1
+        for array in (self.vectors, self.keys, self.live, self.header):
+            array.flush()
+        return True
+
+    def neighbours(self, pk, k=DEFAULT_NEIGHBOURS):
+        """pk ближайших k действующих существ, от самого похожего."""
+        self.refresh()
+        row = self.rows.get(pk)
+        count = self.count
+        if row is None or count < 2:
+            return []
+        vectors = self.vectors[:count]
+        distances = np.square(vectors - vectors[row]).sum(axis=1)
+        distances[~self.live[:count]] = np.inf
+        distances[row] = np.inf
+        k = min(k, int(np.isfinite(distances).sum()))
+        if not k:
+            return []
+        nearest = np.argpartition(distances, k - 1)[:k]
+        nearest = nearest[np.argsort(distances[nearest], kind='stable')]
+        return [uuid.UUID(bytes=self.keys[row].tobytes()) for row in nearest]
+
+
+# Индекс процесса
+
+_lock = Lock()
+_state = {'index': None}
+
+
+def _creature_rows(queryset):
+    pks, values = [], []
+    for pk, *stats in queryset.values_list('pk', *FEATURES).iterator(chunk_size=2000):
+        pks.append(pk)
+        values.append(stats)
+    return pks, values
+
+
+def rebuild():
+    """Новое поколение индекса из всех действующих существ. Возвращает число существ в индексе."""
+    from apps.wiki.models import Creature
+
+    with _file_lock():
+        pks, values = _creature_rows(Creature.objects.order_by())
+        generation = (_read_generation() or 0) + 1
+        built = SimilarIndex.create(generation, pks, values)
+        (_directory() / 'current.tmp').write_text(str(generation))
+        os.replace(_directory() / 'current.tmp', _directory() / 'current')
+        for path in _directory().glob('*-*.npy'):
+            # предыдущее поколение может открывать процесс, прочитавший current до подмены
+            stale = path.stem.rsplit('-', 1)[1]
+            if stale.isdigit() and int(stale) < generation - 1:
+                path.unlink(missing_ok=True)
+    with _lock:
+        _state['index'] = built
+    return len(pks)
+
+
+def index():
+    """
+    Текущее поколение индекса в этом процессе или None, если индекс ещё не построен командой
+    build_similar_index или не открылся (поколение уже удалено перестройкой, файлы повреждены).
+    """
+    generation = _read_generation()
+    if generation is None:
+        return None
+    with _lock:
+        current = _state['index']
+        if current is None or current.generation != generation or current.directory != _directory():
+            try:
+                current = SimilarIndex(generation)
+            except (OSError, ValueError):
+                return None
+            _state['index'] = current
+        return current
+
+
+def token():
+    """Отметка индекса для валидаторов условного GET (None, пока индекса нет)."""
+    current = index()
+    return current.token if current is not None else None
+
+
+def similar_pks(pk, k=DEFAULT_NEIGHBOURS):
+    current = index()
+    return current.neighbours(pk, k) if current is not None else []
+
+
+def _apply(changes):
+    # индекс ещё не построен: ни блокировки, ни каталога — его создаст build_similar_index
+    if _read_generation() is None:
+        return
+    # поколение открывается под блокировкой: перестройка не подменит его между открытием и правкой
+    with _file_lock():
+        current = index()
+        if current is not None and not current.upsert(changes):
+            logger.warning('Ёмкость индекса похожих существ исчерпана: запустите build_similar_index')
+
+
+def update_creatures(pks):
+    """Перечитывает характеристики существ из БД и правит их строки (удалённые — гасит)."""
+    from apps.wiki.models import Creature
+
+    pks = list(pks)
+    if pks and _read_generation() is not None:
+        found = {pk: stats for pk, *stats in Creature.objects.filter(pk__in=pks).values_list('pk', *FEATURES)}
+        _apply([(pk, found.get(pk)) for pk in pks])
+
+
+def creature_saved(pk, values, is_deleted=False):
+    """Существо сохранено: values — значения FEATURES; удалённое (is_deleted, values=None) гасится."""
+    _apply([(pk, None if is_deleted else values)])
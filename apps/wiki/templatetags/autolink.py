@@ -0,0 +1,14 @@
+from django import template
+
+from apps.wiki.autolink import render_text
+
+register = template.Library()
+
+
+@register.filter
+def autolinked(obj, field='text'):
+    """
+    {{ post|autolinked|linebreaks }} — текст объекта (поле text или указанное) с упоминаниями существ
+    и заклинаний в виде ссылок. Результат уже экранирован; кэшируется по updated_at объекта и версии названий.
+    """
+    return render_text(obj, field)
@@ -0,0 +1,90 @@
+import pytest
+from django.forms import model_to_dict
+from django.urls import reverse
+from model_bakery import baker
+
+from apps.wiki.attacks import parse_attack, reparse_attacks
+from apps.wiki.forms import CreatureForm
+from apps.wiki.models import Creature, CreatureAttack
+
+pytestmark = pytest.mark.django_db
+
+
+def test_parse_melee_attack_with_extra_damage():
+    parsed = parse_attack(
+        "Рукопашная атака оружием: +5 к попаданию, досягаемость 10 фт., одна цель. "
+        "Попадание: 10 (2d6 + 3) рубящего урона плюс 3 (1к6) урона огнём."
+    )
+    assert parsed == {
+        "to_hit": 5, "reach": 10, "range_normal": None, "range_long": None, "targets": 1,
+        "damage_dice": "2d6+3, 1d6", "damage_type": "slashing", "average_damage": 13.5,
+    }
+
+
+def test_parse_ranged_and_flat_damage():
+    ranged = parse_attack("Дальнобойная атака оружием: −1 к попаданию, дистанция 80/320 фт., две цели. "
+                          "Попадание: 1d8−2 колющего урона.")
+    assert (ranged["to_hit"], ranged["range_normal"], ranged["range_long"], ranged["targets"]) == (-1, 80, 320, 2)
+    assert (ranged["damage_dice"], ranged["damage_type"], ranged["average_damage"]) == ("1d8-2", "piercing", 2.5)
+
+    flat = parse_attack("Попадание: 1 дробящий урон.")
+    assert (flat["damage_dice"], flat["damage_type"], flat["average_damage"]) == ("", "bludgeoning", 1.0)
+    assert parse_attack("Кусает.")["average_damage"] == 0
+
+
+def test_attack_changes_update_damage_per_round(creature_factory):
+    creature = creature_factory(name="Wolf")
+    bite = baker.make("wiki.CreatureAttack", creature=creature, name="Bite", text="Попадание: 2d4+2 колющего урона.")
+    baker.make("wiki.CreatureAttack", creature=creature, name="Claw", text="Попадание: 1d4 рубящего урона.")
+    creature.refresh_from_db()
+    assert (bite.average_damage, creature.damage_per_round) == (7.0, 7.0)
+
+    bite.text = "Попадание: 3d6 колющего урона."
+    bite.save(update_fields=["text"])
+    creature.refresh_from_db()
+    assert CreatureAttack.objects.get(pk=bite.pk).damage_dice == "3d6"
+    assert creature.damage_per_round == 10.5
+
+    bite.delete()
+    creature.refresh_from_db()
+    assert creature.damage_per_round == 2.5
+
+
+def test_save_keeps_damage_and_clone_saves_as_new_row(creature_factory):
+    creature = creature_factory(name="Wolf", size="medium", saving_throws="Лов +4", skills="Восприятие +3")
+    stale = Creature.objects.get(pk=creature.pk)
+    baker.make("wiki.CreatureAttack", creature=creature, name="Bite", text="Попадание: 2d4+2 колющего урона.")
+
+    form = CreatureForm({**model_to_dict(stale), "health": 20}, instance=stale)
+    assert form.is_valid(), form.errors
+    form.save()
+    assert Creature.objects.values_list("health", "damage_per_round").get(pk=creature.pk) == (20, 7.0)
+
+    stale = Creature.objects.get(pk=creature.pk)
+    baker.make("wiki.CreatureAttack", creature=creature, name="Claw", text="Попадание: 3d6 рубящего урона.")
+    stale.health = 25
+    stale.save()
+    assert Creature.objects.values_list("health", "damage_per_round").get(pk=creature.pk) == (25, 10.5)
+
+    clone = Creature.objects.get(pk=creature.pk)
+    clone.pk, clone.name, clone.slug = None, "Dire Wolf", None
+    clone.save()
+    assert Creature.objects.count() == 2
+
+
+def test_reparse_backfills_bulk_created_attacks(creature_factory):
+    creature = creature_factory(name="Ogre")
+    CreatureAttack.objects.bulk_create([CreatureAttack(creature=creature, name="Club", text="Попадание: 2d8+4.")])
+
+    assert reparse_attacks() == (1, 1)
+    assert Creature.objects.get(pk=creature.pk).damage_per_round == 13.0
+    assert CreatureAttack.objects.get(creature=creature).reach is None
+
+
+def test_bestiary_filters_and_orders_by_damage(client, creature_factory):
+    for name, text in (("Rat", "1d4"), ("Bear", "2d8+4"), ("Wolf", "2d4+2")):
+        baker.make("wiki.CreatureAttack", creature=creature_factory(name=name), name="Bite", text=f"Попадание: {text}.")
+
+    response = client.get(reverse("wiki:creature_list"), {"damage_per_round_min": 5, "sort": "-damage_per_round"})
+
+    assert [creature.name for creature in response.context["creatures"]] == ["Bear", "Wolf"]
@@ -0,0 +1,80 @@
+import pytest
+from django.core.cache import cache
+from django.urls import reverse
+from model_bakery import baker
+
+from apps.wiki import autolink
+from apps.wiki.autolink import Automaton
+from apps.wiki.models import Creature
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def test_automaton_prefers_leftmost_longest_whole_words():
+    automaton = Automaton({"огненный шар": "/fireball", "шар": "/ball", "волк": "/wolf", "ол": "/ol"})
+    text = "волк бросил огненный шар, а волкодав — шар"
+    found = [(text[start:end], url) for start, end, url in automaton.matches(text)]
+    assert found == [("волк", "/wolf"), ("огненный шар", "/fireball"), ("шар", "/ball")]
+
+
+def test_link_mentions_escapes_text_and_links_names(creature_factory):
+    wolf = creature_factory(name="Волк")
+    spell = baker.make("wiki.Spell", name="Огненный шар", description="...")
+
+    html = autolink.link_mentions("<b>ВОЛК</b> и огненный шар")
+
+    wolf_url = reverse("wiki:creature_detail", kwargs={"slug": wolf.slug})
+    spell_url = reverse("wiki:spell_detail", kwargs={"slug": spell.slug})
+    assert html == (f'&lt;b&gt;<a class="autolink" href="{wolf_url}">ВОЛК</a>&lt;/b&gt; '
+                    f'и <a class="autolink" href="{spell_url}">огненный шар</a>')
+
+
+def test_names_follow_creature_changes(creature_factory, django_capture_on_commit_callbacks):
+    wolf = creature_factory(name="Волк")
+    assert "autolink" in autolink.link_mentions("волк")
+
+    with django_capture_on_commit_callbacks(execute=True):
+        bear = creature_factory(name="Медведь")
+    assert "autolink" in autolink.link_mentions("медведь")
+
+    with django_capture_on_commit_callbacks(execute=True):
+        wolf.name = "Лютоволк"
+        wolf.save()
+        bear.delete()
+    assert str(autolink.link_mentions("волк и медведь")) == "волк и медведь"
+    assert "autolink" in autolink.link_mentions("лютоволк")
+
+
+def test_names_follow_bulk_soft_delete_and_restore(creature_factory, django_capture_on_commit_callbacks):
+    creature_factory(name="Волк")
+    assert "autolink" in autolink.link_mentions("волк")
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Creature.objects.filter(name="Волк").delete()
+    assert str(autolink.link_mentions("волк")) == "волк"
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Creature.objects.restore()
+    assert "autolink" in autolink.link_mentions("волк")
+
+
+def test_post_page_links_mentions_and_changes_etag(client, creature_factory, django_capture_on_commit_callbacks):
+    post = baker.make("wiki.Post", text="Встреча с волком и Волк", slug="vstrecha")
+    url = reverse("wiki:post_detail", kwargs={"slug": post.slug})
+    first = client.get(url)
+    assert "autolink" not in first.content.decode()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        wolf = creature_factory(name="Волк")
+    second = client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+
+    assert second.status_code == 200
+    wolf_url = reverse("wiki:creature_detail", kwargs={"slug": wolf.slug})
+    assert f'с волком и <a class="autolink" href="{wolf_url}">Волк</a>' in second.content.decode()
@@ -0,0 +1,44 @@
+import pytest
+from django.urls import reverse
+from model_bakery import baker
+
+from apps.wiki.combat import Combatant, simulate, simulate_loop
+
+GOBLIN = Combatant("Гоблин", 7, 15, 4, [(1, 6)], 2)
+OGRE = Combatant("Огр", 59, 11, 6, [(2, 8)], 4)
+
+
+def test_simulation_matches_reference_loop():
+    batched = simulate([GOBLIN] * 4, [OGRE], trials=20_000, batch_size=3000, seed=7)
+    looped = simulate_loop([GOBLIN] * 4, [OGRE], trials=3000, seed=7)
+
+    assert batched["trials"] == 20_000
+    assert batched["a_wins"] + batched["b_wins"] + batched["draws"] == pytest.approx(1)
+    assert batched["a_wins"] == pytest.approx(looped["a_wins"], abs=0.05)
+    assert batched["expected_rounds"] == pytest.approx(looped["expected_rounds"], rel=0.1)
+
+
+def test_time_budget_stops_between_batches():
+    result = simulate([GOBLIN], [OGRE], trials=50_000, batch_size=1000, time_budget=0)
+    assert result["trials"] == 1000
+
+
+@pytest.mark.django_db
+def test_battle_endpoint(client, creature_factory):
+    goblin = creature_factory(name="Goblin", health=7, armor_class=15)
+    ogre = creature_factory(name="Ogre", health=59, armor_class=11)
+    baker.make("wiki.CreatureAttack", creature=goblin, name="Scimitar",
+               text="Рукопашная атака оружием: +4 к попаданию. Попадание: 1d6+2 рубящего урона.")
+    baker.make("wiki.CreatureAttack", creature=ogre, name="Club",
+               text="Рукопашная атака оружием: +6 к попаданию. Попадание: 2d8+4 дробящего урона.")
+    url = reverse("wiki:creature_battle")
+
+    response = client.get(url, {"a": f"{goblin.slug}:4", "b": ogre.slug, "trials": 2000, "seed": 1})
+
+    data = response.json()
+    assert response.status_code == 200
+    assert data["trials"] == 2000 and 0.3 < data["a_wins"] < 0.7
+    assert data["sides"][0] == [{"slug": goblin.slug, "name": "Goblin", "count": 4}]
+    assert client.get(url, {"a": goblin.slug}).status_code == 400
+    assert client.get(url, {"a": goblin.slug, "b": ogre.slug, "seed": -1}).status_code == 400
+    assert client.get(url, {"a": goblin.slug, "b": "nobody"}).status_code == 404
@@ -0,0 +1,79 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from model_bakery import baker
+
+pytestmark = pytest.mark.django_db
+
+
+def _revalidate(client, url, etag):
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    return response, len(queries)
+
+
+def test_detail_answers_304_with_one_query(client, creature_factory):
+    creature = creature_factory(name="Wolf")
+    baker.make("wiki.CreatureAttack", creature=creature, name="Bite", text="2d4+2")
+    url = reverse("wiki:creature_detail", kwargs={"slug": creature.slug})
+
+    first = client.get(url)
+    assert first.status_code == 200
+    assert first["Last-Modified"]
+    assert "no-cache" in first["Cache-Control"]
+
+    response, queries = _revalidate(client, url, first["ETag"])
+    assert response.status_code == 304
+    assert response.content == b""
+    assert queries == 1
+
+
+def test_child_changes_change_etag(client, creature_factory):
+    creature = creature_factory(name="Wolf")
+    bite = baker.make("wiki.CreatureAttack", creature=creature, name="Bite", text="2d4+2")
+    baker.make("wiki.CreatureAttack", creature=creature, name="Claw", text="1d6")
+    url = reverse("wiki:creature_detail", kwargs={"slug": creature.slug})
+    etag = client.get(url)["ETag"]
+
+    # удалённая атака была изменена раньше оставшейся — максимум updated_at не меняется, меняется число строк
+    bite.delete()
+
+    response, _ = _revalidate(client, url, etag)
+    assert response.status_code == 200
+    assert response["ETag"] != etag
+
+
+def test_list_etag_changes_after_soft_delete(client):
+    spells = baker.make("wiki.Spell", slug=None, _quantity=3)
+    url = reverse("wiki:spell_list")
+    etag = client.get(url)["ETag"]
+
+    assert _revalidate(client, url, etag)[0].status_code == 304
+
+    spells[1].delete()
+
+    assert _revalidate(client, url, etag)[0].status_code == 200
+
+
+def test_list_etag_changes_after_category_rename(client, creature_factory):
+    creature = creature_factory(name="Wolf")
+    url = reverse("wiki:creature_list")
+    etag = client.get(url)["ETag"]
+
+    creature.category.name = "Звери"
+    creature.category.save()
+
+    response, _ = _revalidate(client, url, etag)
+    assert response.status_code == 200
+    assert "Звери" in response.content.decode()
+
+
+def test_product_review_changes_etag(client):
+    product = baker.make("shop.Product", name="Dice", slug=None, price=10, prom_price=5, quantity=1)
+    url = reverse("shop:product_detail", kwargs={"slug": product.slug})
+    etag = client.get(url)["ETag"]
+
+    baker.make("shop.ProductReview", product=product, text="Хорошие кубики")
+
+    assert _revalidate(client, url, etag)[0].status_code == 200
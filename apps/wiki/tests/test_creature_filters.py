@@ -0,0 +1,69 @@
+import pytest
+from django.urls import reverse
+from model_bakery import baker
+
+from apps.wiki.filters import CreatureFilterForm
+from apps.wiki.models import Creature, CreatureCategory
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def bestiary(creature_factory):
+    beasts = baker.make("wiki.CreatureCategory", name="Звери")
+    undead = baker.make("wiki.CreatureCategory", name="Нежить")
+    creature_factory(name="Wolf", category=beasts, size="medium", dangerous_level=2, strength=12)
+    creature_factory(name="Bear", category=beasts, size="large", dangerous_level=6, strength=18)
+    creature_factory(name="Rat", category=beasts, size="tiny", dangerous_level=1, strength=3)
+    creature_factory(name="Ghoul", category=undead, size="medium", dangerous_level=7, strength=13)
+    creature_factory(name="Lich", category=undead, size="medium", dangerous_level=18, strength=11)
+    return beasts, undead
+
+
+def test_filters_by_category_size_and_ranges(client, bestiary):
+    beasts, _ = bestiary
+
+    response = client.get(reverse("wiki:creature_list"), {
+        "category": beasts.pk, "size": ["medium", "large"], "strength_min": 10, "dangerous_level_max": 10,
+    })
+
+    assert [creature.name for creature in response.context["creatures"]] == ["Bear", "Wolf"]
+    assert response.context["facets"]["total"] == 2
+
+
+def test_facets_ignore_their_own_filter(bestiary):
+    beasts, undead = bestiary
+    form = CreatureFilterForm({"category": [undead.pk], "size": ["medium"]},
+                              categories=CreatureCategory.objects.all())
+
+    counts = form.facets(Creature.objects.all())
+
+    # категории считаются с фильтром по размеру, но без фильтра по категории — и наоборот
+    assert counts["category"] == {beasts.pk: 1, undead.pk: 2}
+    assert counts["size"] == {"medium": 2}
+    assert counts["danger"][(5, 8)] == 1 and counts["danger"][(17, 20)] == 1
+    assert counts["total"] == 2
+
+
+def test_facets_are_one_grouped_query(bestiary, django_assert_num_queries):
+    form = CreatureFilterForm({"strength_min": 5}, categories=CreatureCategory.objects.all())
+    form.values  # разбор формы не делает запросов, кроме выбора категорий
+
+    with django_assert_num_queries(1):
+        form.facets(Creature.objects.all())
+
+
+def test_sorted_pages_keep_filters_in_links(client, creature_factory, strict_query_budget):
+    for level in range(1, 10):
+        creature_factory(name=f"Beast {level}", dangerous_level=level)
+    creature_factory(name="Too strong", dangerous_level=10, strength=20)
+    params = {"sort": "-dangerous_level", "strength_max": 15}
+
+    first = client.get(reverse("wiki:creature_list"), params)
+    page_obj = first.context["page_obj"]
+    assert [creature.dangerous_level for creature in page_obj] == [9, 8, 7, 6, 5, 4]
+    assert "strength_max=15" in first.content.decode()
+    assert "sort=-dangerous_level" in first.content.decode()
+
+    second = client.get(reverse("wiki:creature_list"), {**params, "cursor": page_obj.next_cursor})
+    assert [creature.dangerous_level for creature in second.context["page_obj"]] == [3, 2, 1]
@@ -0,0 +1,73 @@
+import pytest
+from django.core.cache import cache
+from django.urls import reverse
+from model_bakery import baker
+
+from apps.wiki import encounters
+from apps.wiki.encounters import EncounterIndex, budget, build_encounters
+from apps.wiki.models import Creature
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def test_encounters_fit_the_budget_and_filters():
+    index = EncounterIndex([
+        (number, danger, category, size, f"Creature {number}", f"creature-{number}")
+        for number, (danger, category, size) in enumerate(
+            (danger, category, size) for danger in range(0, 8) for category in (1, 2) for size in ("small", "large")
+        )
+    ])
+    low, high = budget(4, 5, "hard")
+
+    found = build_encounters(index, 4, 5, "hard", categories=[2], sizes=["large"], results=5, seed=3)
+
+    assert len(found) == 5
+    for encounter in found:
+        assert low <= encounter["adjusted_xp"] < high
+        assert all(int(monster["slug"].split("-")[1]) % 4 == 3 for monster in encounter["monsters"])
+    assert build_encounters(index, 4, 5, "hard", categories=[99]) == []
+
+
+def test_index_follows_creature_changes(creature_factory, django_capture_on_commit_callbacks):
+    wolf = creature_factory(name="Wolf", dangerous_level=1)
+    assert len(encounters.index()) == 1
+
+    with django_capture_on_commit_callbacks(execute=True):
+        bear = creature_factory(name="Bear", dangerous_level=3)
+        wolf.dangerous_level = 2
+        wolf.save()
+    index = encounters.index()
+    assert {pk: key[0] for pk, key in index.locations.items()} == {wolf.pk: 2, bear.pk: 3}
+
+    with django_capture_on_commit_callbacks(execute=True):
+        bear.delete()
+    assert list(encounters.index().locations) == [wolf.pk]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Creature.objects.filter(pk=wolf.pk).delete()
+    assert not encounters.index().locations
+    with django_capture_on_commit_callbacks(execute=True):
+        Creature.objects.restore()
+    assert set(encounters.index().locations) == {wolf.pk, bear.pk}
+
+
+def test_encounter_endpoint(client, creature_factory):
+    goblin = creature_factory(name="Goblin", dangerous_level=1)
+    url = reverse("wiki:creature_encounter")
+
+    response = client.get(url, {"party": 4, "level": 1, "difficulty": "medium", "seed": 1})
+
+    data = response.json()
+    assert data["budget"] == {"from": 200, "to": 300}
+    assert data["encounters"][0]["monsters"] == [{
+        "name": "Goblin", "danger": 1, "count": 1,
+        "url": reverse("wiki:creature_detail", kwargs={"slug": goblin.slug}),
+    }]
+    assert client.get(url, {"difficulty": "impossible"}).status_code == 400
@@ -0,0 +1,115 @@
+import csv
+import io
+import json
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from model_bakery import baker
+
+from apps.wiki import exporter
+from apps.wiki.exporter import WikiExport
+from apps.wiki.importer import import_wiki
+from apps.wiki.models import Creature
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def wolf(creature_factory):
+    creature = creature_factory(name="Wolf", size="medium", saving_throws="Лов +4", skills="Восприятие +3")
+    baker.make("wiki.CreatureAttack", creature=creature, name="Bite", text="2d4+2")
+    baker.make("wiki.CreaturePassive", creature=creature, name="Keen Smell", text="Нюх")
+    return creature
+
+
+def test_creature_export_can_be_imported_back(wolf, django_assert_max_num_queries):
+    export = WikiExport("creatures", chunk_size=1)
+    with django_assert_max_num_queries(3):
+        lines = list(export.lines("jsonl"))
+
+    row = json.loads(lines[0])
+    assert row["name"] == "Wolf"
+    assert row["attacks"] == [{"name": "Bite", "text": "2d4+2"}]
+
+    wolf.hard_delete()
+    result = import_wiki(iter(lines), "jsonl", index=False)
+
+    assert result.failed == 0
+    assert Creature.objects.get(name="Wolf").attacks.get().text == "2d4+2"
+
+
+def test_incremental_export_after_watermark(creature_factory):
+    first = creature_factory(name="Wolf")
+    second = creature_factory(name="Bear")
+    watermark = WikiExport("creatures")
+    list(watermark.rows())
+
+    first.name = "Dire Wolf"
+    first.save()
+    second.delete()
+    third = creature_factory(name="Imp")
+
+    export = WikiExport("creatures", since=watermark.last_watermark)
+    rows = {row["id"]: row for row in export.rows()}
+
+    assert rows[first.pk]["name"] == "Dire Wolf"
+    assert rows[second.pk] == {"type": "creature", "id": second.pk, "deleted": True}
+    assert third.pk in rows and len(rows) == 3
+    assert export.last_watermark > watermark.last_watermark
+
+
+def test_export_endpoint_streams_csv_for_staff(client, wolf):
+    url = reverse("wiki:export", kwargs={"name": "creatures", "fmt": "csv"})
+    assert client.get(url).status_code == 302
+
+    client.force_login(baker.make("accounts.CustomUser", is_staff=True))
+    response = client.get(url)
+
+    assert response.streaming
+    rows = list(csv.DictReader(io.StringIO(b"".join(response.streaming_content).decode())))
+    assert rows[0]["name"] == "Wolf"
+    assert json.loads(rows[0]["passives"]) == [{"name": "Keen Smell", "text": "Нюх"}]
+
+
+def test_export_command_keeps_watermark_in_state_file(tmp_path, wolf, monkeypatch):
+    monkeypatch.setattr(exporter, "SINCE_OVERLAP", timedelta(0))
+    state = tmp_path / "creatures.state"
+    output = tmp_path / "creatures.jsonl"
+
+    call_command("export_wiki", "creatures", "--output", str(output), "--state-file", str(state), stderr=io.StringIO())
+    assert len(output.read_text(encoding="utf-8").splitlines()) == 1
+    assert state.read_text(encoding="utf-8")
+
+    call_command("export_wiki", "creatures", "--output", str(output), "--state-file", str(state), stderr=io.StringIO())
+    assert output.read_text(encoding="utf-8") == ""
+
+
+def test_incremental_export_sees_child_changes(wolf, monkeypatch):
+    monkeypatch.setattr(exporter, "SINCE_OVERLAP", timedelta(0))
+    watermark = WikiExport("creatures")
+    list(watermark.rows())
+    assert not list(WikiExport("creatures", since=watermark.last_watermark).rows())
+
+    attack = wolf.attacks.get()
+    attack.text = "2d6+2"
+    attack.save()
+    export = WikiExport("creatures", since=watermark.last_watermark)
+    assert [row["attacks"] for row in export.rows()] == [[{"name": "Bite", "text": "2d6+2"}]]
+
+    wolf.passives.get().delete()
+    rows = list(WikiExport("creatures", since=export.last_watermark).rows())
+    assert [row["passives"] for row in rows] == [[]]
+
+
+def test_incremental_export_repeats_overlap_before_watermark(wolf):
+    watermark = WikiExport("creatures")
+    list(watermark.rows())
+
+    # транзакция, зафиксированная после выгрузки, но с датой чуть раньше отметки
+    Creature.objects.filter(pk=wolf.pk).update(updated_at=watermark.last_watermark - timedelta(seconds=1))
+    export = WikiExport("creatures", since=watermark.last_watermark)
+
+    assert [row["id"] for row in export.rows()] == [wolf.pk]
+    assert export.last_watermark == watermark.last_watermark
@@ -0,0 +1,62 @@
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from model_bakery import baker
+
+from apps.common import fragment_cache
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def _get(client, creature):
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(reverse("wiki:creature_detail", kwargs={"slug": creature.slug}))
+    assert response.status_code == 200
+    return response, [query["sql"] for query in queries.captured_queries]
+
+
+def test_cached_fragment_skips_child_queries(client, creature_factory):
+    creature = creature_factory(name="Wolf")
+    baker.make("wiki.CreatureAttack", creature=creature, name="Bite", text="2d4+2")
+
+    first, first_sql = _get(client, creature)
+    second, second_sql = _get(client, creature)
+
+    assert "Bite" in first.content.decode() and "Bite" in second.content.decode()
+    assert any("wiki_creatureattack" in sql and "MAX" not in sql for sql in first_sql)
+    assert not any("wiki_creatureattack" in sql and "MAX" not in sql for sql in second_sql)
+    assert fragment_cache.stats(["wiki.creature"]) == {
+        "wiki.creature": {"hits": 1, "misses": 1, "hit_rate": 0.5},
+    }
+
+
+def test_attack_changes_invalidate_fragment(client, creature_factory):
+    creature = creature_factory(name="Wolf")
+    attack = baker.make("wiki.CreatureAttack", creature=creature, name="Bite", text="2d4+2")
+    _get(client, creature)
+
+    attack.name = "Claw"
+    attack.save()
+    assert "Claw" in _get(client, creature)[0].content.decode()
+
+    attack.delete()
+    assert "Claw" not in _get(client, creature)[0].content.decode()
+
+
+def test_category_rename_invalidates_fragment(client, creature_factory, category):
+    creature = creature_factory(name="Wolf")
+    _get(client, creature)
+
+    category.name = "Звери"
+    category.save()
+
+    assert "Звери" in _get(client, creature)[0].content.decode()
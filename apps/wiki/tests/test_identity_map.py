@@ -0,0 +1,32 @@
+import pytest
+from django.urls import reverse
+from model_bakery import baker
+
+from apps.common.identity_map import identity_map
+from apps.wiki.models import Creature
+
+pytestmark = pytest.mark.django_db
+
+
+def test_spell_detail_loads_spell_with_category_in_one_query(client, django_assert_max_num_queries):
+    spell = baker.make("wiki.Spell", name="Fireball", slug=None)
+    response = client.get(reverse("wiki:spell_detail", kwargs={"slug": spell.slug}))
+
+    assert response.status_code == 200
+    assert response.context["spell"].category.pk == spell.category_id
+    # заклинание с категорией + связи эффектов + похожие заклинания
+    with django_assert_max_num_queries(3):
+        client.get(reverse("wiki:spell_detail", kwargs={"slug": spell.slug}))
+
+def test_replaced_image_is_deleted_inside_identity_map(creature_factory, monkeypatch):
+    from apps.wiki import signals
+    creature = creature_factory(name="Wolf", image="creatures/old.png")
+    deleted = []
+    monkeypatch.setattr(signals, "delete_file_on_commit", lambda path, using=None: deleted.append(path))
+
+    with identity_map():
+        edited = Creature.objects.get(slug=creature.slug)
+        edited.image = "creatures/new.png"
+        edited.save()
+
+    assert deleted and deleted[0].endswith("old.png")
@@ -0,0 +1,107 @@
+import io
+import json
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.urls import reverse
+from model_bakery import baker
+
+from apps.wiki import forms as wiki_forms
+from apps.wiki.effect_set import decode
+from apps.wiki.importer import import_wiki
+from apps.wiki.models import Creature, Spell
+
+pytestmark = pytest.mark.django_db
+
+CREATURE = {
+    "type": "creature", "description": "Серый хищник", "health": 11, "armor_class": 13, "speed": 40,
+    "size": "medium", "dangerous_level": 2, "mastery": 2, "saving_throws": "Лов +4", "skills": "Восприятие +3",
+}
+
+
+def _jsonl(*records):
+    return io.StringIO("".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records))
+
+
+def test_jsonl_creatures_with_children_and_row_errors(category):
+    category.name = "Звери"
+    category.save()
+    baker.make("wiki.Creature", name="Медведь", category=category, slug=None)
+    errors = {}
+
+    result = import_wiki(_jsonl(
+        {**CREATURE, "name": "Волк", "category": "Звери",
+         "attacks": [{"name": "Укус", "text": "2d4+2"}], "passives": [{"name": "Чутьё", "text": "Нюх"}]},
+        {**CREATURE, "name": "Волк", "category": "Звери"},
+        {**CREATURE, "name": "Медведь", "category": "Звери"},
+        {**CREATURE, "name": "Тень", "category": "Нежить"},
+        {**CREATURE, "name": "Гоблин", "category": "Звери", "health": "много"},
+    ), "jsonl", chunk_size=2, on_error=lambda number, row_errors: errors.update({number: row_errors}), index=False)
+
+    assert result.created == {"creature": 1, "spell": 0}
+    assert result.failed == 4
+    assert set(errors) == {2, 3, 4, 5}
+    assert "category" in errors[4] and "health" in errors[5]
+    wolf = Creature.objects.get(name="Волк")
+    assert wolf.slug
+    assert [attack.name for attack in wolf.attacks.all()] == ["Укус"]
+    assert wolf.passives.count() == 1
+
+
+def test_csv_spells_fill_level_and_effect_set():
+    baker.make("wiki.SpellCategory", name="Воплощение", slug="evocation")
+    fire = baker.make("wiki.SpellEffect", name="Огонь", slug="fire", text="Поджигает цель")
+    blast = baker.make("wiki.SpellEffect", name="Взрыв", slug="blast", text="Отбрасывает")
+    lines = io.StringIO(
+        "name,category,spell_level,description,effects\n"
+        "Огненный шар,evocation,3,Шар огня,fire;Взрыв\n"
+        "Искра,evocation,заговор,Искра,\n"
+    )
+
+    result = import_wiki(lines, "csv", kind="spell", index=False)
+
+    assert result.created["spell"] == 2 and result.failed == 0
+    fireball = Spell.objects.get(name="Огненный шар")
+    assert fireball.level == 3
+    assert decode(fireball.effect_set) == sorted([fire.pk, blast.pk])
+    assert {link.note for link in fireball.spelleffectlink_set.all()} == {"Поджигает цель", "Отбрасывает"}
+    assert Spell.objects.get(name="Искра").level == 0
+
+
+def test_import_command_writes_report(tmp_path, category):
+    source = tmp_path / "creatures.jsonl"
+    source.write_text(_jsonl(
+        {**CREATURE, "name": "Волк", "category": category.name},
+        {**CREATURE, "name": "Волк", "category": category.name},
+    ).getvalue(), encoding="utf-8")
+    report = tmp_path / "report.jsonl"
+    out = io.StringIO()
+
+    call_command("import_wiki", str(source), "--report", str(report), "--no-search-index", stdout=out)
+
+    assert "Импортировано существ: 1" in out.getvalue()
+    assert [json.loads(line)["line"] for line in report.read_text(encoding="utf-8").splitlines()] == [2]
+
+
+def test_malformed_csv_and_large_uploads_are_rejected(tmp_path, client, monkeypatch):
+    client.force_login(baker.make("accounts.CustomUser", is_staff=True, is_superuser=True))
+    source = tmp_path / "spells.csv"
+    # поле длиннее csv.field_size_limit() — csv.Error
+    source.write_text("name,description\nЩит," + "x" * 200_000 + "\n", encoding="utf-8")
+
+    with pytest.raises(CommandError):
+        call_command("import_wiki", str(source), "--type", "spell", "--no-search-index")
+
+    response = client.post(reverse("admin:wiki_spell_import"), {
+        "kind": "spell", "file": SimpleUploadedFile("spells.csv", source.read_bytes()),
+    })
+    assert response.status_code == 200
+    assert response.context["form"].errors["file"]
+
+    monkeypatch.setattr(wiki_forms, "IMPORT_MAX_UPLOAD_SIZE", 4)
+    response = client.post(reverse("admin:wiki_spell_import"), {
+        "kind": "spell", "file": SimpleUploadedFile("spells.csv", b"name\n\xd0\x9e\n"),
+    })
+    assert "import_wiki" in response.context["form"].errors["file"][0]
+    assert not Spell.objects.exists()
@@ -1,8 +1,11 @@
+import uuid
+
 import pytest
 from django.db import IntegrityError
 from model_bakery import baker
 
-from apps.common.utils import unique_slugify
+from apps.common.utils import unique_slugify, pick_free_slug, bulk_unique_slugify
+from apps.wiki.models import Creature
 
 pytestmark = pytest.mark.django_db # весь файл работает с тестовой БД
 
@@ -27,6 +30,56 @@ def test_slug_is_unique_for_same_names(creature_factory):
     assert c.slug.startswith("alpha-wolf")
     assert c2.slug.startswith("alpha-wolf")
 
+def test_slug_collision_gets_readable_suffix(creature_factory):
+    # разные имена, но одинаковый слаг после транслитерации
+    c = creature_factory(name="Alpha wolf", slug=None)
+    c2 = creature_factory(name="Alpha-wolf", slug=None)
+    c3 = creature_factory(name="Alpha  wolf", slug=None)
+
+    assert (c.slug, c2.slug, c3.slug) == ("alpha-wolf", "alpha-wolf-2", "alpha-wolf-3")
+
+def test_slug_collision_counts_soft_deleted(creature_factory):
+    c = creature_factory(name="Alpha wolf", slug=None)
+    c.delete()
+    c2 = creature_factory(name="Alpha-wolf", slug=None)
+
+    assert c2.slug == "alpha-wolf-2"
+
+def test_slug_race_is_retried(creature_factory, monkeypatch):
+    creature_factory(name="Alpha wolf", slug=None)
+
+    # имитируем гонку: первый подбор возвращает слаг, который уже занял параллельный запрос
+    from apps.common import models as common_models
+    results = iter(["alpha-wolf", "alpha-wolf-2"])
+    monkeypatch.setattr(common_models, "unique_slugify", lambda instance, slug: next(results))
+
+    c2 = creature_factory(name="Alpha-wolf", slug=None)
+    assert c2.slug == "alpha-wolf-2"
+
+def test_pick_free_slug_fits_max_length():
+    taken = {"abcdef", "abcd-2"}
+    assert pick_free_slug("abcdef", taken, 6) == "abcd-3"
+    assert pick_free_slug("abc", taken, 6) == "abc"
+
+def test_bulk_slugify_resolves_db_and_batch_collisions(creature_factory, category, django_assert_num_queries):
+    creature_factory(name="Alpha wolf", slug=None)
+    batch = [
+        Creature(name="Alpha-wolf", category=category, description="..."),
+        Creature(name="Alpha  wolf", category=category, description="..."),
+        Creature(name="Imp", category=category, description="..."),
+        Creature(name="Imp lord", slug="imp-2", category=category, description="..."),
+    ]
+
+    with django_assert_num_queries(1):
+        bulk_unique_slugify(batch)
+    Creature.objects.bulk_create(batch)
+
+    assert [c.slug for c in batch] == ["alpha-wolf-2", "alpha-wolf-3", "imp", "imp-2"]
+
+def test_post_slug_created_from_title():
+    post = baker.make("wiki.Post", title="Первая статья", slug=None)
+    assert post.slug == "pervaya-statya"
+
 def test_category_relation_required(baker):
     cat = baker.make("wiki.CreatureCategory")
     c = baker.make("wiki.Creature", category=cat, name="Wolf", slug=None, description="...")
@@ -40,3 +93,41 @@ def test_image_is_optional(creature_factory):
 
 # Spell, SpellCategory
 
+
+def test_live_indexes_contributed_from_ordering_and_slug():
+    index_fields = [index.fields for index in Creature._meta.indexes if index.condition is not None]
+    assert ['slug'] in index_fields
+    # pk в конце — разделитель keyset-пагинации
+    assert ['name', 'id'] in index_fields
+
+def test_live_rows_queries_use_partial_indexes():
+    from django.core.management import call_command
+    call_command("check_live_indexes")  # CommandError, если есть полный проход по таблице
+
+
+# UUIDv7
+
+
+def test_uuid7_is_version_7_and_time_ordered():
+    from apps.common.utils import uuid7
+    first, second = uuid7(timestamp=1_700_000_000), uuid7(timestamp=1_700_000_001)
+    assert first.version == 7 and first.variant == uuid.RFC_4122
+    assert first < second
+
+def test_new_uuid_follows_setting(settings):
+    from apps.common.utils import new_uuid
+    settings.TIME_ORDERED_UUIDS = True
+    assert new_uuid().version == 7
+    settings.TIME_ORDERED_UUIDS = False
+    assert new_uuid().version == 4
+
+def test_rekey_uuid7_updates_foreign_keys(creature_factory):
+    from django.core.management import call_command
+    creature = creature_factory(name="Wolf")
+    baker.make("wiki.CreatureAttack", creature=creature, name="Bite", text="1d6")
+
+    call_command("rekey_uuid7", model=["wiki.Creature"], chunk_size=1)
+
+    rekeyed = Creature.objects.get(name="Wolf")
+    assert rekeyed.pk.version == 7
+    assert list(rekeyed.attacks.values_list("name", flat=True)) == ["Bite"]
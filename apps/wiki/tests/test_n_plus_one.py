@@ -0,0 +1,48 @@
+import pytest
+from model_bakery import baker
+
+from apps.common.n_plus_one import NPlusOneDetected, detect_n_plus_one
+from apps.wiki.models import Creature
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def creatures(creature_factory):
+    for i in range(3):
+        creature = creature_factory(name=f"Creature {i}")
+        baker.make("wiki.CreatureAttack", creature=creature, name="Bite", text="1d6")
+
+
+def test_lazy_foreign_key_in_loop_is_detected(creatures):
+    with pytest.raises(NPlusOneDetected, match=r"wiki\.Creature\.category.*select_related\('category'\)"):
+        with detect_n_plus_one(mode="raise"):
+            [creature.category.name for creature in Creature.objects.all()]
+
+def test_select_related_is_not_reported(creatures):
+    with detect_n_plus_one(mode="raise") as detector:
+        [creature.category.name for creature in Creature.objects.select_related("category")]
+    assert detector.reports == []
+
+def test_reverse_relation_suggests_prefetch_related(creatures, caplog):
+    with detect_n_plus_one(mode="warn") as detector:
+        [list(creature.attacks.all()) for creature in Creature.objects.all()]
+
+    assert len(detector.reports) == 1
+    assert "prefetch_related('attacks')" in detector.reports[0]
+    assert "wiki.Creature.attacks" in caplog.text
+
+    with detect_n_plus_one(mode="raise"):
+        [list(creature.attacks.all()) for creature in Creature.objects.prefetch_related("attacks")]
+
+def test_many_to_many_is_detected():
+    products = baker.make("shop.Product", slug=None, price=10, prom_price=5, quantity=1, make_m2m=True, _quantity=3)
+    with pytest.raises(NPlusOneDetected, match=r"shop\.Product\.tags"):
+        with detect_n_plus_one(mode="raise"):
+            [list(product.tags.all()) for product in type(products[0]).objects.all()]
+
+def test_single_object_access_is_not_reported(creature_factory):
+    creature = creature_factory(name="Wolf")
+    with detect_n_plus_one(mode="raise") as detector:
+        Creature.objects.get(pk=creature.pk).category
+    assert detector.reports == []
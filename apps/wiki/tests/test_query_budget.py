@@ -0,0 +1,66 @@
+import pytest
+from django.urls import reverse
+from model_bakery import baker
+
+from apps.common.query_budget import QueryBudgetExceeded, assert_query_budget, enforce_query_budget
+from apps.wiki.views import CreatureListView
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def wiki_and_shop(creature_factory):
+    for i in range(8):
+        creature_factory(name=f"Creature {i}")
+        baker.make("wiki.Spell", name=f"Spell {i}", slug=None)
+        baker.make("wiki.Post", title=f"Post {i}", slug=None)
+        product = baker.make("shop.Product", name=f"Product {i}", slug=None, price=10, prom_price=5, quantity=1,
+                             make_m2m=True)
+        baker.make("shop.ProductImage", product=product, position=1)
+        baker.make("shop.ProductReview", product=product, _quantity=2)
+    return product
+
+
+@enforce_query_budget
+def test_pages_fit_their_query_budgets(client, wiki_and_shop):
+    from apps.wiki.models import Creature, Spell, Post
+    urls = [
+        reverse("wiki:home_page"),
+        reverse("wiki:post_list"),
+        reverse("wiki:creature_list"),
+        reverse("wiki:spell_list"),
+        reverse("wiki:post_detail", kwargs={"slug": Post.objects.first().slug}),
+        reverse("wiki:creature_detail", kwargs={"slug": Creature.objects.first().slug}),
+        reverse("wiki:spell_detail", kwargs={"slug": Spell.objects.first().slug}),
+        reverse("shop:product_list"),
+        reverse("shop:product_detail", kwargs={"slug": wiki_and_shop.slug}),
+        reverse("shop:product_review_list", kwargs={"slug": wiki_and_shop.slug}),
+    ]
+    for url in urls:
+        response = client.get(url)
+        assert response.status_code == 200, url
+        assert_query_budget(response)
+
+def test_over_budget_view_fails(client, creature_factory, strict_query_budget, monkeypatch):
+    creature_factory(name="Wolf")
+    monkeypatch.setattr(CreatureListView, "query_budget", 0)
+
+    with pytest.raises(QueryBudgetExceeded, match="CreatureListView"):
+        client.get(reverse("wiki:creature_list"))
+
+def test_over_budget_view_is_logged(client, creature_factory, monkeypatch, caplog):
+    creature_factory(name="Wolf")
+    monkeypatch.setattr(CreatureListView, "query_budget", 0)
+
+    response = client.get(reverse("wiki:creature_list"))
+
+    assert response.status_code == 200
+    assert "CreatureListView" in caplog.text
+
+def test_query_headers_in_debug(client, settings):
+    settings.DEBUG = True
+    response = client.get(reverse("wiki:creature_list"))
+
+    assert response["X-Query-Count"] == str(response.query_stats.count)
+    assert response["X-Query-Budget"] == str(CreatureListView.query_budget)
+    assert "X-Query-Time-Ms" in response and "X-Query-Duplicates" in response
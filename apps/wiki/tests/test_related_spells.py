@@ -0,0 +1,77 @@
+import io
+import math
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from model_bakery import baker
+
+from apps.wiki.models import RelatedSpell, Spell, SpellEffectLink
+from apps.wiki.related import EffectMatrix
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def effects():
+    return {name: baker.make("wiki.SpellEffect", name=name, slug=None) for name in ("Урон", "Огонь", "Сон", "Яд")}
+
+
+def make_spell(name, *effects):
+    spell = baker.make("wiki.Spell", name=name, slug=None)
+    for effect in effects:
+        SpellEffectLink.objects.create(spell=spell, effect=effect)
+    return spell
+
+
+def neighbours(spell):
+    return list(RelatedSpell.objects.filter(spell=spell).order_by("rank").values_list("related__name", flat=True))
+
+
+def test_scores_weight_shared_effects_by_rarity():
+    # эффект 1 есть у трёх заклинаний из трёх, эффект 2 — у двух
+    matrix = EffectMatrix([("a", 1), ("a", 2), ("b", 1), ("b", 2), ("c", 1)], total=3)
+
+    rows = matrix.top(["a"], limit=5)
+
+    assert [(related, shared, rank) for _, related, _, shared, rank in rows] == [("b", 2, 0), ("c", 1, 1)]
+    assert rows[0][2] == pytest.approx(math.log1p(3 / 3) + math.log1p(3 / 2))
+    assert rows[1][2] == pytest.approx(math.log1p(3 / 3))
+
+
+def test_rows_follow_link_changes(effects, django_capture_on_commit_callbacks):
+    damage, fire, sleep, poison = effects.values()
+    with django_capture_on_commit_callbacks(execute=True):
+        fireball = make_spell("Огненный шар", damage, fire)
+        scorch = make_spell("Палящий луч", damage, fire)
+        dart = make_spell("Ядовитый дротик", damage, poison)
+    assert neighbours(fireball) == ["Палящий луч", "Ядовитый дротик"]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        SpellEffectLink.objects.filter(spell=scorch, effect=fire).delete()
+        dart.effects.add(fire)
+    assert neighbours(scorch) == ["Огненный шар", "Ядовитый дротик"]
+    assert neighbours(dart) == ["Огненный шар", "Палящий луч"]
+    # в ряду соседа пары с изменёнными заклинаниями пересчитаны сразу, без команды
+    assert neighbours(fireball) == ["Ядовитый дротик", "Палящий луч"]
+    call_command("rebuild_related_spells", stdout=io.StringIO())
+    assert neighbours(fireball) == ["Ядовитый дротик", "Палящий луч"]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        dart.delete()
+        Spell.objects.filter(pk=scorch.pk).delete()
+    assert neighbours(dart) == neighbours(scorch) == neighbours(fireball) == []
+
+
+def test_rebuild_command_and_detail_page(client, effects):
+    damage, fire, sleep, poison = effects.values()
+    fireball = make_spell("Огненный шар", damage, fire)
+    scorch = make_spell("Палящий луч", fire)
+    make_spell("Усыпление", sleep)
+    assert not RelatedSpell.objects.exists()  # без фиксации транзакции пересчёт не запускался
+
+    call_command("rebuild_related_spells")
+
+    response = client.get(reverse("wiki:spell_detail", kwargs={"slug": fireball.slug}))
+    assert [row.related for row in response.context["related_spells"]] == [scorch]
+    assert reverse("wiki:spell_detail", kwargs={"slug": scorch.slug}) in response.content.decode()
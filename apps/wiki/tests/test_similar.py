@@ -0,0 +1,90 @@
+import io
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+
+from apps.wiki import similar
+from apps.wiki.models import Creature
+
+pytestmark = pytest.mark.django_db
+
+
+def make(creature_factory, name, health, armor_class=12, dangerous_level=1):
+    return creature_factory(name=name, health=health, armor_class=armor_class, dangerous_level=dangerous_level)
+
+
+def test_neighbours_are_ordered_by_distance(creature_factory):
+    wolf = make(creature_factory, "Wolf", 11)
+    dog = make(creature_factory, "Dog", 10)
+    bear = make(creature_factory, "Bear", 34, armor_class=14, dangerous_level=3)
+    dragon = make(creature_factory, "Dragon", 250, armor_class=19, dangerous_level=15)
+    similar.rebuild()
+
+    assert similar.similar_pks(wolf.pk, 3) == [dog.pk, bear.pk, dragon.pk]
+    assert similar.similar_pks(wolf.pk, 1) == [dog.pk]
+
+
+def test_saves_without_index_do_not_touch_the_disk(creature_factory, settings, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        wolf = make(creature_factory, "Wolf", 11)
+    with django_capture_on_commit_callbacks(execute=True):
+        Creature.objects.filter(pk=wolf.pk).delete()
+
+    assert not settings.SIMILAR_INDEX_DIR.exists()
+    assert similar.index() is None
+
+
+def test_index_follows_saves_and_soft_deletes(creature_factory, django_capture_on_commit_callbacks):
+    wolf = make(creature_factory, "Wolf", 11)
+    dragon = make(creature_factory, "Dragon", 250, armor_class=19, dangerous_level=15)
+    similar.rebuild()
+    generation = similar.index().generation
+
+    with django_capture_on_commit_callbacks(execute=True):
+        dog = make(creature_factory, "Dog", 12)
+    assert similar.similar_pks(wolf.pk, 1) == [dog.pk]
+    assert similar.index().generation == generation
+
+    with django_capture_on_commit_callbacks(execute=True):
+        dog.delete()
+    assert dog.pk not in similar.similar_pks(wolf.pk)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        twin = make(creature_factory, "Twin", 300, armor_class=19, dangerous_level=15)
+        wolf.health = 251
+        wolf.armor_class = 19
+        wolf.dangerous_level = 15
+        wolf.save()
+    assert similar.similar_pks(twin.pk, 1) == [wolf.pk]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Creature.objects.filter(pk__in=[wolf.pk, twin.pk]).delete()
+    assert similar.similar_pks(dragon.pk) == []
+    with django_capture_on_commit_callbacks(execute=True):
+        Creature.objects.restore()
+    assert similar.similar_pks(twin.pk, 1) == [wolf.pk]
+
+
+def test_detail_page_lists_similar_creatures(client, creature_factory):
+    wolf = make(creature_factory, "Wolf", 11)
+    dog = make(creature_factory, "Dog", 10)
+    url = reverse("wiki:creature_detail", kwargs={"slug": wolf.slug})
+    # индекс строит только команда: до неё панель пуста, а не строится в запросе
+    assert client.get(url).context["similar_creatures"] == []
+    assert similar.index() is None
+
+    call_command("build_similar_index", stdout=io.StringIO())
+    response = client.get(url)
+
+    assert response.context["similar_creatures"] == [dog]
+    assert reverse("wiki:creature_detail", kwargs={"slug": dog.slug}) in response.content.decode()
+
+
+def test_rebuild_keeps_previous_generation_files(creature_factory):
+    make(creature_factory, "Wolf", 11)
+    for _ in range(3):
+        similar.rebuild()
+
+    generations = {path.stem.rsplit("-", 1)[1] for path in similar._directory().glob("*-*.npy")}
+    assert generations == {"2", "3"}
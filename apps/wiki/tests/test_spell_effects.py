@@ -0,0 +1,161 @@
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from model_bakery import baker
+
+from apps.wiki.effect_set import decode, filter_by_effects, filter_by_links
+from apps.wiki.forms import SpellEffectFormSet
+from apps.wiki.models import Spell, SpellEffect, SpellEffectLink
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def effects():
+    return {name: baker.make("wiki.SpellEffect", name=name, slug=None) for name in ("Огонь", "Лёд", "Яд", "Сон")}
+
+
+def make_spell(name, *effects):
+    spell = baker.make("wiki.Spell", name=name, slug=None)
+    for effect in effects:
+        SpellEffectLink.objects.create(spell=spell, effect=effect)
+    return spell
+
+
+def effects_of(spell):
+    return decode(Spell.objects.get(pk=spell.pk).effect_set)
+
+
+def test_effect_set_follows_link_changes(effects):
+    fire, ice, poison, sleep = effects.values()
+    spell = make_spell("Буря", fire, ice)
+    assert effects_of(spell) == sorted([fire.pk, ice.pk])
+
+    SpellEffectLink.objects.filter(spell=spell, effect=fire).delete()
+    spell.effects.add(poison)
+    assert effects_of(spell) == sorted([ice.pk, poison.pk])
+
+    sleep.spells.add(spell)
+    poison.spells.clear()
+    assert effects_of(spell) == sorted([ice.pk, sleep.pk])
+
+
+def test_plain_save_of_stale_spell_keeps_effect_set(effects):
+    fire, ice, _, _ = effects.values()
+    spell = make_spell("Буря", fire)
+    stale = Spell.objects.get(pk=spell.pk)
+    spell.effects.add(ice)
+
+    stale.description = "Новое описание"
+    stale.save()
+
+    assert effects_of(spell) == sorted([fire.pk, ice.pk])
+    assert Spell.objects.get(pk=spell.pk).description == "Новое описание"
+
+
+def test_rebuild_command_repairs_effect_sets(effects):
+    fire = effects["Огонь"]
+    spell = make_spell("Искра")
+    SpellEffectLink.objects.bulk_create([SpellEffectLink(spell=spell, effect=fire, note="")])  # без сигналов
+    assert effects_of(spell) == []
+
+    call_command("rebuild_effect_sets")
+
+    assert effects_of(spell) == [fire.pk]
+
+
+def test_and_or_not_filter_matches_join_query(effects):
+    fire, ice, poison, sleep = effects.values()
+    make_spell("Огненный лёд", fire, ice)
+    make_spell("Ядовитый огонь", fire, poison)
+    make_spell("Ледяной сон", ice, sleep)
+    make_spell("Огненный ледяной яд", fire, ice, poison)
+    make_spell("Пустышка")
+
+    cases = [
+        dict(all_ids=[fire.pk, ice.pk]),
+        dict(all_ids=[fire.pk], none_ids=[poison.pk]),
+        dict(any_ids=[poison.pk, sleep.pk]),
+        dict(any_ids=[ice.pk], none_ids=[fire.pk]),
+        dict(none_ids=[fire.pk, ice.pk]),
+    ]
+    for case in cases:
+        by_set = set(filter_by_effects(Spell.objects.all(), **case).values_list("name", flat=True))
+        by_links = set(filter_by_links(Spell.objects.all(), **case).values_list("name", flat=True))
+        assert by_set == by_links, case
+
+    assert by_set == {"Пустышка"}
+
+
+def test_spell_list_filters_by_level_category_and_effects(client, effects, strict_query_budget):
+    fire, ice, poison, _ = effects.values()
+    wanted = make_spell("Огненный лёд", fire, ice)
+    wanted.spell_level = "2"
+    wanted.save()
+    poisoned = make_spell("Ядовитый лёд", fire, ice, poison)
+    poisoned.category, poisoned.spell_level = wanted.category, "2"
+    poisoned.save()
+
+    response = client.get(reverse("wiki:spell_list"), {
+        "level": ["2", "3"], "category": wanted.category.slug,
+        "effects_all": [fire.slug, ice.slug], "effects_none": poison.slug,
+    })
+
+    assert response.status_code == 200
+    assert [spell.name for spell in response.context["spells"]] == ["Огненный лёд"]
+
+
+def test_formset_resolves_effects_in_one_query(effects, django_assert_num_queries):
+    fire, ice, poison, _ = effects.values()
+    spell = baker.make("wiki.Spell", name="Буря", slug=None)
+    data = {"eff-TOTAL_FORMS": "3", "eff-INITIAL_FORMS": "0"}
+    for number, effect in enumerate((fire, ice, poison)):
+        data[f"eff-{number}-effect"] = str(effect.pk)
+    formset = SpellEffectFormSet(data, instance=spell, prefix="eff")
+
+    with django_assert_num_queries(1):
+        assert formset.is_valid(), formset.errors
+    with CaptureQueriesContext(connection) as queries:
+        formset.save()
+
+    assert not [query for query in queries if 'FROM "wiki_spelleffect"' in query["sql"]]
+    assert sorted(SpellEffectLink.objects.filter(spell=spell).values_list("note", flat=True)) == sorted(
+        effect.text for effect in (fire, ice, poison)
+    )
+
+    data["eff-2-effect"] = str(fire.pk)
+    assert not SpellEffectFormSet(data, instance=baker.make("wiki.Spell", slug=None), prefix="eff").is_valid()
+
+
+def test_effect_edit_updates_links_with_one_update(effects):
+    fire, ice = effects["Огонь"], effects["Лёд"]
+    spells = [make_spell(f"Огонь {number}", fire, ice) for number in range(3)]
+
+    fire.text = "Поджигает цель."
+    with CaptureQueriesContext(connection) as queries:
+        fire.save()
+
+    updates = [query for query in queries if query["sql"].startswith('UPDATE "wiki_spelleffectlink"')]
+    assert len(updates) == 1
+    assert set(SpellEffectLink.objects.filter(effect=fire).values_list("note", flat=True)) == {"Поджигает цель."}
+    assert SpellEffectLink.objects.filter(spell__in=spells, effect=ice).exclude(note=ice.text).count() == 0
+
+
+def test_bulk_create_fills_notes_and_repair_command(effects, django_assert_num_queries):
+    fire, ice = effects["Огонь"], effects["Лёд"]
+    spell = make_spell("Искра")
+    links = [SpellEffectLink(spell=spell, effect_id=fire.pk), SpellEffectLink(spell=spell, effect_id=ice.pk)]
+
+    with django_assert_num_queries(2):  # тексты эффектов + вставка
+        SpellEffectLink.objects.bulk_create(links)
+    assert [link.note for link in links] == [fire.text, ice.text]
+
+    SpellEffect.objects.filter(pk=fire.pk).update(text="Новый текст")  # без сигналов
+    SpellEffectLink.objects.filter(effect=ice).update(note=None)
+    call_command("repair_effect_notes")
+
+    assert dict(SpellEffectLink.objects.filter(spell=spell).values_list("effect_id", "note")) == {
+        fire.pk: "Новый текст", ice.pk: ice.text,
+    }
@@ -0,0 +1,22 @@
+import pytest
+from django.urls import reverse
+from model_bakery import baker
+from model_bakery.recipe import seq
+
+pytestmark = pytest.mark.django_db
+
+
+def test_post_list_links_to_the_next_page(client):
+    baker.make("wiki.Post", title=seq("Post-", start=1), slug=None, category=None, _quantity=12)
+    url = reverse("wiki:post_list")
+
+    first = client.get(url)
+
+    assert [template.name for template in first.templates][0] == "wiki/post_list.html"
+    assert len(first.context["posts"]) == 10
+    next_cursor = first.context["page_obj"].next_cursor
+    assert f"cursor={next_cursor}" in first.content.decode()
+
+    second = client.get(url, {"cursor": next_cursor})
+    assert len(second.context["posts"]) == 2
+    assert not second.context["page_obj"].has_next()
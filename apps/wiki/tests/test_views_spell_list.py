@@ -27,9 +27,9 @@ def test_spell_list_renders_template_and_context(client):
 
 def test_spell_list_pagination_first_page_has_6_items(client):
     """
-    Вьюха paginate_by = 6. Создаем 8 объектов и проверяем:
+    Вьюха paginate_by = 6, пагинация по курсору. Создаем 8 объектов и проверяем:
     - на первой странице 6 элементов,
-    - в контексте есть paginator/page_obj.
+    - в контексте есть paginator/page_obj и курсор следующей страницы.
     """
     baker.make("wiki.Spell", name=seq("Spell-", start=1), _quantity=8)
     url = reverse("wiki:spell_list")
@@ -40,16 +40,58 @@ def test_spell_list_pagination_first_page_has_6_items(client):
     assert len(response.context["spells"]) == 6
     assert "paginator" in response.context
     assert "page_obj" in response.context
-    assert response.context["page_obj"].number == 1
-    assert response.context["paginator"].num_pages == 2
+    assert not response.context["page_obj"].has_previous()
+    assert response.context["page_obj"].next_cursor
 
 def test_spell_list_pagination_second_page_has_remaining_items(client):
     baker.make("wiki.Spell", name=seq("Spell-", start=1), _quantity=8)
     url = reverse("wiki:spell_list")
-    response = client.get(url, {'page': 2})
+    first = client.get(url)
+    response = client.get(url, {'cursor': first.context['page_obj'].next_cursor})
 
     assert response.status_code == 200
     assert len(response.context["spells"]) == 2
-    assert response.context['page_obj'].number == 2
+    assert response.context['page_obj'].has_previous()
+    assert not response.context['page_obj'].has_next()
 
+def test_spell_list_invalid_cursor_returns_404(client):
+    response = client.get(reverse("wiki:spell_list"), {'cursor': 'not-a-cursor'})
+    assert response.status_code == 404
 
+def test_keyset_paginator_walks_ties_forward_and_back():
+    from apps.common.pagination import KeysetPaginator
+    from apps.wiki.models import Spell
+
+    # одинаковые имена — порядок внутри них держится на pk
+    baker.make("wiki.Spell", name="Same", _quantity=5)
+    baker.make("wiki.Spell", name=seq("Spell-", start=1), _quantity=4)
+    expected = list(Spell.objects.order_by("name", "pk"))
+    paginator = KeysetPaginator(Spell.objects.all(), 4)
+
+    pages = [paginator.page()]
+    while pages[-1].has_next():
+        pages.append(paginator.page(pages[-1].next_cursor))
+    assert [obj for page in pages for obj in page] == expected
+
+    back = paginator.page(pages[-1].previous_cursor)
+    assert list(back) == list(pages[-2])
+
+def test_numeric_level_follows_spell_level():
+    spell = baker.make("wiki.Spell", spell_level="заговор", slug=None)
+    assert spell.level == 0
+
+    spell.spell_level = "4"
+    spell.save(update_fields=["spell_level"])
+    spell.refresh_from_db()
+    assert spell.level == 4
+
+def test_spell_list_level_range_sorted_by_level(client):
+    for name, spell_level in [("Искра", "заговор"), ("Щит", "1"), ("Молния", "3"), ("Стрела", "1"), ("Метеор", "6")]:
+        baker.make("wiki.Spell", name=name, spell_level=spell_level, slug=None)
+
+    response = client.get(reverse("wiki:spell_list"), {"level_min": 1, "level_max": 3, "sort": "level"})
+
+    assert [(spell.level, spell.name) for spell in response.context["spells"]] == [
+        (1, "Стрела"), (1, "Щит"), (3, "Молния"),
+    ]
+    assert "Уровень: 3" in response.content.decode()
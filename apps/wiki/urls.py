@@ -2,7 +2,8 @@ from django.urls import path
 
 from apps.wiki.views import PostListView, PostDetailView, PostCreateView, PostEditView, \
     CreatureListView, CreatureDetailView, CreatureCreateView, SpellDetailView, SpellListView, SpellCreateView, \
-    NewsListView, CreatureDeleteView, SpellDeleteView, PostDeleteView, CreatureUpdateView, SpellUpdateView
+    NewsListView, CreatureDeleteView, SpellDeleteView, PostDeleteView, CreatureUpdateView, SpellUpdateView, WikiExportView, \
+    CombatSimulationView, EncounterBuilderView
 
 app_name = 'wiki'
 
@@ -18,6 +19,8 @@ urlpatterns = [
 
     path('creatures/', CreatureListView.as_view(), name='creature_list'),
     path('creatures/create/', CreatureCreateView.as_view(), name='creature_create'),
+    path('creatures/battle/', CombatSimulationView.as_view(), name='creature_battle'),
+    path('creatures/encounter/', EncounterBuilderView.as_view(), name='creature_encounter'),
     path('creatures/<slug:slug>/', CreatureDetailView.as_view(), name='creature_detail'),
     path('creatures/<slug:slug>/edit', CreatureUpdateView.as_view(), name='creature_edit'),
     path('creatures/<slug:slug>/delete', CreatureDeleteView.as_view(), name='creature_delete'),
@@ -26,5 +29,7 @@ urlpatterns = [
     path('spells/create/', SpellCreateView.as_view(), name='spell_create'),
     path('spells/<slug:slug>/', SpellDetailView.as_view(), name='spell_detail'),
     path('spells/<slug:slug>/edit', SpellUpdateView.as_view(), name='spell_edit'),
-    path('spells/<slug:slug>/delete', SpellDeleteView.as_view(), name='spell_delete')
+    path('spells/<slug:slug>/delete', SpellDeleteView.as_view(), name='spell_delete'),
+
+    path('export/<slug:name>.<slug:fmt>', WikiExportView.as_view(), name='export'),
 ]
\ No newline at end of file
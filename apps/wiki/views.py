@@ -1,33 +1,57 @@
+from django.conf import settings
+from django.contrib.auth.mixins import UserPassesTestMixin
 from django.db import transaction
+from django.http import Http404, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render
 from django.urls import reverse_lazy, reverse
+from django.views import View
 from django.views.generic import ListView, DetailView, UpdateView, CreateView, DeleteView
 
+from apps.common.conditional import ConditionalGetMixin, ConditionalListMixin, children_count, children_updated_at
+from apps.common.pagination import KeysetPaginationMixin
+from apps.wiki import autolink, combat, encounters, similar
+from apps.wiki.exporter import CONTENT_TYPES, EXPORTS, FORMATS, WikiExport, parse_watermark
+from apps.wiki.filters import CreatureFilterForm, SpellFilterForm
 from apps.wiki.forms import CreatureForm, CreatureAttackFormSet, \
     CreaturePassiveFormSet, SpellEffectFormSet, SpellForm, PostForm
-from apps.wiki.models import Post, Creature, Spell, SpellEffectLink, News
+from apps.wiki.models import Post, Creature, CreatureAttack, CreatureCategory, CreaturePassive, RelatedSpell, Spell, \
+    SpellCategory, SpellEffect, SpellEffectLink, News
 
 
-class NewsListView(ListView):
+class NewsListView(ConditionalListMixin, ListView):
     model = News
     context_object_name = 'news'
     template_name = 'home_page.html'
     extra_context = {'title': 'Главная страница'}
+    # +2: перечитывание названий для ссылок после их изменения
+    query_budget = 8
+
+    def get_validators(self):
+        # текст новостей выводится со ссылками на существ и заклинания
+        return {**super().get_validators(), 'autolink': autolink.version()}
 
 
 # POST: List, Detail, Create, Edit views
 
-class PostListView(ListView):
+class PostListView(ConditionalListMixin, KeysetPaginationMixin, ListView):
     model = Post
-    template_name = 'wiki/posts_list.html'
+    template_name = 'wiki/post_list.html'
     context_object_name = 'posts'
     extra_context = {'title': 'Статьи'}
+    paginate_by = 10
+    query_budget = 6
 
 
-class PostDetailView(DetailView):
+class PostDetailView(ConditionalGetMixin, DetailView):
     model = Post
     template_name = 'wiki/post_detail.html'
     context_object_name = 'post'
+    # +2: перечитывание названий для ссылок после их изменения
+    query_budget = 9
+
+    def get_validators(self):
+        validators = Post.objects.filter(slug=self.kwargs['slug']).values('updated_at').first()
+        return validators and {**validators, 'autolink': autolink.version()}
 
     def get_object(self):
         return Post.objects.get(slug=self.kwargs['slug'])
@@ -35,6 +59,7 @@ class PostDetailView(DetailView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['title'] = f'{self.object.title}'
+        context['autolink_version'] = autolink.version()
         return context
 
 
@@ -44,6 +69,7 @@ class PostCreateView(CreateView):
     template_name = 'wiki/post_create.html'
     context_object_name = 'post'
     extra_context = {'title': 'Создание статьи'}
+    query_budget = 10
 
     def form_valid(self, form):
         form.instance.author = self.request.user
@@ -57,6 +83,7 @@ class PostEditView(UpdateView):
     context_object_name = 'post'
     template_name = 'wiki/post_create.html'
     extra_context = {'title': 'Редактирование статьи'}
+    query_budget = 10
 
     def get_object(self, **kwargs):
         return Post.objects.get(slug=self.kwargs['slug'])
@@ -71,29 +98,68 @@ class PostDeleteView(DeleteView):
     template_name = 'wiki/post_delete.html'
     extra_context = {'title': 'Удаление статьи'}
     success_url = reverse_lazy('wiki:post_list')
+    query_budget = 6
 
 
 # Существа. Просмотр списком/детально, создание, редактирование и удаление.
 
-class CreatureListView(ListView):
+class CreatureListView(ConditionalListMixin, KeysetPaginationMixin, ListView):
     model = Creature
     template_name = 'wiki/creature_list.html'
     context_object_name = 'creatures'
     extra_context = {'title': 'Бестиарий'}
     paginate_by = 6
+    # карточки и фасеты выводят названия категорий
+    related_models = (CreatureCategory,)
+    query_budget = 8
 
+    def get_queryset(self):
+        # фильтры и сортировка из GET; курсор страницы кодирует значения колонок выбранной сортировки
+        categories = list(CreatureCategory.objects.all())
+        self.filter_form = CreatureFilterForm(self.request.GET, categories=categories)
+        queryset = self.filter_form.filter(super().get_queryset())
+        return queryset.select_related('category').order_by(*self.filter_form.ordering())
 
-class CreatureDetailView(DetailView):
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # счётчики фасетов — один GROUP BY по всей выборке, без COUNT на каждый вариант
+        counts = self.filter_form.facets(Creature.objects.all())
+        context['filter_form'] = self.filter_form
+        context['facets'] = self.filter_form.facet_rows(counts)
+        return context
+
+
+class CreatureDetailView(ConditionalGetMixin, DetailView):
     model = Creature
     template_name = 'wiki/creature_detail.html'
     context_object_name = 'creature'
+    # +2: похожие существа и построение их индекса при первом обращении
+    query_budget = 11
+
+    def get_validators(self):
+        validators = Creature.objects.filter(slug=self.kwargs['slug']).values(
+            'updated_at', 'category__name',
+            attacks_updated_at=children_updated_at(CreatureAttack, 'creature'),
+            attack_count=children_count(CreatureAttack, 'creature'),
+            passives_updated_at=children_updated_at(CreaturePassive, 'creature'),
+            passive_count=children_count(CreaturePassive, 'creature'),
+        ).first()
+        # панель похожих меняется с правкой любого существа
+        return validators and {**validators, 'similar': similar.token()}
 
     def get_object(self, **kwargs):
-        return Creature.objects.get(slug=self.kwargs['slug'])
+        # отметки атак и пассивок приходят тем же запросом — по ним шаблон проверяет кэш блока характеристик
+        return Creature.objects.annotate(
+            attacks_updated_at=children_updated_at(CreatureAttack, 'creature'),
+            passives_updated_at=children_updated_at(CreaturePassive, 'creature'),
+        ).get(slug=self.kwargs['slug'])
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['title'] = f'{self.object.name}'
+        pks = similar.similar_pks(self.object.pk)
+        found = Creature.objects.in_bulk(pks)
+        context['similar_creatures'] = [found[pk] for pk in pks if pk in found]
         return context
 
 
@@ -103,6 +169,7 @@ class CreatureCreateView(CreateView):
     template_name = 'wiki/creature_create.html'
     extra_context = {'title': 'Создание существа'}
     success_url = reverse_lazy('wiki:creature_list')
+    query_budget = 25
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -138,6 +205,7 @@ class CreatureUpdateView(UpdateView):
     template_name = 'wiki/creature_create.html'
     extra_context = {'title': 'Редактирование существа'}
     success_url = reverse_lazy('wiki:creature_list')
+    query_budget = 30
 
     def get_object(self, **kwargs):
         return Creature.objects.get(slug=self.kwargs['slug'])
@@ -178,35 +246,77 @@ class CreatureDeleteView(DeleteView):
     template_name = 'wiki/creature_delete.html'
     context_object_name = 'creature'
     success_url = reverse_lazy('wiki:creature_list')
+    query_budget = 6
 
 
 # ЗАКЛИНАНИЯ
-class SpellListView(ListView):
+class SpellListView(ConditionalListMixin, KeysetPaginationMixin, ListView):
     model = Spell
     template_name = 'wiki/spell_list.html'
     context_object_name = 'spells'
     extra_context = {'title': 'Заклинания'}
     paginate_by = 6
+    # фильтры выводят названия категорий и эффектов
+    related_models = (SpellCategory, SpellEffect)
+    query_budget = 9
+
+    def get_queryset(self):
+        # ?level=2&level_min=1&level_max=3&category=<slug>&effects_all=<slug>&effects_any=...&effects_none=...&sort=level
+        # уровни — по числовому Spell.level, эффекты — по Spell.effect_set
+        self.filter_form = SpellFilterForm(
+            self.request.GET,
+            categories=SpellCategory.objects.only('pk', 'name', 'slug'),
+            effects=SpellEffect.objects.only('pk', 'name', 'slug'),
+        )
+        return self.filter_form.filter(super().get_queryset()).order_by(*self.filter_form.ordering())
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['filter_form'] = self.filter_form
+        return context
 
-class SpellDetailView(DetailView):
+
+class SpellDetailView(ConditionalGetMixin, DetailView):
     model = Spell
     template_name = 'wiki/spell_detail.html'
     context_object_name = 'spell'
+    # +1: похожие заклинания
+    query_budget = 8
+    related_count = 6
+
+    def get_validators(self):
+        return Spell.objects.filter(slug=self.kwargs['slug']).values(
+            'updated_at', 'category__name',
+            links_updated_at=children_updated_at(SpellEffectLink, 'spell'),
+            link_count=children_count(SpellEffectLink, 'spell'),
+            related_updated_at=children_updated_at(RelatedSpell, 'spell'),
+            related_count=children_count(RelatedSpell, 'spell'),
+        ).first()
 
     def get_queryset(self):
-        return Spell.objects.select_related('category').prefetch_related('effects')
+        # эффекты выводятся через effect_links (вместе с примечаниями связи), отдельный prefetch не нужен;
+        # links_updated_at — отметка для кэша фрагмента
+        return Spell.objects.select_related('category').annotate(
+            links_updated_at=children_updated_at(SpellEffectLink, 'spell'),
+        )
 
     def get_object(self, **kwargs):
-        return Spell.objects.get(slug=self.kwargs['slug'])
+        # через get_queryset, чтобы категория пришла одним запросом вместе с заклинанием
+        return self.get_queryset().get(slug=self.kwargs['slug'])
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['title'] = f'{self.object.name}'
+        # ленивая выборка: при попадании в кэш фрагмента запрос не выполняется
         context['effect_links'] = (SpellEffectLink.objects
                                    .select_related('effect')
                                    .filter(spell=self.object)
                                    .order_by('pk'))
+        # соседи посчитаны заранее (apps.wiki.related): один запрос по индексу (spell, rank)
+        context['related_spells'] = (RelatedSpell.objects
+                                     .select_related('related')
+                                     .filter(spell=self.object, related__is_deleted=False)
+                                     .order_by('rank')[:self.related_count])
 
         return context
 
@@ -215,6 +325,8 @@ class SpellCreateView(CreateView):
     form_class = SpellForm
     template_name = 'wiki/spell_create.html'
     extra_context = {'title': 'Создание заклинания'}
+    # +5: пересчёт похожих заклинаний после фиксации (apps.wiki.related)
+    query_budget = 25
 
 
     def get_success_url(self):
@@ -248,6 +360,8 @@ class SpellUpdateView(UpdateView):
     form_class = SpellForm
     template_name = 'wiki/spell_create.html'
     extra_context = {'title': 'Редактирование заклинания'}
+    # +5: пересчёт похожих заклинаний после фиксации (apps.wiki.related)
+    query_budget = 30
 
     def get_success_url(self):
         return reverse('wiki:spell_detail', kwargs={'slug': self.object.slug})
@@ -280,10 +394,118 @@ class SpellDeleteView(DeleteView):
     context_object_name = 'spell'
     extra_context = {'title': 'Удаление заклинания'}
     success_url = reverse_lazy('wiki:spell_list')
-
-
-
-
-
-
-
+    # +6: пересчёт похожих после мягкого удаления (apps.wiki.related)
+    query_budget = 12
+
+
+# Выгрузка: /export/creatures.jsonl, /export/spells.csv?since=2026-01-01T00:00:00Z
+
+class WikiExportView(UserPassesTestMixin, View):
+    # запросы выгрузки выполняются уже при отдаче ответа, в бюджет представления не входят
+    query_budget = 3
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get(self, request, name, fmt):
+        if name not in EXPORTS or fmt not in FORMATS:
+            raise Http404('Неизвестная выгрузка')
+        since = request.GET.get('since')
+        try:
+            since = parse_watermark(since) if since else None
+        except ValueError as error:
+            return HttpResponseBadRequest(str(error))
+
+        response = StreamingHttpResponse(WikiExport(name, since).lines(fmt), content_type=CONTENT_TYPES[fmt])
+        response['Content-Disposition'] = f'attachment; filename="{name}.{fmt}"'
+        return response
+
+
+class CombatSimulationView(View):
+    """
+    Кто победит: GET ?a=<слаг>[:<число>]&...&b=<слаг>[:<число>][&trials=N&seed=S] — JSON с долями побед
+    отрядов A и B, ничьих и ожидаемым числом раундов (apps.wiki.combat). Симуляция укладывается в
+    COMBAT_SIM_TIME_BUDGET: если бюджета не хватило на все бои, trials в ответе меньше запрошенного.
+    """
+    query_budget = 2
+
+    def _side(self, values):
+        counts = {}
+        for value in values:
+            slug, _, count = value.partition(':')
+            counts[slug] = counts.get(slug, 0) + int(count or 1)
+        if any(count <= 0 for count in counts.values()):
+            raise ValueError('Число существ должно быть положительным')
+        return counts
+
+    def get(self, request):
+        try:
+            sides = [self._side(request.GET.getlist(name)) for name in ('a', 'b')]
+            trials = int(request.GET.get('trials', combat.DEFAULT_TRIALS))
+            seed = int(request.GET['seed']) if request.GET.get('seed') else None
+        except ValueError:
+            return JsonResponse({'detail': 'Bad value'}, status=400)
+        if not all(sides):
+            return JsonResponse({'detail': 'Нужны оба отряда: параметры a и b'}, status=400)
+        if any(sum(side.values()) > settings.COMBAT_SIM_MAX_UNITS for side in sides):
+            return JsonResponse({'detail': f'Не больше {settings.COMBAT_SIM_MAX_UNITS} существ в отряде'}, status=400)
+        if not 0 < trials <= settings.COMBAT_SIM_MAX_TRIALS:
+            return JsonResponse({'detail': f'trials: от 1 до {settings.COMBAT_SIM_MAX_TRIALS}'}, status=400)
+        if seed is not None and seed < 0:
+            # np.random.default_rng принимает только неотрицательное зерно
+            return JsonResponse({'detail': 'seed: неотрицательное целое'}, status=400)
+
+        slugs = {slug for side in sides for slug in side}
+        creatures = {creature.slug: creature
+                     for creature in Creature.objects.filter(slug__in=slugs).prefetch_related('attacks')}
+        missing = sorted(slugs - creatures.keys())
+        if missing:
+            return JsonResponse({'detail': f'Существа не найдены: {", ".join(missing)}'}, status=404)
+
+        combatants = {slug: combat.Combatant.from_creature(creature) for slug, creature in creatures.items()}
+        result = combat.simulate(
+            *[[combatants[slug] for slug, count in side.items() for _ in range(count)] for side in sides],
+            trials=trials, seed=seed, time_budget=settings.COMBAT_SIM_TIME_BUDGET,
+        )
+        return JsonResponse({
+            **result,
+            'requested_trials': trials,
+            'sides': [[{'slug': slug, 'name': creatures[slug].name, 'count': count} for slug, count in side.items()]
+                      for side in sides],
+        })
+
+
+class EncounterBuilderView(View):
+    """
+    Встречи под группу: GET ?party=<размер>&level=<уровень>&difficulty=easy|medium|hard|deadly
+    [&category=<pk>...&size=<размер>...&max_monsters=N&results=N&seed=S] — JSON с окном опыта и вариантами
+    встреч (apps.wiki.encounters). Индекс существ держится в памяти: запрос к БД — только при его перестройке.
+    """
+    query_budget = 1
+
+    def get(self, request):
+        params = request.GET
+        try:
+            party = int(params.get('party', 4))
+            level = int(params.get('level', 1))
+            max_monsters = int(params.get('max_monsters', encounters.MAX_MONSTERS))
+            results = int(params.get('results', encounters.DEFAULT_RESULTS))
+            categories = [int(value) for value in params.getlist('category')]
+            seed = int(params['seed']) if params.get('seed') else None
+        except ValueError:
+            return JsonResponse({'detail': 'Bad value'}, status=400)
+        difficulty = params.get('difficulty', 'medium')
+        if (difficulty not in encounters.DIFFICULTIES or level not in encounters.THRESHOLDS
+                or not 1 <= party <= encounters.MAX_PARTY or not 1 <= max_monsters <= 15 or not 1 <= results <= 20):
+            return JsonResponse({'detail': 'Bad value'}, status=400)
+
+        low, high = encounters.budget(party, level, difficulty)
+        found = encounters.build_encounters(
+            encounters.index(), party, level, difficulty, categories=categories, sizes=params.getlist('size'),
+            max_monsters=max_monsters, results=results, seed=seed,
+        )
+        for encounter in found:
+            for monster in encounter['monsters']:
+                monster['url'] = reverse('wiki:creature_detail', kwargs={'slug': monster.pop('slug')})
+                monster.pop('pk')
+        return JsonResponse({'budget': {'from': low, 'to': high}, 'encounters': found})
@@ -0,0 +1,52 @@
+"""
+Симуляция боя: пачки на NumPy (apps.wiki.combat.simulate) против цикла Python по боям и раундам (simulate_loop).
+
+Для нескольких пар отрядов — от «4 гоблина против огра» до «20 на 20» — оба способа разыгрывают бои с одними
+правилами. Печатается скорость (боёв в секунду), ускорение и доли побед: они должны совпадать в пределах
+статистической погрешности. База данных не нужна — отряды собираются прямо из Combatant.
+
+    python benchmarks/combat_simulation.py --trials 50000 --loop-trials 5000
+"""
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from apps.wiki.combat import Combatant, simulate, simulate_loop  # noqa: E402
+
+GOBLIN = Combatant('Гоблин', 7, 15, 4, [(1, 6)], 2)
+OGRE = Combatant('Огр', 59, 11, 6, [(2, 8)], 4)
+WOLF = Combatant('Волк', 11, 13, 4, [(2, 4)], 2)
+KNIGHT = Combatant('Рыцарь', 52, 18, 5, [(2, 6)], 3)
+SKELETON = Combatant('Скелет', 13, 13, 4, [(1, 6)], 2)
+
+SCENARIOS = (
+    ('4 гоблина / огр', [GOBLIN] * 4, [OGRE]),
+    ('6 волков / 2 рыцаря', [WOLF] * 6, [KNIGHT] * 2),
+    ('20 скелетов / 20 гоблинов', [SKELETON] * 20, [GOBLIN] * 20),
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--trials', type=int, default=50_000, help='Боёв для NumPy-симуляции.')
+    parser.add_argument('--loop-trials', type=int, default=5_000, help='Боёв для цикла Python.')
+    parser.add_argument('--batch-size', type=int, default=4096)
+    args = parser.parse_args()
+
+    print(f'{"бой":<28} {"NumPy, боёв/с":>14} {"цикл, боёв/с":>13} {"ускорение":>10}   победы A: NumPy / цикл')
+    for name, side_a, side_b in SCENARIOS:
+        batched = simulate(side_a, side_b, trials=args.trials, batch_size=args.batch_size, seed=1)
+        looped = simulate_loop(side_a, side_b, trials=args.loop_trials, seed=1)
+        batched_rate = batched['trials'] / batched['elapsed']
+        looped_rate = looped['trials'] / looped['elapsed']
+        print(f'{name:<28} {batched_rate:>14.0f} {looped_rate:>13.0f} {batched_rate / looped_rate:>9.1f}×   '
+              f'{batched["a_wins"]:.3f} / {looped["a_wins"]:.3f}')
+        # три стандартные ошибки доли по меньшей выборке
+        tolerance = 3 * (0.25 / args.loop_trials) ** 0.5
+        assert abs(batched['a_wins'] - looped['a_wins']) < tolerance, 'доли побед расходятся'
+
+
+if __name__ == '__main__':
+    main()
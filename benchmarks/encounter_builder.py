@@ -0,0 +1,63 @@
+"""
+Генератор встреч: построение индекса существ и время ответа apps.wiki.encounters.build_encounters.
+
+Индекс строится из сгенерированных строк (по умолчанию 50 000 существ, 30 категорий, 5 размеров, опасность 0–20
+с перекосом к низким уровням) — так же, как из выборки values_list при перестройке. Затем для случайных
+запросов (размер и уровень группы, сложность, иногда фильтр по категориям и размерам) замеряется подбор встреч.
+
+    python benchmarks/encounter_builder.py --creatures 50000 --queries 500
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from apps.wiki.encounters import DIFFICULTIES, EncounterIndex, build_encounters  # noqa: E402
+
+SIZES = ('tiny', 'small', 'medium', 'large', 'giant')
+CATEGORIES = 30
+
+
+def rows(creatures, rng):
+    weights = [1 / (danger + 1) for danger in range(21)]
+    for number in range(creatures):
+        danger = rng.choices(range(21), weights)[0]
+        yield (uuid.uuid4(), danger, rng.randrange(CATEGORIES), rng.choice(SIZES),
+               f'Существо {number:06d}', f'creature-{number}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--creatures', type=int, default=50_000)
+    parser.add_argument('--queries', type=int, default=500)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    data = list(rows(args.creatures, rng))
+    started = time.perf_counter()
+    index = EncounterIndex(data)
+    print(f'индекс: {len(index)} существ, {len(index.buckets)} корзин за {(time.perf_counter() - started) * 1000:.0f} мс')
+
+    timings, empty = [], 0
+    for _ in range(args.queries):
+        filtered = rng.random() < 0.5
+        started = time.perf_counter()
+        found = build_encounters(
+            index, party_size=rng.randint(1, 8), party_level=rng.randint(1, 20), difficulty=rng.choice(DIFFICULTIES),
+            categories=rng.sample(range(CATEGORIES), 3) if filtered else (),
+            sizes=rng.sample(SIZES, 2) if filtered else (), seed=rng.random(),
+        )
+        timings.append((time.perf_counter() - started) * 1000)
+        empty += not found
+    timings.sort()
+    print(f'запросов {args.queries}: медиана {statistics.median(timings):.2f} мс, '
+          f'p95 {timings[int(len(timings) * 0.95) - 1]:.2f} мс, максимум {timings[-1]:.2f} мс; без вариантов {empty}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Похожие заклинания: пересчёт таблицы apps.wiki.related.EffectMatrix против цикла Python по парам.
+
+Связи генерируются (по умолчанию 20 000 заклинаний, 300 эффектов, 1–6 эффектов на заклинание, частота эффектов
+по закону Ципфа — как «урон» против редких состояний). Замеряется полный пересчёт пачками, как в
+rebuild_related_spells, и для сравнения — пересчёт нескольких пачек циклом по общим эффектам. База данных не нужна.
+
+    python benchmarks/related_spells.py --spells 20000 --effects 300
+"""
+import argparse
+import math
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from apps.wiki.related import RELATED_LIMIT, EffectMatrix  # noqa: E402
+
+
+def links(spells, effects, rng):
+    weights = 1 / np.arange(1, effects + 1)
+    weights /= weights.sum()
+    for spell in range(spells):
+        for effect in rng.choice(effects, rng.integers(1, 7), replace=False, p=weights):
+            yield spell, int(effect)
+
+
+def loop_top(rows, by_spell, by_effect, total, limit):
+    found = []
+    for spell in rows:
+        scores, shared = defaultdict(float), defaultdict(int)
+        for effect in by_spell[spell]:
+            weight = math.log1p(total / len(by_effect[effect]))
+            for other in by_effect[effect]:
+                if other != spell:
+                    scores[other] += weight
+                    shared[other] += 1
+        ranked = sorted(scores, key=lambda other: (-scores[other], -shared[other], other))[:limit]
+        found.extend((spell, other) for other in ranked)
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--spells', type=int, default=20_000)
+    parser.add_argument('--effects', type=int, default=300)
+    parser.add_argument('--chunk-size', type=int, default=500)
+    parser.add_argument('--loop-chunks', type=int, default=2)
+    args = parser.parse_args()
+
+    data = list(links(args.spells, args.effects, np.random.default_rng(42)))
+    started = time.perf_counter()
+    matrix = EffectMatrix(data, args.spells)
+    pks = list(matrix.keys)
+    chunks = [pks[start:start + args.chunk_size] for start in range(0, len(pks), args.chunk_size)]
+    rows = 0
+    for chunk in chunks:
+        rows += len(matrix.top(chunk))
+    elapsed = time.perf_counter() - started
+    print(f'NumPy: {len(data)} связей, {rows} рядов за {elapsed:.2f} с')
+
+    by_spell, by_effect = defaultdict(list), defaultdict(list)
+    for spell, effect in data:
+        by_spell[spell].append(effect)
+        by_effect[effect].append(spell)
+    started = time.perf_counter()
+    for chunk in chunks[:args.loop_chunks]:
+        expected = loop_top(chunk, by_spell, by_effect, args.spells, RELATED_LIMIT)
+        found = [(spell, related) for spell, related, *_ in matrix.top(chunk)]
+        # при равных оценках и числе общих эффектов порядок соседей может отличаться
+        assert len(found) == len(expected) and {pair[0] for pair in found} == {pair[0] for pair in expected}
+    loop = (time.perf_counter() - started) / min(args.loop_chunks, len(chunks)) * len(chunks)
+    print(f'цикл Python (оценка по {args.loop_chunks} пачкам): {loop:.1f} с, в {loop / elapsed:.0f} раз медленнее')
+
+
+if __name__ == '__main__':
+    main()
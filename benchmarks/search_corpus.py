@@ -0,0 +1,129 @@
+"""
+Скорость поиска по вики на синтетическом корпусе (по умолчанию 100 000 документов).
+
+Во временной SQLite-базе применяются миграции проекта, затем индекс заполняется документами из
+случайных «русских» слов (корни с падежными окончаниями, чтобы работал стеммер) и замеряется
+время apps.search.index.search() — вместе с загрузкой найденных SearchDocument.
+
+    python benchmarks/search_corpus.py --documents 100000 --backend fts5 --backend python
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+
+SYLLABLES = ['ка', 'ро', 'ми', 'ла', 'ту', 'ве', 'зо', 'на', 'ги', 'бо', 'дра', 'кон', 'гор', 'лес', 'сту', 'пле']
+ENDINGS = ['', 'а', 'ы', 'ов', 'ами', 'ой', 'ом', 'е', 'ах', 'у']
+
+
+def make_vocabulary(size, rng):
+    roots = set()
+    while len(roots) < size:
+        roots.add(''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    # порядок задаёт частоту слова (см. weights), поэтому частые слова не должны делить общий префикс
+    roots = sorted(roots)
+    rng.shuffle(roots)
+    return roots
+
+
+def make_text(roots, weights, words, rng):
+    return ' '.join(root + rng.choice(ENDINGS) for root in rng.choices(roots, weights, k=words))
+
+
+def fill(documents, roots, weights, rng, chunk_size=2000):
+    from django.contrib.contenttypes.models import ContentType
+    from django.db import transaction
+
+    from apps.search.backends import TITLE_WEIGHT, get_backend
+    from apps.search.models import SearchDocument
+    from apps.search.text import terms
+    from apps.wiki.models import Post
+
+    content_type = ContentType.objects.get_for_model(Post)
+    backend = get_backend()
+    for start in range(0, documents, chunk_size):
+        built = []
+        for number in range(start, min(start + chunk_size, documents)):
+            title = make_text(roots, weights, rng.randint(2, 5), rng)
+            body = make_text(roots, weights, rng.randint(30, 120), rng)
+            title_terms, body_terms = terms(title), terms(body)
+            built.append((
+                SearchDocument(content_type=content_type, object_id=str(number), kind='post', title=title[:200],
+                               summary=body[:200], length=len(body_terms) + TITLE_WEIGHT * len(title_terms)),
+                title_terms, body_terms,
+            ))
+        with transaction.atomic():
+            created = SearchDocument.objects.bulk_create([document for document, _, _ in built])
+            backend.index([(document.id, title, body) for document, (_, title, body) in zip(created, built)])
+
+
+def measure(queries, limit):
+    from apps.search.index import search
+
+    timings = []
+    found = 0
+    for query in queries:
+        started = time.perf_counter()
+        found += len(search(query, limit=limit))
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        'median': statistics.median(timings),
+        'p95': timings[int(len(timings) * 0.95) - 1],
+        'max': timings[-1],
+        'found': found / len(queries),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--documents', type=int, default=100_000)
+    parser.add_argument('--vocabulary', type=int, default=20_000)
+    parser.add_argument('--queries', type=int, default=300)
+    parser.add_argument('--limit', type=int, default=30)
+    parser.add_argument('--backend', action='append', choices=['fts5', 'python'], dest='backends')
+    args = parser.parse_args()
+
+    import django
+    from django.conf import settings
+
+    with tempfile.TemporaryDirectory() as directory:
+        settings.DATABASES['default']['NAME'] = os.path.join(directory, 'search.sqlite3')
+        django.setup()
+        from django.core.management import call_command
+        call_command('migrate', verbosity=0)
+
+        rng = random.Random(42)
+        roots = make_vocabulary(args.vocabulary, rng)
+        # распределение слов по закону Ципфа, как в живом тексте
+        weights = [1 / rank for rank in range(1, len(roots) + 1)]
+        queries = []
+        for _ in range(args.queries):
+            words = [root + rng.choice(ENDINGS) for root in rng.choices(roots, weights, k=rng.randint(1, 3))]
+            # каждый третий запрос — недописанное последнее слово (префиксный поиск)
+            queries.append(' '.join(words)[:-1] if rng.random() < 0.33 else ' '.join(words) + ' ')
+
+        print(f'{"бэкенд":<8} {"индексация, с":>14} {"медиана, мс":>12} {"p95, мс":>9} {"max, мс":>9} {"найдено":>8}')
+        for backend in args.backends or ['fts5', 'python']:
+            settings.SEARCH_BACKEND = backend
+            from apps.search.models import SearchDocument
+            SearchDocument.objects.all().delete()
+            started = time.perf_counter()
+            fill(args.documents, roots, weights, random.Random(7))
+            indexing = time.perf_counter() - started
+            result = measure(queries, args.limit)
+            print(
+                f'{backend:<8} {indexing:>14.1f} {result["median"]:>12.2f} {result["p95"]:>9.2f} '
+                f'{result["max"]:>9.2f} {result["found"]:>8.1f}'
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+Похожие существа: построение индекса apps.wiki.similar и время поиска ближайших соседей.
+
+Индекс строится из сгенерированных характеристик (по умолчанию 50 000 существ) во временном каталоге,
+затем для случайных существ замеряется поиск k ближайших — векторным проходом по memmap и для сравнения
+циклом Python по строкам. База данных не нужна.
+
+    python benchmarks/similar_creatures.py --creatures 50000 --queries 200
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+
+from django.conf import settings  # noqa: E402
+
+from apps.wiki.similar import DEFAULT_NEIGHBOURS, FEATURES, SimilarIndex  # noqa: E402
+
+
+def loop_neighbours(vectors, row, k):
+    target = vectors[row]
+    distances = []
+    for other, vector in enumerate(vectors):
+        if other != row:
+            distances.append((sum((a - b) ** 2 for a, b in zip(vector, target)), other))
+    return [other for _, other in sorted(distances)[:k]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--creatures', type=int, default=50_000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--loop-queries', type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    values = np.column_stack([
+        rng.integers(1, 700, args.creatures), rng.integers(8, 25, args.creatures), rng.integers(0, 120, args.creatures),
+        rng.integers(2, 10, args.creatures), rng.integers(0, 21, args.creatures),
+        *(rng.integers(1, 30, args.creatures) for _ in FEATURES[5:]),
+    ])
+    pks = [uuid.uuid4() for _ in range(args.creatures)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        settings.configure(SIMILAR_INDEX_DIR=directory)
+        started = time.perf_counter()
+        index = SimilarIndex.create(1, pks, values)
+        print(f'индекс: {index.count} существ за {(time.perf_counter() - started) * 1000:.0f} мс')
+
+        queries = rng.choice(pks, args.queries)
+        timings = []
+        for pk in queries:
+            started = time.perf_counter()
+            index.neighbours(pk, DEFAULT_NEIGHBOURS)
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        print(f'NumPy, запросов {args.queries}: медиана {statistics.median(timings):.2f} мс, '
+              f'p95 {timings[int(len(timings) * 0.95) - 1]:.2f} мс')
+
+        vectors = np.asarray(index.vectors[:index.count]).tolist()
+        loop = []
+        for pk in queries[:args.loop_queries]:
+            row = index.rows[pk]
+            started = time.perf_counter()
+            expected = loop_neighbours(vectors, row, DEFAULT_NEIGHBOURS)
+            loop.append((time.perf_counter() - started) * 1000)
+            found = [index.rows[other] for other in index.neighbours(pk, DEFAULT_NEIGHBOURS)]
+            # при равных расстояниях соседи могут отличаться — сверяются расстояния
+            distance = lambda other: float(np.square(np.subtract(vectors[other], vectors[row])).sum())  # noqa: E731
+            assert np.allclose([distance(other) for other in found], [distance(other) for other in expected],
+                               rtol=1e-4), 'соседи расходятся'
+        print(f'цикл Python: медиана {statistics.median(loop):.1f} мс '
+              f'(в {statistics.median(loop) / statistics.median(timings):.0f} раз медленнее)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""
+Фильтр заклинаний по сочетаниям эффектов: набор Spell.effect_set против подзапросов к SpellEffectLink.
+
+Во временной SQLite-базе создаются заклинания (по умолчанию 100 000) и эффекты (500); у каждого заклинания
+3–8 эффектов, популярность эффектов распределена по закону Ципфа. Для случайных условий «все из / любой из /
+ни одного из» замеряются первая страница списка (ORDER BY name LIMIT 7, как в SpellListView) и COUNT(*).
+
+    python benchmarks/spell_effect_set.py --spells 100000 --effects 500
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+
+PAGE = 7
+
+
+def fill(spells, effects, rng):
+    from django.db import transaction
+
+    from apps.wiki.effect_set import rebuild_effect_sets
+    from apps.wiki.models import Spell, SpellCategory, SpellEffect, SpellEffectLink
+
+    with transaction.atomic():
+        categories = SpellCategory.objects.bulk_create(
+            [SpellCategory(name=f'Школа {number}', slug=f'school-{number}') for number in range(10)]
+        )
+        effect_ids = [effect.pk for effect in SpellEffect.objects.bulk_create(
+            [SpellEffect(name=f'Эффект {number}', slug=f'effect-{number}', text='') for number in range(effects)]
+        )]
+    weights = [1 / rank for rank in range(1, effects + 1)]
+
+    for start in range(0, spells, 5000):
+        with transaction.atomic():
+            created = Spell.objects.bulk_create([
+                Spell(name=f'Заклинание {number:06d}', slug=f'spell-{number}', category=rng.choice(categories),
+                      description='', spell_level=rng.choice('123456'))
+                for number in range(start, min(start + 5000, spells))
+            ])
+            links = []
+            for spell in created:
+                chosen = set(rng.choices(effect_ids, weights, k=rng.randint(3, 8)))
+                links.extend(SpellEffectLink(spell=spell, effect_id=effect_id, note='') for effect_id in chosen)
+            SpellEffectLink.objects.bulk_create(links)
+    rebuild_effect_sets(chunk_size=2000)
+    return effect_ids, weights
+
+
+def make_conditions(effect_ids, weights, count, rng):
+    conditions = []
+    for _ in range(count):
+        picked = list(dict.fromkeys(rng.choices(effect_ids, weights, k=6)))
+        conditions.append({
+            'all_ids': picked[:rng.randint(1, 2)],
+            'any_ids': picked[2:4] if rng.random() < 0.5 else [],
+            'none_ids': picked[4:5],
+        })
+    return conditions
+
+
+def timed(run):
+    started = time.perf_counter()
+    result = run()
+    return (time.perf_counter() - started) * 1000, result
+
+
+def measure(conditions, apply):
+    from apps.wiki.models import Spell
+
+    page, count = [], []
+    results = []
+    for condition in conditions:
+        queryset = apply(Spell.objects.all(), **condition)
+        elapsed, rows = timed(lambda: list(queryset.order_by('name').values_list('pk', flat=True)[:PAGE]))
+        page.append(elapsed)
+        elapsed, total = timed(queryset.count)
+        count.append(elapsed)
+        results.append((rows, total))
+    return page, count, results
+
+
+def summary(timings):
+    timings = sorted(timings)
+    return statistics.median(timings), timings[int(len(timings) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--spells', type=int, default=100_000)
+    parser.add_argument('--effects', type=int, default=500)
+    parser.add_argument('--queries', type=int, default=50)
+    args = parser.parse_args()
+
+    import django
+    from django.conf import settings
+
+    with tempfile.TemporaryDirectory() as directory:
+        settings.DATABASES['default']['NAME'] = os.path.join(directory, 'spells.sqlite3')
+        django.setup()
+        from django.core.management import call_command
+        call_command('migrate', verbosity=0)
+
+        from apps.wiki.effect_set import filter_by_effects, filter_by_links
+
+        rng = random.Random(42)
+        elapsed, (effect_ids, weights) = timed(lambda: fill(args.spells, args.effects, rng))
+        print(f'{args.spells} заклинаний, {args.effects} эффектов: заполнение {elapsed / 1000:.1f} с')
+        conditions = make_conditions(effect_ids, weights, args.queries, rng)
+
+        print(f'{"фильтр":<10} {"страница: медиана / p95, мс":>28} {"COUNT: медиана / p95, мс":>26}')
+        results = {}
+        for name, apply in (('набор', filter_by_effects), ('подзапросы', filter_by_links)):
+            page, count, results[name] = measure(conditions, apply)
+            print(f'{name:<10} {"%.2f / %.2f" % summary(page):>28} {"%.2f / %.2f" % summary(count):>26}')
+        assert results['набор'] == results['подзапросы'], 'фильтры вернули разные заклинания'
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Сравнение случайных uuid4 и упорядоченных по времени UUIDv7 в роли первичного ключа.
+
+Синтетическая таблица с такой же колонкой id, как у BaseModel на SQLite (char(32) PRIMARY KEY),
+заполняется пачками в отдельных транзакциях. Измеряются скорость вставки и размер индекса первичного ключа.
+
+    python benchmarks/uuid_primary_keys.py --rows 1000000
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from apps.common.utils import uuid7  # noqa: E402
+
+GENERATORS = {
+    'uuid4': uuid.uuid4,
+    'uuid7': uuid7,
+}
+
+
+def run(name, generator, rows, batch_size, directory):
+    path = os.path.join(directory, f'{name}.sqlite3')
+    connection = sqlite3.connect(path)
+    connection.execute(
+        'CREATE TABLE item ("id" char(32) NOT NULL PRIMARY KEY, "created_at" datetime NOT NULL, "name" varchar(50))'
+    )
+    started = time.perf_counter()
+    for start in range(0, rows, batch_size):
+        count = min(batch_size, rows - start)
+        with connection:
+            connection.executemany(
+                'INSERT INTO item (id, created_at, name) VALUES (?, datetime(\'now\'), ?)',
+                ((generator().hex, f'item-{start + i}') for i in range(count)),
+            )
+    elapsed = time.perf_counter() - started
+
+    page_size = connection.execute('PRAGMA page_size').fetchone()[0]
+    index_name = connection.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'item'"
+    ).fetchone()[0]
+    try:
+        index_pages = connection.execute('SELECT count(*) FROM dbstat WHERE name = ?', (index_name,)).fetchone()[0]
+    except sqlite3.OperationalError:
+        # SQLite собран без dbstat — оцениваем по размеру всего файла
+        index_pages = None
+    file_pages = connection.execute('PRAGMA page_count').fetchone()[0]
+    connection.close()
+    return {
+        'rows_per_second': rows / elapsed,
+        'seconds': elapsed,
+        'index_mb': index_pages * page_size / 2 ** 20 if index_pages is not None else None,
+        'file_mb': file_pages * page_size / 2 ** 20,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--batch-size', type=int, default=10_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        print(f'{"ключ":<6} {"строк/с":>10} {"сек":>8} {"индекс pk, МБ":>14} {"файл, МБ":>9}')
+        for name, generator in GENERATORS.items():
+            result = run(name, generator, args.rows, args.batch_size, directory)
+            index_mb = f'{result["index_mb"]:.1f}' if result['index_mb'] is not None else '—'
+            print(
+                f'{name:<6} {result["rows_per_second"]:>10.0f} {result["seconds"]:>8.1f} '
+                f'{index_mb:>14} {result["file_mb"]:>9.1f}'
+            )
+
+
+if __name__ == '__main__':
+    main()
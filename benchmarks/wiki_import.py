@@ -0,0 +1,94 @@
+"""
+Импорт бестиария: время и память apps.wiki.importer на больших файлах.
+
+Во временной SQLite-базе создаются 20 категорий, затем импортируется сгенерированный JSON Lines-файл
+с существами (по умолчанию 100 000), у каждого 1–3 атаки и 0–2 особенности; каждая сотая запись
+с ошибкой. Печатается время и пиковый RSS после каждой четверти файла: при потоковом импорте он не растёт.
+
+    python benchmarks/wiki_import.py --creatures 100000 --chunk-size 500
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+
+CATEGORIES = 20
+
+
+def write_file(path, creatures, rng):
+    with open(path, 'w', encoding='utf-8') as file:
+        for number in range(creatures):
+            record = {
+                'type': 'creature', 'name': f'Существо {number:06d}', 'category': f'Категория {number % CATEGORIES}',
+                'description': 'Описание существа ' * rng.randint(2, 20), 'health': rng.randint(1, 300),
+                'armor_class': rng.randint(8, 22), 'speed': rng.choice([20, 30, 40]),
+                'size': rng.choice(['tiny', 'small', 'medium', 'large', 'giant']),
+                'dangerous_level': rng.randint(1, 20), 'mastery': rng.randint(1, 10),
+                'saving_throws': 'Лов +2', 'skills': 'Восприятие +3',
+                'attacks': [{'name': f'Атака {i}', 'text': f'{rng.randint(1, 4)}d6+{rng.randint(0, 5)} рубящего'}
+                            for i in range(rng.randint(1, 3))],
+                'passives': [{'name': f'Особенность {i}', 'text': 'Тёмное зрение'} for i in range(rng.randint(0, 2))],
+            }
+            if number % 100 == 99:
+                record['health'] = 'много'
+            file.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+def rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--creatures', type=int, default=100_000)
+    parser.add_argument('--chunk-size', type=int, default=500)
+    parser.add_argument('--search-index', action='store_true', help='Индексировать импортированное для поиска.')
+    args = parser.parse_args()
+
+    import django
+    from django.conf import settings
+
+    with tempfile.TemporaryDirectory() as directory:
+        settings.DATABASES['default']['NAME'] = os.path.join(directory, 'import.sqlite3')
+        # с DEBUG Django хранит текст последних запросов — RSS рос бы и без утечек в импорте
+        settings.DEBUG = False
+        django.setup()
+        from django.core.management import call_command
+        call_command('migrate', verbosity=0)
+
+        from apps.wiki.importer import WikiImporter
+        from apps.wiki.models import Creature, CreatureAttack, CreatureCategory
+
+        CreatureCategory.objects.bulk_create([CreatureCategory(name=f'Категория {i}') for i in range(CATEGORIES)])
+        source = os.path.join(directory, 'creatures.jsonl')
+        write_file(source, args.creatures, random.Random(42))
+        print(f'файл: {os.path.getsize(source) / 2 ** 20:.0f} МБ, RSS до импорта {rss_mb():.0f} МБ')
+
+        quarter = max(args.creatures // 4, 1)
+        importer = WikiImporter(chunk_size=args.chunk_size, index=args.search_index)
+        started = time.perf_counter()
+        with open(source, encoding='utf-8') as file:
+            def lines():
+                for number, line in enumerate(file, start=1):
+                    if number % quarter == 0:
+                        print(f'{number:>8} строк: {time.perf_counter() - started:6.1f} с, пиковый RSS {rss_mb():.0f} МБ')
+                    yield line
+            importer.run(lines(), 'jsonl')
+        elapsed = time.perf_counter() - started
+
+        print(f'импортировано {importer.created["creature"]}, отклонено {importer.failed} за {elapsed:.1f} с '
+              f'({importer.created["creature"] / elapsed:.0f} существ/с)')
+        assert Creature.objects.count() == importer.created['creature'] == args.creatures - args.creatures // 100
+        print(f'атак: {CreatureAttack.objects.count()}')
+
+
+if __name__ == '__main__':
+    main()
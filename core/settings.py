@@ -41,6 +41,7 @@ INSTALLED_APPS = [
     'apps.analytics.apps.AnalyticsConfig',
     'apps.campaign.apps.CampaignConfig',
     'apps.common.apps.CommonConfig',
+    'apps.search.apps.SearchConfig',
     'apps.shop.apps.ShopConfig',
     'apps.support.apps.SupportConfig',
     'apps.wiki.apps.WikiConfig',
@@ -48,6 +49,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'apps.common.middleware.QueryBudgetMiddleware',
+    'apps.common.middleware.NPlusOneMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -149,6 +152,37 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Первичные ключи BaseModel: True — упорядоченные по времени UUIDv7, False — случайные uuid4
+TIME_ORDERED_UUIDS = False
+
+# Бюджет SQL-запросов на представление (если у класса не задан query_budget), см. apps.common.query_budget
+QUERY_BUDGET_DEFAULT = 30
+# True — превышение бюджета роняет запрос исключением (для тестов), иначе только пишется в лог
+QUERY_BUDGET_RAISE = False
+
+# Детектор N+1 (apps.common.n_plus_one): 'warn' — в лог, 'raise' — исключение, 'off' — выключен
+NPLUSONE_MODE = 'warn'
+# у скольких разных объектов одна связь должна загрузиться лениво, чтобы считать это N+1
+NPLUSONE_THRESHOLD = 3
+
+# Поиск по вики (apps.search): 'auto' — SQLite FTS5, если доступен, иначе индекс в таблице SearchPosting
+SEARCH_BACKEND = 'auto'
+# None — ранжировать все совпадения; число N — при очень частых словах запроса FTS5 ранжирует
+# только первые N совпадений (быстрее, но лучшие результаты могут не попасть в выдачу)
+SEARCH_RANK_LIMIT = None
+
+# Кэш фрагментов страниц деталей (apps.common.fragment_cache): алиас из CACHES и время жизни, с
+FRAGMENT_CACHE_ALIAS = 'default'
+FRAGMENT_CACHE_TIMEOUT = 24 * 60 * 60
+
+# Симуляция боя (apps.wiki.combat): бюджет времени на запрос в секундах, предел числа боёв и существ в отряде
+COMBAT_SIM_TIME_BUDGET = 0.5
+COMBAT_SIM_MAX_TRIALS = 50_000
+COMBAT_SIM_MAX_UNITS = 20
+
+# Индекс похожих существ (apps.wiki.similar): каталог файлов memmap, общих для процессов сайта
+SIMILAR_INDEX_DIR = os.path.join(BASE_DIR, 'var', 'similar')
+
 
 # Email Backend (Dev)
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
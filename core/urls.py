@@ -25,6 +25,7 @@ urlpatterns = [
     path('', include('apps.accounts.urls')),
     path('', include('apps.wiki.urls')),
     path('', include('apps.shop.urls')),
+    path('', include('apps.search.urls')),
 ]
 
 if settings.DEBUG: